@@ -13,18 +13,73 @@ def run_with_watch():
         watch_filter=lambda change, path: path.endswith(".py"),
     )
 from dotenv import load_dotenv
+import asyncio
+import contextlib
 import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
 import gradio as gr
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import Response
 from utils.app_logging import setup_logging
 from utils.chat import Me
+from utils.guardrails import TieredGuardrail
+from utils.metrics import PROMETHEUS_CONTENT_TYPE, get_metrics
+from utils.notification_queue import get_notification_queue
 
 load_dotenv(override=True)
 logger = setup_logging()
 
 logger.info("Starting digital-cv")
 
-me = Me()
-logger.info("Me initialized")
+# Suggestion-button prompts; most visitors start with one of these
+EXAMPLE_PROMPTS = [
+    "Tell me about your last role",
+    "How would you design a small RAG pipeline for docs?",
+    "What Python libraries are you familiar with?",
+]
+
+# Built on first use (or warmed in the background once the server starts):
+# opening the vector store and the OpenAI client stays off the import path.
+_me: Optional[Me] = None
+_me_lock = threading.Lock()
+
+
+def get_me() -> Me:
+    """Return the shared ``Me``, constructing it on the first call."""
+    global _me
+    if _me is None:
+        with _me_lock:
+            if _me is None:
+                _me = Me(guardrails=TieredGuardrail.from_env(known_prompts=EXAMPLE_PROMPTS))
+                logger.info("Me initialized")
+                if os.getenv("ANSWER_CACHE_PREWARM") == "1":
+                    threading.Thread(
+                        target=_me.prewarm_answer_cache,
+                        args=(EXAMPLE_PROMPTS,),
+                        name="answer-cache-prewarm",
+                        daemon=True,
+                    ).start()
+    return _me
+
+
+async def chat(message, history):
+    """Stream a reply; the first request builds ``Me`` off the event loop if needed.
+
+    ``ChatInterface`` needs the full text on each yield and diffs it against
+    the previous one, so ``Me`` yields coalesced flushes (``CHAT_STREAM_FLUSH_MS``)
+    instead of one update per token.
+    """
+    me = _me or await asyncio.to_thread(get_me)
+    async for chunk in me.achat(message, history):
+        yield chunk
+
+
 # Theming and chat styling for embedding
 theme = gr.themes.Soft(primary_hue="indigo", neutral_hue="slate")
 initial_assistant_message = (
@@ -233,8 +288,10 @@ with gr.Blocks(theme=theme, css=custom_css) as demo:
         gr.Markdown("## Chat with Daniel", elem_id="title")
         with gr.Column(elem_id="chat-wrapper"):
             chat_input = gr.Textbox(placeholder="Type your message…", autofocus=True)
+            # Async handler: every conversation shares the server's event loop
+            # instead of holding one of Gradio's worker threads.
             chat_iface = gr.ChatInterface(
-                me.chat,
+                chat,
                 type="messages",
                 chatbot=chatbot,
                 title="",
@@ -242,15 +299,11 @@ with gr.Blocks(theme=theme, css=custom_css) as demo:
                 submit_btn="Send",
                 stop_btn="Stop",
                 textbox=chat_input,
+                concurrency_limit=int(os.getenv("CHAT_CONCURRENCY_LIMIT", "0")) or None,
             )
             gr.Markdown("**Need inspiration?** Try asking:")
             with gr.Row(elem_classes="suggestion-buttons"):
-                examples = [
-                    "Tell me about your last role",
-                    "How would you design a small RAG pipeline for docs?",
-                    "What Python libraries are you familiar with?",
-                ]
-                for example in examples:
+                for example in EXAMPLE_PROMPTS:
                     gr.Button(example).click(
                         lambda text=example: gr.update(value=text),
                         outputs=chat_input,
@@ -259,15 +312,92 @@ with gr.Blocks(theme=theme, css=custom_css) as demo:
 logger.info("Blocks app initialized")
 
 
+def create_app() -> FastAPI:
+    """FastAPI app serving the Gradio UI at ``/`` and Prometheus metrics at ``/metrics``."""
+    metrics_registry = get_metrics()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        # Replays notifications left undelivered by the previous run and
+        # exports the queue's depth from the first scrape
+        get_notification_queue()
+        if os.getenv("APP_WARM_START", "1") != "0":
+            threading.Thread(target=get_me, name="me-warmup", daemon=True).start()
+        yield
+
+    app = FastAPI(lifespan=lifespan)
+    if metrics_registry.enabled:
+
+        @app.get("/metrics", include_in_schema=False)
+        def metrics():
+            return Response(metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    return gr.mount_gradio_app(
+        app, demo, path="/", favicon_path="assets/logo.png", show_error=True
+    )
+
+
+def run_workers(workers: int) -> None:
+    """Run ``workers`` single-process servers on consecutive ports and supervise them.
+
+    Each worker is an independent uvicorn process on ``WORKER_PORT_BASE + i``
+    serving the read-only retrieval snapshot (``VECTOR_DB_BACKEND=snapshot``),
+    so workers share the memory-mapped index and pick up newly published
+    versions without a restart. Gradio keeps streaming state per process, so
+    put a load balancer with session affinity in front (``deploy/nginx.conf``)
+    rather than ``uvicorn --workers``. Crashed workers are restarted with the
+    same ``WORKER_ID``, which gives each worker its own log files and
+    notification journal (see ``worker_path``), so a restart replays only
+    its own undelivered notifications.
+    """
+    host = os.getenv("WORKER_HOST", "127.0.0.1")
+    base_port = int(os.getenv("WORKER_PORT_BASE", "7861"))
+    env = dict(os.environ, APP_WORKERS="1")
+    env.setdefault("VECTOR_DB_BACKEND", "snapshot")
+
+    def spawn(port: int) -> subprocess.Popen:
+        return subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app:create_app", "--factory",
+                "--host", host, "--port", str(port),
+            ],
+            env=dict(env, WORKER_ID=str(port - base_port)),
+        )
+
+    procs = {base_port + i: spawn(base_port + i) for i in range(workers)}
+    logger.info(f"Started {workers} workers on {host}:{base_port}-{base_port + workers - 1}")
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        while not stopping:
+            time.sleep(1.0)
+            for port, proc in procs.items():
+                if proc.poll() is not None and not stopping:
+                    logger.error(f"Worker on port {port} exited ({proc.returncode}); restarting")
+                    procs[port] = spawn(port)
+    finally:
+        for proc in procs.values():
+            proc.terminate()
+        for proc in procs.values():
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
 def main():
+    workers = int(os.getenv("APP_WORKERS", "1"))
+    if workers > 1:
+        run_workers(workers)
+        return
     logger.info("Launching demo")
-    demo.launch(
-        server_name="0.0.0.0",
-        server_port=int(os.getenv("PORT", 7860)),
-        favicon_path="assets/logo.png",
-        debug=True,
-        show_error=True,
-    )
+    uvicorn.run(create_app(), host="0.0.0.0", port=int(os.getenv("PORT", 7860)))
 
 
 if __name__ == "__main__":
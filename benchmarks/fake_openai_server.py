@@ -0,0 +1,150 @@
+"""Local OpenAI-compatible HTTP server with configurable latencies.
+
+Serves ``POST /v1/chat/completions`` in both JSON and SSE streaming form so the
+real ``OpenAI``/``AsyncOpenAI`` clients can be load-tested without network
+access. Runs on its own event loop in a background thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from typing import Optional, Sequence
+
+
+class FakeOpenAIServer:
+    def __init__(
+        self,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        guardrail_ms: float = 400,
+        stream_open_ms: float = 300,
+        token_ms: float = 15,
+        tokens: Sequence[str] = tuple(f"token{i} " for i in range(40)),
+        guardrail_verdict: str = "True",
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.guardrail_ms = guardrail_ms
+        self.stream_open_ms = stream_open_ms
+        self.token_ms = token_ms
+        self.tokens = list(tokens)
+        self.guardrail_verdict = guardrail_verdict
+        self.requests = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Server internals
+    # ------------------------------------------------------------------
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                payload = json.loads(body or b"{}")
+                if payload.get("stream"):
+                    await self._stream_completion(writer, payload)
+                else:
+                    await self._completion(writer, payload)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _completion(self, writer: asyncio.StreamWriter, payload: dict) -> None:
+        await asyncio.sleep(self.guardrail_ms / 1000)
+        body = json.dumps(
+            {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": 0,
+                "model": payload.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": self.guardrail_verdict},
+                        "finish_reason": "stop",
+                    }
+                ],
+            }
+        ).encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+
+    async def _stream_completion(self, writer: asyncio.StreamWriter, payload: dict) -> None:
+        await asyncio.sleep(self.stream_open_ms / 1000)
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+
+        def chunk(delta: dict, finish_reason: Optional[str] = None) -> bytes:
+            event = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": payload.get("model", "fake"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            data = f"data: {json.dumps(event)}\n\n".encode()
+            return f"{len(data):x}\r\n".encode() + data + b"\r\n"
+
+        for token in self.tokens:
+            writer.write(chunk({"role": "assistant", "content": token}))
+            await writer.drain()
+            await asyncio.sleep(self.token_ms / 1000)
+        writer.write(chunk({}, "stop"))
+        done = b"data: [DONE]\n\n"
+        writer.write(f"{len(done):x}\r\n".encode() + done + b"\r\n" + b"0\r\n\r\n")
+        await writer.drain()
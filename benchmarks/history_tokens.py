@@ -0,0 +1,108 @@
+"""Prompt tokens per turn over a scripted 50-turn conversation.
+
+Replays the same conversation through ``Me.chat`` with the full history
+forwarded every turn (unbounded) and with the token-budgeted history manager
+(compacted), and reports the prompt tokens sent to the chat model. The summary
+model is replaced by a local stub that keeps the first sentence of every
+folded message, so no network access is needed.
+
+Usage:
+    python -m benchmarks.history_tokens --turns 50 --keep-turns 6 --budget 4000
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from tests.fakes import FakeOpenAI, FakeVectorDB
+from utils.answer_cache import AnswerCache
+from utils.chat import Me
+from utils.guardrails import TieredGuardrail
+from utils.history import HistoryManager
+from utils.tokenizer import count_message_tokens
+
+QUESTIONS = [
+    "What did you work on at AstraZeneca?",
+    "Which Python libraries do you reach for first?",
+    "How do you evaluate a RAG system before shipping it?",
+    "Have you built agents with tool calling?",
+    "What does a typical automation project look like for you?",
+]
+ANSWER = (
+    "Great question! In short, I focus on practical, well-tested pipelines. "
+    + "I usually start with a small prototype, measure it against real examples, "
+    "and iterate with the people who will use it every day. " * 4
+)
+SNIPPETS = [
+    "Daniel Halwell is a scientist-turned-AI engineer who builds RAG systems. " * 6,
+    "At AstraZeneca Daniel automated analytical chemistry workflows in Python. " * 6,
+]
+
+
+def stub_summarizer(summary: str, messages: list[dict]) -> str:
+    firsts = [m["content"].split(". ")[0][:120] for m in messages]
+    return (summary + "\n" + "\n".join(firsts)).strip()[-2000:]
+
+
+def run(args, compacted: bool) -> list[int]:
+    """Return prompt tokens sent to the chat model at each turn."""
+
+    client = FakeOpenAI(tokens=[ANSWER])
+    manager = (
+        HistoryManager(
+            summarizer=stub_summarizer, keep_turns=args.keep_turns, total_budget=args.budget
+        )
+        if compacted
+        else HistoryManager(keep_turns=10**9, total_budget=None)
+    )
+    me = Me(
+        openai_client=client,
+        vector_db=FakeVectorDB(documents=SNIPPETS),
+        answer_cache=AnswerCache(max_entries=0),
+        guardrails=TieredGuardrail.llm_only(),
+        history_manager=manager,
+    )
+    history: list[dict] = [{"role": "assistant", "content": "Hi! Ask me anything."}]
+    tokens = []
+    for turn in range(args.turns):
+        question = f"{QUESTIONS[turn % len(QUESTIONS)]} (follow-up {turn})"
+        *_, answer = me.chat(question, history)
+        prompt = [call for call in client.calls if "tools" in call][-1]["messages"]
+        tokens.append(count_message_tokens(prompt))
+        history += [
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": answer},
+        ]
+    return tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--keep-turns", type=int, default=6)
+    parser.add_argument("--budget", type=int, default=4000)
+    args = parser.parse_args()
+
+    results = {label: run(args, label == "compacted") for label in ("unbounded", "compacted")}
+    print(f"{'turn':>5} {'unbounded':>10} {'compacted':>10}")
+    for turn in sorted({0, 9, 19, 29, 39, args.turns - 1}):
+        if turn < args.turns:
+            print(
+                f"{turn + 1:>5} {results['unbounded'][turn]:>10} {results['compacted'][turn]:>10}"
+            )
+    for label, tokens in results.items():
+        print(
+            f"{label:>10}: total={sum(tokens)} mean={statistics.mean(tokens):.0f}"
+            f" max={max(tokens)} tokens/turn"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Import-time profile of the app's startup path (``python -X importtime``).
+
+Runs the import in a fresh interpreter and prints the modules with the
+largest cumulative import time, so regressions in cold-start time can be
+traced to the import that caused them. ``tests/test_startup.py`` checks the
+same profile against a budget.
+
+Usage:
+    python -m benchmarks.import_profile --module app --top 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+
+
+def profile_imports(module: str) -> dict[str, tuple[int, int]]:
+    """Import ``module`` in a subprocess; return ``{name: (self_us, cumulative_us)}``."""
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    # Startup must not depend on credentials; nothing may call the API at import
+    env.pop("OPENAI_API_KEY", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=project_root,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    profile: dict[str, tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        if self_us.strip().isdigit():
+            profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    profile = profile_imports(args.module)
+    total = profile[args.module][1] / 1e6
+    print(f"import {args.module}: {total:.2f} s cumulative, {len(profile)} modules")
+    ranked = sorted(profile.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in ranked[: args.top]:
+        print(f"{cumulative_us / 1000:9.1f} ms  {self_us / 1000:8.1f} ms self  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Concurrent-session load test for the chat pipeline.
+
+Starts a local fake OpenAI-compatible server and reports p50/p95
+time-to-first-token for ``Me.achat`` on a single event loop, alongside the
+sync ``Me.chat`` running on a thread pool the size of Gradio's default.
+
+Usage:
+    python -m benchmarks.load_test --sessions 1 50 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from openai import AsyncOpenAI, OpenAI
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from tests.fakes import FakeVectorDB
+from utils.answer_cache import AnswerCache
+from utils.chat import Me
+from utils.guardrails import TieredGuardrail
+
+QUESTION = "Tell me about your last role"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def build_me(server: FakeOpenAIServer, retrieval_ms: float) -> Me:
+    return Me(
+        openai_client=OpenAI(base_url=server.base_url, api_key="test", max_retries=0),
+        async_openai_client=AsyncOpenAI(
+            base_url=server.base_url, api_key="test", max_retries=0
+        ),
+        vector_db=FakeVectorDB(latency=retrieval_ms / 1000),
+        # Every session asks the same question; measure generation, not cache hits
+        answer_cache=AnswerCache(max_entries=0),
+        guardrails=TieredGuardrail.llm_only(),
+    )
+
+
+async def run_async(me: Me, sessions: int) -> list[float]:
+    async def session() -> float:
+        start = time.perf_counter()
+        ttft = None
+        async for _ in me.achat(QUESTION, []):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+        return ttft * 1000
+
+    return list(await asyncio.gather(*(session() for _ in range(sessions))))
+
+
+def run_threads(me: Me, sessions: int, workers: int) -> list[float]:
+    def session(submitted: float) -> float:
+        ttft = None
+        for _ in me.chat(QUESTION, []):
+            if ttft is None:
+                ttft = time.perf_counter() - submitted
+        return ttft * 1000
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        submitted = time.perf_counter()
+        return list(pool.map(session, [submitted] * sessions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 50, 200])
+    parser.add_argument("--retrieval-ms", type=float, default=250)
+    parser.add_argument("--guardrail-ms", type=float, default=400)
+    parser.add_argument("--stream-open-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=15)
+    parser.add_argument(
+        "--threads", type=int, default=40, help="Worker threads for the sync baseline"
+    )
+    parser.add_argument("--skip-sync", action="store_true")
+    args = parser.parse_args()
+
+    # Per-turn INFO logging would dominate the measurement
+    logging.getLogger("utils.app_logging").setLevel(logging.WARNING)
+
+    with FakeOpenAIServer(
+        guardrail_ms=args.guardrail_ms,
+        stream_open_ms=args.stream_open_ms,
+        token_ms=args.token_ms,
+    ) as server:
+        print(f"{'mode':>8} {'sessions':>8} {'p50 ms':>9} {'p95 ms':>9}")
+        for sessions in args.sessions:
+            me = build_me(server, args.retrieval_ms)
+            samples = asyncio.run(run_async(me, sessions))
+            print(
+                f"{'async':>8} {sessions:>8} {percentile(samples, 50):>9.1f}"
+                f" {percentile(samples, 95):>9.1f}"
+            )
+            if not args.skip_sync:
+                samples = run_threads(me, sessions, args.threads)
+                print(
+                    f"{'threads':>8} {sessions:>8} {percentile(samples, 50):>9.1f}"
+                    f" {percentile(samples, 95):>9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
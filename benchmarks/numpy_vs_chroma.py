@@ -0,0 +1,115 @@
+"""Query latency of the in-memory NumPy index versus Chroma's HNSW index.
+
+Both engines are filled with the same random unit vectors and answer the same
+single-vector queries (the shape ``Me`` issues). Exact NumPy search is O(n)
+per query while HNSW is sub-linear, so the output shows where the crossover
+sits. Building a 1M-vector Chroma collection takes a long time, so Chroma is
+skipped above ``--chroma-max`` unless raised.
+
+Usage:
+    python -m benchmarks.numpy_vs_chroma --sizes 100,10000,1000000 --dim 256
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from utils.numpy_index import NumpyIndex
+
+
+def random_unit_vectors(rng: np.random.Generator, n: int, dim: int) -> np.ndarray:
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def time_queries(search, queries: np.ndarray) -> list[float]:
+    """Per-query latencies in milliseconds."""
+
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    return float(np.percentile(samples, pct))
+
+
+def report(label: str, n: int, build_s: float, samples: list[float]) -> None:
+    print(
+        f"{label:<6} n={n:>9,}  build {build_s:8.2f}s  "
+        f"p50 {statistics.median(samples):8.3f} ms  p95 {percentile(samples, 95):8.3f} ms"
+    )
+
+
+def bench_numpy(ids, vectors, queries, k):
+    start = time.perf_counter()
+    index = NumpyIndex(ids, vectors)
+    build_s = time.perf_counter() - start
+    samples = time_queries(
+        lambda q: index.query([q], n_results=k, include=["distances"]), queries
+    )
+    return build_s, samples
+
+
+def bench_chroma(ids, vectors, queries, k):
+    import chromadb
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = chromadb.PersistentClient(path=tmp)
+        collection = client.create_collection("bench_vectors", embedding_function=None)
+        batch = client.get_max_batch_size()
+        start = time.perf_counter()
+        for offset in range(0, len(ids), batch):
+            collection.add(
+                ids=ids[offset : offset + batch],
+                embeddings=vectors[offset : offset + batch],
+            )
+        build_s = time.perf_counter() - start
+        samples = time_queries(
+            lambda q: collection.query(
+                query_embeddings=[q.tolist()], n_results=k, include=["distances"]
+            ),
+            queries,
+        )
+    return build_s, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,10000,1000000")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--chroma-max", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    queries = random_unit_vectors(rng, args.queries, args.dim)
+    for n in (int(size) for size in args.sizes.split(",")):
+        vectors = random_unit_vectors(rng, n, args.dim)
+        ids = [f"chunk-{i}" for i in range(n)]
+        report("numpy", n, *bench_numpy(ids, vectors, queries, args.k))
+        if n <= args.chroma_max:
+            report("chroma", n, *bench_chroma(ids, vectors, queries, args.k))
+        else:
+            print(f"chroma n={n:>9,}  skipped (raise --chroma-max to include)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Memory footprint, recall and latency of quantized vector index settings.
+
+Each setting (float32, float16 or int8 codes, optionally truncated to the
+first N dimensions) is saved as ``.npy`` codes, memory-mapped back and
+searched like a published snapshot. Recall@k is measured against exact
+float32 search, with and without full-precision rescoring of the top
+``rescore * k`` candidates.
+
+Vectors come from a recording (``--vectors``: a ``.npy`` matrix or a
+``retrieval_eval --record`` ``.npz``) or are synthetic, with variance
+decaying along the dimensions so that truncation behaves roughly like a
+Matryoshka-trained model such as ``text-embedding-3-large``. Real vectors
+give the numbers to trust for truncation.
+
+Usage:
+    python -m benchmarks.quantization --count 20000 --dim 3072 --dims 0,1024,512,256
+    python -m benchmarks.quantization --vectors benchmarks/data/openai.npz
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from utils.numpy_index import NumpyIndex, normalize_rows
+from utils.quantized_index import QUANTIZATIONS, QuantizedIndex, quantize, truncate_dims
+
+
+def synthetic_vectors(rng: np.random.Generator, count: int, dim: int) -> np.ndarray:
+    scale = 1.0 / np.sqrt(np.arange(1, dim + 1, dtype=np.float32)) ** 0.5
+    return normalize_rows(rng.standard_normal((count, dim), dtype=np.float32) * scale)
+
+
+def load_vectors(path: str) -> np.ndarray:
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return normalize_rows(data["vectors"])
+    return normalize_rows(np.load(path))
+
+
+def recall(indices: np.ndarray, exact: np.ndarray) -> float:
+    k = exact.shape[1]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(indices, exact)]))
+
+
+def measure(index: QuantizedIndex, queries: np.ndarray, exact: np.ndarray, k: int) -> tuple[float, float]:
+    """``(recall@k, p50 ms)`` over single-vector queries."""
+
+    results, samples = [], []
+    for query in queries:
+        start = time.perf_counter()
+        indices, _ = index.top_k(query, k)
+        samples.append((time.perf_counter() - start) * 1000)
+        results.append(indices[0])
+    return recall(np.array(results), exact), statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", help=".npy matrix or .npz recording; synthetic if omitted")
+    parser.add_argument("--count", type=int, default=20000, help="synthetic vectors")
+    parser.add_argument("--dim", type=int, default=3072, help="synthetic dimensions")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--quantizations", default=",".join(QUANTIZATIONS))
+    parser.add_argument("--dims", default="0,1024,512,256", help="truncated dimensions; 0 = all")
+    parser.add_argument("--rescore", type=int, default=4, help="candidates rescored per result")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.vectors:
+        vectors = load_vectors(args.vectors)
+        # Held-out rows as queries, so no query finds itself
+        queries, vectors = vectors[: args.queries], vectors[args.queries :]
+    else:
+        vectors = synthetic_vectors(rng, args.count, args.dim)
+        noise = synthetic_vectors(rng, args.queries, args.dim)
+        queries = normalize_rows(vectors[: args.queries] + 0.8 * noise)
+    count, dim = vectors.shape
+    ids = [str(i) for i in range(count)]
+    exact, _ = NumpyIndex(ids, vectors, normalized=True).top_k(queries, args.k)
+
+    # Loading the same matrix from per-element Python floats, as Chroma returns it
+    as_lists = vectors.tolist()
+    start = time.perf_counter()
+    NumpyIndex(ids, as_lists)
+    list_load_s = time.perf_counter() - start
+    del as_lists
+
+    print(f"{count:,} vectors x {dim} dims, {len(queries)} queries, recall@{args.k} vs exact float32")
+    print(f"building the float32 index from Python lists: {list_load_s * 1000:.0f} ms")
+    print(
+        f"{'codes':>8} {'dims':>5} {'B/vec':>6} {'index MB':>9} {'map ms':>7} "
+        f"{'recall':>7} {'ms':>7} {'rescored':>9} {'ms':>7}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        full_path = os.path.join(directory, "embeddings.npy")
+        np.save(full_path, vectors)
+        full = np.load(full_path, mmap_mode="r")
+        for quantization in args.quantizations.split(","):
+            for dims in (int(d) for d in args.dims.split(",")):
+                dims = dims if 0 < dims < dim else dim
+                codes, scales = quantize(truncate_dims(vectors, dims), quantization)
+                codes_path = os.path.join(directory, f"codes-{quantization}-{dims}.npy")
+                np.save(codes_path, codes)
+                del codes
+                start = time.perf_counter()
+                mapped = np.load(codes_path, mmap_mode="r")
+                map_ms = (time.perf_counter() - start) * 1000
+                row = []
+                for rescore in (0, args.rescore):
+                    index = QuantizedIndex(
+                        ids, full, quantization=quantization, dims=dims, rescore=rescore,
+                        codes=mapped, scales=scales, normalized=True,
+                    )
+                    row.extend(measure(index, queries, exact, args.k))
+                print(
+                    f"{quantization:>8} {dims:5d} {index.nbytes / count:6.0f} "
+                    f"{index.nbytes / 2**20:9.1f} {map_ms:7.2f} "
+                    f"{row[0]:7.3f} {row[1]:7.2f} {row[2]:9.3f} {row[3]:7.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""Offline retrieval quality and latency for each backend and chunking setup.
+
+Indexes ``me/`` once per chunking configuration and runs the fixed question
+set in ``benchmarks/data/retrieval_questions.jsonl`` against each retrieval
+backend. A question's gold answer is given as phrases from the source text
+rather than chunk ids, because ids are content hashes that change with the
+chunking; any retrieved chunk containing one of the phrases counts as a hit.
+
+Chunking specs are ``size:overlap`` in characters for the recursive
+character splitter, or ``tsize:overlap`` in tokens for the structure-aware
+``StructuredChunker`` (e.g. ``2000:200,t200:30``).
+
+Reports recall@k (share of questions with a gold chunk in the top k), MRR,
+the tokens the top four chunks add to the prompt, and p50/p95 query latency. Embeddings come from the hashing backend by
+default, or are replayed from a recording of a real model so scores reflect
+it without network access:
+
+    python -m benchmarks.retrieval_eval --embeddings openai --record benchmarks/data/openai.npz
+    python -m benchmarks.retrieval_eval --replay benchmarks/data/openai.npz
+
+Results can be appended as one JSON line per run for tracking over time.
+
+Usage:
+    python -m benchmarks.retrieval_eval --backends chroma,numpy,lexical,hybrid,rerank \\
+        --chunking 1000:100,2000:200,4000:400,t200:30 --k 1,3,5 --output retrieval.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from utils.embedding_cache import EmbeddingCache
+from utils.embeddings import embedding_model_name, get_embedding_model
+from utils.chunking import StructuredChunker
+from utils.lexical_index import build_lexical_index
+from utils.reranker import RerankingRetriever, get_reranker
+from utils.retrieval import HybridRetriever
+from utils.tokenizer import CHAT_ENCODING, count_tokens
+from utils.vector_db import NumpyVectorDB, VectorDB
+
+QUESTIONS_PATH = project_root / "benchmarks" / "data" / "retrieval_questions.jsonl"
+DEFAULT_SOURCES = ("me/summary.txt", "me/Profile.pdf")
+BACKENDS = ("chroma", "numpy", "lexical", "hybrid", "rerank")
+# Snippets per turn in Me's prompt
+PROMPT_K = 4
+
+
+@dataclass
+class Question:
+    id: str
+    question: str
+    gold: list[str]
+
+
+def load_questions(path: Path = QUESTIONS_PATH) -> list[Question]:
+    with open(path, encoding="utf-8") as f:
+        return [Question(**json.loads(line)) for line in f if line.strip()]
+
+
+class RecordedEmbeddings:
+    """Embeddings replayed from a ``.npz`` recording of a real model.
+
+    With ``source`` set, misses are embedded by ``source`` and kept, and
+    ``save()`` writes the recording. Without it every text must already be
+    recorded, so a replayed run never touches the network.
+    """
+
+    def __init__(self, path: str, source: Any = None) -> None:
+        self.path = path
+        self.source = source
+        self.vectors: dict[str, list[float]] = {}
+        self.model = embedding_model_name(source) if source is not None else None
+        if os.path.exists(path):
+            with np.load(path) as data:
+                self.model = self.model or str(data["model"])
+                self.vectors = dict(zip(data["keys"].tolist(), data["vectors"].tolist()))
+        if self.model is None:
+            raise FileNotFoundError(f"No embedding recording at {path}")
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        missing = [text for text in dict.fromkeys(texts) if self._key(text) not in self.vectors]
+        if missing:
+            if self.source is None:
+                raise KeyError(
+                    f"{len(missing)} texts not in {self.path}; re-record with --record"
+                )
+            for text, vector in zip(missing, self.source.embed_documents(missing)):
+                self.vectors[self._key(text)] = list(vector)
+        return [self.vectors[self._key(text)] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return self.embed_query(text)
+
+    def save(self) -> None:
+        keys = sorted(self.vectors)
+        np.savez_compressed(
+            self.path,
+            model=np.array(self.model),
+            keys=np.array(keys),
+            vectors=np.array([self.vectors[key] for key in keys], dtype=np.float32),
+        )
+
+
+def _is_relevant(document: Optional[str], question: Question) -> bool:
+    return bool(document) and any(phrase in document for phrase in question.gold)
+
+
+def _percentile(samples: Sequence[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def parse_chunking(spec: str) -> tuple[str, int, int]:
+    """``"2000:200"`` -> ``("recursive", 2000, 200)``; ``"t200:30"`` -> ``("structured", 200, 30)``."""
+
+    chunker = "structured" if spec.startswith("t") else "recursive"
+    size, overlap = (int(n) for n in spec.lstrip("t").split(":"))
+    return chunker, size, overlap
+
+
+def make_splitter(spec: str) -> Any:
+    chunker, size, overlap = parse_chunking(spec)
+    if chunker == "structured":
+        return StructuredChunker(chunk_tokens=size, overlap_tokens=overlap)
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap)
+
+
+def build_index(
+    directory: str,
+    embeddings: Any,
+    chunking: str,
+    sources: Sequence[str],
+) -> VectorDB:
+    """Ingest ``sources`` into a fresh collection under ``directory``."""
+
+    from utils.text_processing import DocumentProcessing
+
+    vector_db = VectorDB(
+        collection_name="retrieval_eval",
+        persist_directory=directory,
+        embedding_model=embeddings,
+        query_cache=EmbeddingCache(max_entries=0),
+    )
+    processing = DocumentProcessing(
+        vector_db=vector_db,
+        text_splitter=make_splitter(chunking),
+    )
+    for source in sources:
+        processing.create_vector_db_from_file(os.path.join(project_root, source))
+    build_lexical_index(vector_db)
+    return vector_db
+
+
+def _searcher(backend: str, vector_db: VectorDB, directory: str, embeddings: Any, depth: int):
+    """Return ``search(question) -> ranked documents`` for ``backend``."""
+
+    if backend == "chroma":
+        return lambda q: vector_db.query(q, k=depth, include=["documents"])["documents"][0]
+    numpy_db = NumpyVectorDB(
+        collection_name=vector_db.collection_name,
+        persist_directory=directory,
+        embedding_model=embeddings,
+        query_cache=EmbeddingCache(max_entries=0),
+    )
+    if backend == "numpy":
+        return lambda q: numpy_db.query(q, k=depth, include=["documents"])["documents"][0]
+    if backend == "rerank":
+        # Over-fetch from hybrid, rerank, no token budget so recall@k stays comparable
+        first_stage = HybridRetriever(numpy_db, candidates=depth, embed_timeout=None)
+        retriever = RerankingRetriever(
+            first_stage, get_reranker(), fetch_k=max(12, depth), token_budget=10**9, budget_ms=None
+        )
+    else:
+        retriever = HybridRetriever(numpy_db, mode=backend, candidates=depth, embed_timeout=None)
+    return lambda q: retriever.query(q, k=depth)["documents"][0]
+
+
+def evaluate_backend(
+    search,
+    questions: Sequence[Question],
+    ks: Sequence[int],
+    *,
+    repeats: int = 3,
+) -> dict[str, Any]:
+    """Quality and latency of ``search`` over ``questions``."""
+
+    depth = max(ks)
+    ranks: dict[str, Optional[int]] = {}
+    latencies: list[float] = []
+    context_tokens: list[int] = []
+    for question in questions:
+        search(question.question)  # warm-up: first-query loads are not query latency
+        for _ in range(repeats):
+            start = time.perf_counter()
+            documents = search(question.question)
+            latencies.append((time.perf_counter() - start) * 1000)
+        context_tokens.append(
+            sum(count_tokens(doc or "", CHAT_ENCODING) for doc in documents[:PROMPT_K])
+        )
+        ranks[question.id] = next(
+            (rank for rank, doc in enumerate(documents[:depth], 1) if _is_relevant(doc, question)),
+            None,
+        )
+    found = [rank for rank in ranks.values() if rank is not None]
+    result: dict[str, Any] = {
+        f"recall@{k}": sum(rank <= k for rank in found) / len(questions) for k in ks
+    }
+    result["mrr"] = sum(1.0 / rank for rank in found) / len(questions)
+    result["context_tokens"] = statistics.mean(context_tokens)
+    result["p50_ms"] = statistics.median(latencies)
+    result["p95_ms"] = _percentile(latencies, 0.95)
+    result["misses"] = sorted(qid for qid, rank in ranks.items() if rank is None)
+    return result
+
+
+def evaluate(
+    embeddings: Any,
+    *,
+    backends: Sequence[str] = BACKENDS,
+    chunking: Sequence[str] = ("2000:200",),
+    ks: Sequence[int] = (1, 3, 5),
+    questions: Optional[Sequence[Question]] = None,
+    sources: Sequence[str] = DEFAULT_SOURCES,
+    repeats: int = 3,
+) -> list[dict[str, Any]]:
+    """One result row per (chunking, backend) combination."""
+
+    questions = list(questions or load_questions())
+    rows = []
+    for spec in chunking:
+        chunker, chunk_size, chunk_overlap = parse_chunking(spec)
+        with tempfile.TemporaryDirectory() as directory:
+            vector_db = build_index(directory, embeddings, spec, sources)
+            for backend in backends:
+                search = _searcher(backend, vector_db, directory, embeddings, max(ks))
+                row = {
+                    "backend": backend,
+                    "chunking": spec,
+                    "chunker": chunker,
+                    "chunk_size": chunk_size,
+                    "chunk_overlap": chunk_overlap,
+                    "chunks": vector_db.count(),
+                }
+                row.update(evaluate_backend(search, questions, ks, repeats=repeats))
+                rows.append(row)
+    return rows
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument(
+        "--chunking",
+        default="1000:100,2000:200,4000:400,t200:30",
+        help="size:overlap in characters or tsize:overlap in tokens, comma-separated",
+    )
+    parser.add_argument("--k", default="1,3,5")
+    parser.add_argument("--embeddings", default="hashing", help="EMBEDDING_BACKEND to use or record")
+    parser.add_argument("--record", help="record the embeddings used to this .npz file")
+    parser.add_argument("--replay", help="replay embeddings from a .npz recording (offline)")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per question")
+    parser.add_argument("--output", help="append the run as one JSON line to this file")
+    args = parser.parse_args()
+
+    if args.replay:
+        embeddings = RecordedEmbeddings(args.replay)
+    elif args.record:
+        embeddings = RecordedEmbeddings(args.record, get_embedding_model(args.embeddings))
+    else:
+        embeddings = get_embedding_model(args.embeddings)
+    ks = [int(k) for k in args.k.split(",")]
+    chunking = [spec for spec in args.chunking.split(",") if spec]
+    backends = [name for name in args.backends.split(",") if name]
+    for name in backends:
+        if name not in BACKENDS:
+            parser.error(f"unknown backend {name!r}; choose from {', '.join(BACKENDS)}")
+
+    questions = load_questions()
+    rows = evaluate(
+        embeddings, backends=backends, chunking=chunking, ks=ks,
+        questions=questions, repeats=args.repeats,
+    )
+    if args.record:
+        embeddings.save()
+
+    model = embedding_model_name(embeddings)
+    print(f"{len(questions)} questions, embeddings: {model}")
+    header = f"{'backend':8} {'chunking':>10} {'chunks':>6} " + " ".join(
+        f"{'R@' + str(k):>6}" for k in ks
+    ) + f" {'MRR':>6} {'ctx tok':>8} {'p50 ms':>8} {'p95 ms':>8}"
+    print(header)
+    for row in rows:
+        recalls = " ".join(f"{row[f'recall@{k}']:6.2f}" for k in ks)
+        print(
+            f"{row['backend']:8} {row['chunking']:>10} {row['chunks']:6d} {recalls} "
+            f"{row['mrr']:6.3f} {row['context_tokens']:8.0f} {row['p50_ms']:8.3f} {row['p95_ms']:8.3f}"
+        )
+
+    if args.output:
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "embedding_model": model,
+            "questions": len(questions),
+            "results": rows,
+        }
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"Appended results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Bytes and CPU spent streaming a 2k-token answer to the UI, per flush policy.
+
+Streams a long answer from the stubbed OpenAI client through ``Me.chat`` and
+feeds every yield to the same serialization the Gradio server does for a
+chatbot: the message list is diffed against the previous one
+(``gradio.utils.diff``) and JSON-encoded. Per-token flushing (``--intervals``
+containing 0, the old behaviour) is compared with time-based coalescing.
+"full bytes" is what re-sending the whole text on each update would cost,
+"wire bytes" is the diffed payload, and CPU is process time for the whole
+turn, including the server-side diffing.
+
+Usage:
+    python -m benchmarks.stream_output --tokens 2000 --token-ms 2 --intervals 0,30,100
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from tests.fakes import FakeOpenAI, FakeVectorDB
+from utils.answer_cache import AnswerCache
+from utils.chat import Me
+from utils.conversation_log import ConversationLog
+from utils.guardrails import TieredGuardrail
+from utils.metrics import NullMetrics
+from utils.streaming import StreamBuffer
+
+
+def answer_tokens(count: int) -> list[str]:
+    """``count`` word-sized tokens of realistic prose from the profile."""
+
+    words = (project_root / "me" / "summary.txt").read_text(encoding="utf-8").split()
+    return [" " + words[i % len(words)] for i in range(count)]
+
+
+def measure(interval_ms: float, tokens: list[str], token_ms: float) -> dict[str, float]:
+    from gradio.utils import diff
+
+    me = Me(
+        openai_client=FakeOpenAI(tokens=tokens, token_latency=token_ms / 1000),
+        vector_db=FakeVectorDB(),
+        answer_cache=AnswerCache(max_entries=0),
+        guardrails=TieredGuardrail.llm_only(),
+        conversation_log=ConversationLog(None),
+        metrics=NullMetrics(),
+        stream_buffer=lambda: StreamBuffer(interval=interval_ms / 1000),
+    )
+    question = {"role": "user", "content": "Tell me your whole life story"}
+    previous = None
+    updates = wire_bytes = full_bytes = 0
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    ttft = None
+    for text in me.chat(question["content"], []):
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        value = [question, {"role": "assistant", "content": text}]
+        payload = value if previous is None else diff(previous, value)
+        wire_bytes += len(json.dumps(payload))
+        full_bytes += len(json.dumps(value))
+        previous = value
+        updates += 1
+    return {
+        "updates": updates,
+        "wire_kb": wire_bytes / 1024,
+        "full_kb": full_bytes / 1024,
+        "cpu_ms": (time.process_time() - cpu_start) * 1000,
+        "ttft_ms": (ttft or 0.0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--token-ms", type=float, default=2.0, help="delay between streamed tokens")
+    parser.add_argument("--intervals", default="0,30,100", help="flush intervals in ms; 0 = per token")
+    args = parser.parse_args()
+
+    tokens = answer_tokens(args.tokens)
+    print(f"{args.tokens} tokens ({sum(map(len, tokens)) / 1024:.1f} KB), one every {args.token_ms} ms")
+    print(f"{'flush':>8} {'updates':>8} {'wire KB':>9} {'full KB':>10} {'CPU ms':>8} {'TTFT ms':>8}")
+    for interval in (float(i) for i in args.intervals.split(",")):
+        result = measure(interval, tokens, args.token_ms)
+        label = "token" if interval == 0 else f"{interval:g} ms"
+        print(
+            f"{label:>8} {result['updates']:8d} {result['wire_kb']:9.1f} "
+            f"{result['full_kb']:10.1f} {result['cpu_ms']:8.1f} {result['ttft_ms']:8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Time-to-first-token benchmark for ``Me.chat`` with stubbed OpenAI latencies.
+
+Compares the sequential pipeline (retrieval -> guardrails -> stream) with the
+pipelined mode where guardrails run concurrently with retrieval and the
+completion stream.
+
+Usage:
+    python -m benchmarks.ttft --runs 10 --guardrail-ms 400 --stream-open-ms 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from tests.fakes import FakeOpenAI, FakeVectorDB
+from utils.answer_cache import AnswerCache
+from utils.chat import Me
+from utils.guardrails import TieredGuardrail
+
+
+def measure(pipeline: bool, args) -> list[float]:
+    """Return time-to-first-token samples in milliseconds."""
+
+    samples = []
+    for _ in range(args.runs):
+        client = FakeOpenAI(
+            guardrail_latency=args.guardrail_ms / 1000,
+            stream_open_latency=args.stream_open_ms / 1000,
+            token_latency=args.token_ms / 1000,
+        )
+        me = Me(
+            openai_client=client,
+            vector_db=FakeVectorDB(latency=args.retrieval_ms / 1000),
+            pipeline_guardrails=pipeline,
+            answer_cache=AnswerCache(max_entries=0),
+            guardrails=TieredGuardrail.llm_only(),
+        )
+        start = time.perf_counter()
+        stream = me.chat("Tell me about your last role", [])
+        next(iter(stream))
+        samples.append((time.perf_counter() - start) * 1000)
+        stream.close()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--retrieval-ms", type=float, default=250)
+    parser.add_argument("--guardrail-ms", type=float, default=400)
+    parser.add_argument("--stream-open-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=15)
+    args = parser.parse_args()
+
+    for label, pipeline in (("sequential", False), ("pipelined", True)):
+        samples = measure(pipeline, args)
+        print(
+            f"{label:>10}: p50={statistics.median(samples):7.1f} ms"
+            f"  max={max(samples):7.1f} ms  (n={len(samples)})"
+        )
+
+
+if __name__ == "__main__":
+    main()
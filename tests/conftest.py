@@ -0,0 +1,11 @@
+"""Keep test runs out of the application's real log files.
+
+Set before any ``utils`` module is imported: ``setup_logging`` opens the
+log file once per process, and every ``Me`` built without an explicit
+``conversation_log`` shares the process-wide one configured from the env.
+"""
+
+import os
+
+os.environ["LOG_FILE"] = ""
+os.environ["CONVERSATION_LOG_PATH"] = ""
@@ -0,0 +1,232 @@
+"""Offline stand-ins for the OpenAI client and vector store.
+
+Used by the unit tests and the benchmarks so the chat pipeline can be
+exercised without network access. Latencies are configurable so timing
+behaviour (e.g. time-to-first-token) can be measured deterministically.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence
+
+from utils.embeddings import HashingEmbeddings
+
+
+def _event(content=None, tool_calls=None, finish_reason=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)]
+    )
+
+
+def _tool_call_delta(index, call_id, name, arguments):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    return SimpleNamespace(index=index, id=call_id, function=function)
+
+
+class FakeStream:
+    """Iterable of chat completion chunks with an optional per-token delay."""
+
+    def __init__(self, turn: Dict[str, Any], token_latency: float):
+        self._turn = turn
+        self._token_latency = token_latency
+        self.closed = False
+        self.events_sent = 0
+
+    def __iter__(self):
+        for event in self._events():
+            if self._token_latency and event.choices[0].delta.content:
+                time.sleep(self._token_latency)
+            if self.closed:
+                return
+            self.events_sent += 1
+            yield event
+
+    def _events(self):
+        for token in self._turn.get("tokens", []):
+            yield _event(content=token)
+        tool_calls = self._turn.get("tool_calls") or []
+        for idx, (name, arguments) in enumerate(tool_calls):
+            yield _event(
+                tool_calls=[
+                    _tool_call_delta(idx, f"call_{idx}", name, json.dumps(arguments))
+                ]
+            )
+        yield _event(finish_reason="tool_calls" if tool_calls else "stop")
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeCompletions:
+    def __init__(self, client: "FakeOpenAI"):
+        self._client = client
+
+    def create(self, *, model, messages, stream=False, **kwargs):
+        client = self._client
+        client.calls.append({"model": model, "messages": list(messages), **kwargs})
+        if not stream:
+            if client.guardrail_latency:
+                time.sleep(client.guardrail_latency)
+            message = SimpleNamespace(content=client.guardrail_verdict)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        if client.stream_open_latency:
+            time.sleep(client.stream_open_latency)
+        turn = client.turns.pop(0) if client.turns else {"tokens": client.tokens}
+        fake_stream = FakeStream(turn, client.token_latency)
+        client.streams.append(fake_stream)
+        return fake_stream
+
+
+class FakeOpenAI:
+    """Minimal synchronous ``OpenAI`` client replacement.
+
+    Non-streaming calls are treated as guardrail classifications and return
+    ``guardrail_verdict``. Streaming calls replay ``turns`` in order (each a
+    dict with ``tokens`` and optional ``tool_calls`` as ``(name, args)``
+    pairs), then fall back to streaming ``tokens``.
+    """
+
+    def __init__(
+        self,
+        *,
+        tokens: Sequence[str] = ("Hello", " there", "!"),
+        turns: Optional[List[Dict[str, Any]]] = None,
+        guardrail_verdict: str = "True",
+        guardrail_latency: float = 0.0,
+        stream_open_latency: float = 0.0,
+        token_latency: float = 0.0,
+    ):
+        self.tokens = list(tokens)
+        self.turns = list(turns or [])
+        self.guardrail_verdict = guardrail_verdict
+        self.guardrail_latency = guardrail_latency
+        self.stream_open_latency = stream_open_latency
+        self.token_latency = token_latency
+        self.calls: List[Dict[str, Any]] = []
+        self.streams: List[FakeStream] = []
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+
+
+class FakeAsyncStream(FakeStream):
+    """Async iterable variant of ``FakeStream`` matching ``AsyncStream``."""
+
+    async def __aiter__(self):
+        for event in self._events():
+            if self._token_latency and event.choices[0].delta.content:
+                await asyncio.sleep(self._token_latency)
+            if self.closed:
+                return
+            self.events_sent += 1
+            yield event
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeAsyncCompletions:
+    def __init__(self, client: "FakeAsyncOpenAI"):
+        self._client = client
+
+    async def create(self, *, model, messages, stream=False, **kwargs):
+        client = self._client
+        client.calls.append({"model": model, "messages": list(messages), **kwargs})
+        if not stream:
+            if client.guardrail_latency:
+                await asyncio.sleep(client.guardrail_latency)
+            message = SimpleNamespace(content=client.guardrail_verdict)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        if client.stream_open_latency:
+            await asyncio.sleep(client.stream_open_latency)
+        turn = client.turns.pop(0) if client.turns else {"tokens": client.tokens}
+        fake_stream = FakeAsyncStream(turn, client.token_latency)
+        client.streams.append(fake_stream)
+        return fake_stream
+
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    """``AsyncOpenAI`` replacement sharing ``FakeOpenAI``'s configuration."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.chat = SimpleNamespace(completions=_FakeAsyncCompletions(self))
+
+
+class FakeCollection:
+    def peek(self, limit=10):
+        return {"documents": [], "metadatas": []}
+
+
+class FakeVectorDB:
+    """Vector store stand-in returning a fixed set of snippets."""
+
+    def __init__(self, *, latency: float = 0.0, documents: Sequence[str] = ()):
+        self.latency = latency
+        self.documents = list(documents) or ["I am Daniel, an AI engineer."]
+        self.collection = FakeCollection()
+        self.queries: List[Any] = []
+        self.embeddings = HashingEmbeddings(dim=64)
+
+    def query(self, query_texts, *, k=5, include=None):
+        self.queries.append(query_texts)
+        if self.latency:
+            time.sleep(self.latency)
+        return self._results(k)
+
+    async def aquery(self, query_texts, *, k=5, include=None):
+        self.queries.append(query_texts)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._results(k)
+
+    def embed_queries(self, query_texts):
+        return self.embeddings.embed_documents(list(query_texts))
+
+    async def aembed_queries(self, query_texts):
+        return self.embed_queries(query_texts)
+
+    def _results(self, k):
+        docs = self.documents[:k]
+        return {
+            "ids": [[f"doc_{i}" for i in range(len(docs))]],
+            "documents": [docs],
+            "metadatas": [[{"source": "me/summary.txt", "chunk_id": i} for i in range(len(docs))]],
+            "distances": [[0.1 * (i + 1) for i in range(len(docs))]],
+        }
+
+
+class CountingEmbeddings:
+    """Deterministic embedding model that records every embedding request."""
+
+    def __init__(self, dim: int = 8, model: str = "counting-fake"):
+        self.dim = dim
+        self.model = model
+        self.query_calls: List[str] = []
+        self.document_calls: List[List[str]] = []
+
+    def _vector(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [digest[i % len(digest)] / 255.0 for i in range(self.dim)]
+
+    @property
+    def calls(self) -> int:
+        return len(self.query_calls) + len(self.document_calls)
+
+    def embed_query(self, text: str) -> List[float]:
+        self.query_calls.append(text)
+        return self._vector(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.document_calls.append(list(texts))
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
@@ -0,0 +1,156 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from tests.fakes import FakeAsyncOpenAI, FakeOpenAI, FakeVectorDB
+from utils.answer_cache import AnswerCache, contains_personal_details, replay_prefixes
+from utils.chat import Me
+from utils.guardrails import TieredGuardrail
+
+
+class TestAnswerCache(unittest.TestCase):
+    def test_exact_and_semantic_hits(self):
+        cache = AnswerCache(threshold=0.9)
+        cache.put("Tell me about your last role", [1.0, 0.0], "At AstraZeneca...", "v1")
+        hit = cache.lookup("tell me about  your last role", [0.0, 1.0], "v1")
+        self.assertTrue(hit.exact)
+        hit = cache.lookup("What was your last job?", [0.95, 0.1], "v1")
+        self.assertFalse(hit.exact)
+        self.assertEqual(hit.entry.answer, "At AstraZeneca...")
+        self.assertIsNone(cache.lookup("Favourite food?", [0.2, 0.98], "v1"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 2 / 3)
+
+    def test_version_change_invalidates(self):
+        cache = AnswerCache()
+        cache.put("q", [1.0, 0.0], "a", "v1")
+        self.assertIsNone(cache.lookup("q", [1.0, 0.0], "v2"))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_entries_expire(self):
+        now = [0.0]
+        cache = AnswerCache(ttl_seconds=10, clock=lambda: now[0])
+        cache.put("q", [1.0, 0.0], "a", None)
+        now[0] = 11.0
+        self.assertIsNone(cache.lookup("q", [1.0, 0.0], None))
+
+    def test_disabled(self):
+        cache = AnswerCache(max_entries=0)
+        cache.put("q", [1.0], "a", None)
+        self.assertIsNone(cache.lookup("q", [1.0], None))
+
+    def test_personal_details_are_not_stored_or_matched(self):
+        cache = AnswerCache(threshold=0.9)
+        cache.put("Hi, I'm Sarah from Acme, are you open to roles?", [1.0, 0.0], "Hi Sarah...", "v1")
+        self.assertEqual((len(cache._entries), cache.stats()["personal_skips"]), (0, 1))
+        cache.put("Are you open to roles?", [1.0, 0.0], "Yes, I am.", "v1")
+        self.assertIsNone(cache.lookup("Hi, I'm Tom from Globex, are you open to roles?", [1.0, 0.0], "v1"))
+        self.assertIsNotNone(cache.lookup("are you open to roles?", [0.0, 1.0], "v1"))
+        for message in (
+            "Hi, I'm Sarah from Acme, are you open to roles?",
+            "I work at Globex and we're hiring",
+            "Reach me on sarah@acme.com",
+            "Call me on +44 7700 900123",
+        ):
+            self.assertTrue(contains_personal_details(message), message)
+        for message in ("Tell me about your last role", "What did you do at AstraZeneca in 2019-2021?"):
+            self.assertFalse(contains_personal_details(message), message)
+
+    def test_replay_prefixes_end_with_full_answer(self):
+        prefixes = list(replay_prefixes("  Happy to share: I build RAG systems.\n"))
+        self.assertEqual(prefixes[-1], "  Happy to share: I build RAG systems.\n")
+        self.assertEqual(len(prefixes), 3)
+        self.assertTrue(all(b.startswith(a) for a, b in zip(prefixes, prefixes[1:])))
+
+
+class TestChatAnswerCache(unittest.TestCase):
+    def _me(self, client, **kwargs):
+        return Me(
+            openai_client=client,
+            vector_db=FakeVectorDB(),
+            answer_cache=AnswerCache(threshold=0.8),
+            pipeline_guardrails=False,
+            **kwargs,
+        )
+
+    def test_repeat_question_replays_without_api_calls(self):
+        client = FakeOpenAI(tokens=["I led ", "RAG work ", "at AstraZeneca."])
+        me = self._me(client)
+        first = list(me.chat("Tell me about your last role", []))
+        calls = len(client.calls)
+        greeting = [{"role": "assistant", "content": "Hello, nice to meet you!"}]
+        second = list(me.chat("Tell me about your last role", greeting))
+        self.assertEqual(second[-1], first[-1])
+        self.assertEqual(len(client.calls), calls)
+        self.assertEqual(me.answer_cache.stats()["exact_hits"], 1)
+
+    def test_semantic_hit_still_runs_guardrails(self):
+        client = FakeOpenAI(tokens=["Python, ", "pandas and FastAPI."])
+        me = self._me(client, guardrails=TieredGuardrail.llm_only())
+        list(me.chat("What Python libraries are you familiar with?", []))
+        calls = len(client.calls)
+        outputs = list(me.chat("Which Python libraries are you familiar with?", []))
+        self.assertEqual(outputs[-1], "Python, pandas and FastAPI.")
+        self.assertEqual([call["model"] for call in client.calls[calls:]], ["gpt-4o"])
+
+    def test_follow_up_turns_are_not_cached(self):
+        client = FakeOpenAI()
+        me = self._me(client)
+        history = [
+            {"role": "user", "content": "Hi"},
+            {"role": "assistant", "content": "Hello!"},
+        ]
+        list(me.chat("Tell me more", history))
+        list(me.chat("Tell me more", history))
+        self.assertEqual(me.answer_cache.stats()["lookups"], 0)
+        self.assertEqual(len(client.streams), 2)
+
+    def test_tool_turns_are_not_cached(self):
+        client = FakeOpenAI(
+            turns=[
+                {"tool_calls": [("record_unknown_question", {"question": "Favourite food?"})]},
+                {"tokens": ["I'll find out!"]},
+            ]
+        )
+        me = self._me(client)
+        with mock.patch.object(me.conversation_log, "log_turn"), mock.patch("utils.tool_calls.push"):
+            list(me.chat("Favourite food?", []))
+        self.assertEqual(me.answer_cache.stats()["stores"], 0)
+
+    def test_introductions_are_not_replayed_to_other_visitors(self):
+        client = FakeOpenAI(tokens=["Hi Sarah, ", "yes I am."])
+        me = self._me(client)
+        list(me.chat("Hi, I'm Sarah from Acme, are you open to roles?", []))
+        list(me.chat("Hi, I'm Sarah from Acme, are you open to roles?", []))
+        self.assertEqual(me.answer_cache.stats()["hits"], 0)
+        self.assertEqual(len(client.streams), 2)
+
+    def test_async_chat_uses_cache(self):
+        client = FakeAsyncOpenAI(tokens=["Hi", " there"])
+        me = Me(
+            openai_client=FakeOpenAI(),
+            async_openai_client=client,
+            vector_db=FakeVectorDB(),
+            answer_cache=AnswerCache(),
+            pipeline_guardrails=False,
+        )
+
+        async def collect():
+            return [chunk async for chunk in me.achat("hello", [])]
+
+        self.assertEqual(asyncio.run(collect())[-1], "Hi there")
+        self.assertEqual(asyncio.run(collect())[-1], "Hi there")
+        self.assertEqual(len(client.streams), 1)
+
+    def test_prewarm(self):
+        client = FakeOpenAI()
+        me = self._me(client)
+        prompts = ["Tell me about your last role", "How would you design a RAG pipeline?"]
+        self.assertEqual(me.prewarm_answer_cache(prompts), 2)
+        list(me.chat(prompts[1], []))
+        self.assertEqual(len(client.streams), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import time
+import unittest
+
+from tests.fakes import FakeAsyncOpenAI, FakeOpenAI, FakeVectorDB
+from utils.chat import Me
+from utils.guardrails import TieredGuardrail
+
+
+class TestPipelinedGuardrails(unittest.TestCase):
+    def _me(self, client, **kwargs):
+        return Me(
+            openai_client=client,
+            vector_db=FakeVectorDB(),
+            guardrails=TieredGuardrail.llm_only(),
+            **kwargs,
+        )
+
+    def test_allowed_message_streams_tokens(self):
+        client = FakeOpenAI(tokens=["Hi", " there"], guardrail_latency=0.05)
+        me = self._me(client, pipeline_guardrails=True)
+        outputs = list(me.chat("Tell me about your last role", []))
+        self.assertEqual(outputs[-1], "Hi there")
+
+    def test_blocked_message_never_leaks_tokens(self):
+        client = FakeOpenAI(
+            tokens=["secret"] * 5, guardrail_verdict="False", guardrail_latency=0.05
+        )
+        me = self._me(client, pipeline_guardrails=True)
+        outputs = list(me.chat("something inappropriate", []))
+        self.assertEqual(outputs, [me.chat_guardrails_response()])
+        self.assertTrue(all(s.closed for s in client.streams))
+
+    def test_slow_verdict_cancels_stream_mid_generation(self):
+        client = FakeOpenAI(
+            tokens=["tok"] * 50,
+            guardrail_verdict="False",
+            guardrail_latency=0.05,
+            token_latency=0.01,
+        )
+        me = self._me(client, pipeline_guardrails=True)
+        outputs = list(me.chat("something inappropriate", []))
+        self.assertEqual(outputs, [me.chat_guardrails_response()])
+        self.assertTrue(client.streams[0].closed)
+        self.assertLess(client.streams[0].events_sent, 50)
+
+    def test_pipelined_overlaps_guardrail_with_generation(self):
+        def first_token_latency(pipeline):
+            client = FakeOpenAI(guardrail_latency=0.1, stream_open_latency=0.1)
+            me = Me(
+                openai_client=client,
+                vector_db=FakeVectorDB(latency=0.05),
+                pipeline_guardrails=pipeline,
+                guardrails=TieredGuardrail.llm_only(),
+            )
+            start = time.perf_counter()
+            next(iter(me.chat("hello", [])))
+            return time.perf_counter() - start
+
+        self.assertLess(first_token_latency(True), first_token_latency(False))
+
+
+class TestAsyncChat(unittest.TestCase):
+    def _run(self, me, message):
+        async def collect():
+            return [chunk async for chunk in me.achat(message, [])]
+
+        return asyncio.run(collect())
+
+    def test_async_streams_tokens(self):
+        client = FakeAsyncOpenAI(tokens=["Hi", " there"], guardrail_latency=0.01)
+        me = Me(
+            openai_client=FakeOpenAI(),
+            async_openai_client=client,
+            guardrails=TieredGuardrail.llm_only(),
+            vector_db=FakeVectorDB(),
+        )
+        self.assertEqual(self._run(me, "hello")[-1], "Hi there")
+
+    def test_async_blocked_message_cancels_stream(self):
+        client = FakeAsyncOpenAI(
+            tokens=["tok"] * 50,
+            guardrail_verdict="False",
+            guardrail_latency=0.05,
+            token_latency=0.01,
+        )
+        me = Me(
+            openai_client=FakeOpenAI(),
+            async_openai_client=client,
+            guardrails=TieredGuardrail.llm_only(),
+            vector_db=FakeVectorDB(),
+        )
+        self.assertEqual(self._run(me, "bad"), [me.chat_guardrails_response()])
+        self.assertTrue(client.streams[0].closed)
+
+    def test_concurrent_sessions_share_one_loop(self):
+        client = FakeAsyncOpenAI(guardrail_latency=0.05, stream_open_latency=0.05)
+        me = Me(
+            openai_client=FakeOpenAI(),
+            async_openai_client=client,
+            guardrails=TieredGuardrail.llm_only(),
+            vector_db=FakeVectorDB(latency=0.05),
+        )
+
+        async def session():
+            return [chunk async for chunk in me.achat("hello", [])][-1]
+
+        async def run_many():
+            return await asyncio.gather(*(session() for _ in range(100)))
+
+        start = time.perf_counter()
+        answers = asyncio.run(run_many())
+        self.assertEqual(set(answers), {"Hello there!"})
+        self.assertLess(time.perf_counter() - start, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
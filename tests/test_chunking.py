@@ -0,0 +1,174 @@
+import os
+import tempfile
+import unittest
+
+from tests.fakes import CountingEmbeddings
+from utils.chunking import Chunk, MinHasher, StructuredChunker, deduplicate, parse_blocks
+from utils.embedding_cache import EmbeddingCache
+from utils.text_processing import DocumentProcessing
+from utils.tokenizer import count_tokens
+from utils.vector_db import VectorDB
+
+NARRATIVE = """Daniel — Life Story
+
+[Metadata]
+Exec summary: Introduction.
+Keywords: intro
+[/Metadata]
+
+Hi, I'm Daniel. I build apps
+and automate processes.
+
+—
+Core values
+—
+[Metadata]
+Keywords: values
+[/Metadata]
+
+• Human-first technologist. Tools should
+  help people decide faster.
+• Ethics matter.
+"""
+
+PROFILE = """Summary
+I work on analytical chemistry and Python.
+Experience
+AstraZeneca
+Senior Scientist
+May 2021 - Present (4 years 5 months)
+Method development and validation.
+  Page 1 of 2
+Sanofi
+4 years 1 month
+Senior Quality Analyst
+July 2015 - September 2016 (1 year 3 months)
+Testing inhaler products and running
+of the team
+Quality Control Analyst
+September 2012 - July 2015 (2 years 11 months)
+Routine testing of nasal spray product.
+Education
+Loughborough University
+"""
+
+
+class TestParseBlocks(unittest.TestCase):
+    def test_narrative_sections_and_bullets(self):
+        blocks = parse_blocks(NARRATIVE)
+        # The annotation after the title line starts a block of its own
+        self.assertEqual([block.section for block in blocks], [None, None, "Core values"])
+        units = blocks[2].units
+        self.assertEqual(
+            units,
+            ["• Human-first technologist. Tools should help people decide faster.", "• Ethics matter."],
+        )
+        # Annotation blocks are not indexed
+        self.assertFalse(any("Keywords" in unit for block in blocks for unit in block.units))
+
+    def test_profile_roles_keep_company_and_drop_page_footers(self):
+        sections = [block.section for block in parse_blocks(PROFILE)]
+        self.assertEqual(
+            sections,
+            [
+                "Summary",
+                "Experience: AstraZeneca, Senior Scientist",
+                "Experience: Sanofi, Senior Quality Analyst",
+                "Experience: Sanofi, Quality Control Analyst",
+                "Education",
+            ],
+        )
+        text = "\n".join(unit for block in parse_blocks(PROFILE) for unit in block.units)
+        self.assertNotIn("Page 1 of 2", text)
+        self.assertNotIn("4 years 1 month\n", text)
+
+
+class TestStructuredChunker(unittest.TestCase):
+    def test_chunks_fit_the_token_budget_and_carry_section(self):
+        bullets = "\n".join(f"• Item {i} " + "detail " * 20 for i in range(20))
+        text = f"—\nSkills\n—\n{bullets}\n"
+        chunker = StructuredChunker(chunk_tokens=100, overlap_tokens=40, dedupe_threshold=0)
+        chunks = chunker.split_documents([text])
+        self.assertGreater(len(chunks), 3)
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk.text), 100)
+            self.assertTrue(chunk.text.startswith("Skills\n"))
+            self.assertEqual(chunk.metadata, {"section": "Skills"})
+            # Bullet items are never cut
+            for line in chunk.text.splitlines()[1:]:
+                self.assertTrue(line.startswith("• Item"))
+        # Consecutive chunks share their boundary item
+        self.assertEqual(chunks[0].text.splitlines()[-1], chunks[1].text.splitlines()[1])
+
+    def test_long_paragraph_is_cut_at_sentences(self):
+        text = " ".join(f"Sentence number {i} is here." for i in range(60))
+        chunks = StructuredChunker(chunk_tokens=50, overlap_tokens=0).split_documents([text])
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertTrue(chunk.text.endswith("here."))
+
+    def test_small_blocks_of_one_section_are_merged(self):
+        chunks = StructuredChunker().split_documents([NARRATIVE])
+        self.assertEqual([chunk.section for chunk in chunks], [None, "Core values"])
+        self.assertEqual(StructuredChunker().split_text(NARRATIVE), [c.text for c in chunks])
+
+    def test_pages_are_joined_so_sections_span_them(self):
+        first, second = PROFILE.split("  Page 1 of 2\n")
+        chunks = StructuredChunker().split_documents([first, second])
+        self.assertEqual(chunks, StructuredChunker().split_documents([PROFILE]))
+
+
+class TestDeduplicate(unittest.TestCase):
+    def test_near_duplicates_are_dropped(self):
+        base = "I built a retrieval augmented chatbot for laboratory knowledge management using Python and Chroma"
+        chunks = [
+            Chunk(base),
+            Chunk(base + " today"),
+            Chunk("Outside work I enjoy hiking, photography and cooking with friends at the weekend"),
+        ]
+        kept, dropped = deduplicate(chunks, threshold=0.8)
+        self.assertEqual(dropped, 1)
+        self.assertEqual([chunk.text for chunk in kept], [chunks[0].text, chunks[2].text])
+        self.assertEqual(deduplicate(chunks, threshold=0)[1], 0)
+
+    def test_signatures_are_stable(self):
+        text = "analytical chemistry meets machine learning"
+        self.assertTrue((MinHasher().signature(text) == MinHasher().signature(text)).all())
+
+
+class TestSectionMetadata(unittest.TestCase):
+    def test_ingestion_stores_section_metadata(self):
+        with tempfile.TemporaryDirectory() as directory:
+            docs = os.path.join(directory, "me")
+            os.makedirs(docs)
+            with open(os.path.join(docs, "summary.txt"), "w", encoding="utf-8") as f:
+                f.write(NARRATIVE)
+            embeddings = CountingEmbeddings()
+            processor = DocumentProcessing(
+                embeddings=embeddings,
+                vector_db=VectorDB(
+                    collection_name="test_profile",
+                    persist_directory=os.path.join(directory, "chroma"),
+                    embedding_model=embeddings,
+                    query_cache=EmbeddingCache(max_entries=0),
+                ),
+                text_splitter=StructuredChunker(),
+            )
+            processor.create_vector_db_from_directory(docs)
+            sections = {m.get("section") for m in processor.vector_db.get_all()["metadatas"]}
+            self.assertEqual(sections, {None, "Core values"})
+
+            # Unchanged files are re-chunked when the chunking settings change
+            calls = embeddings.calls
+            processor = DocumentProcessing(
+                embeddings=embeddings,
+                vector_db=processor.vector_db,
+                text_splitter=StructuredChunker(chunk_tokens=20, overlap_tokens=0),
+            )
+            processor.create_vector_db_from_directory(docs)
+            self.assertGreater(embeddings.calls, calls)
+            self.assertGreater(processor.vector_db.count(), len(sections))
+
+
+if __name__ == "__main__":
+    unittest.main()
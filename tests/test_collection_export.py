@@ -0,0 +1,148 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from utils.collection_export import export_collection, import_collection, iter_collection
+from utils.embedding_cache import EmbeddingCache
+from utils.embeddings import HashingEmbeddings
+from utils.lexical_index import lexical_index_path
+from utils.persona_context import persona_context_path
+from utils.snapshot import SnapshotVectorDB, publish_snapshot
+from utils.vector_db import EmbeddingModelMismatchError, NumpyVectorDB, VectorDB
+
+DOCUMENTS = [
+    "I build retrieval-augmented generation systems in Python",
+    "Before software I worked as an analytical chemist",
+    "I enjoy hiking and photography at the weekend",
+    "I deploy services with Docker and FastAPI",
+    "I validated HPLC methods for inhaled products",
+    "I automate laboratory data pipelines with pandas",
+    "I mentor junior scientists moving into data roles",
+]
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self, dim=256):
+        super().__init__(dim=dim)
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+class GetSpy:
+    """Wraps a collection and records the ``limit`` of every ``get``."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.limits = []
+
+    def get(self, *args, **kwargs):
+        self.limits.append(kwargs.get("limit"))
+        return self._collection.get(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+class TestCollectionExport(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.embeddings = CountingEmbeddings()
+        self.source = self._db("source", NumpyVectorDB)
+        self.source.add_documents(
+            DOCUMENTS,
+            metadatas=[{"source": "me/summary.txt", "chunk_id": i} for i in range(len(DOCUMENTS))],
+            ids=[f"id{i}" for i in range(len(DOCUMENTS))],
+        )
+        self.export_dir = os.path.join(self._tmp.name, "exports", "v1")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _db(self, name, cls=VectorDB, embedding_model=None):
+        return cls(
+            collection_name="test_profile",
+            persist_directory=os.path.join(self._tmp.name, name),
+            embedding_model=embedding_model or self.embeddings,
+            query_cache=EmbeddingCache(max_entries=0),
+        )
+
+    def _contents(self, vector_db):
+        data = vector_db.collection.get(include=["embeddings", "documents", "metadatas"])
+        order = np.argsort(data["ids"])
+        return (
+            [data["ids"][i] for i in order],
+            [data["documents"][i] for i in order],
+            [data["metadatas"][i] for i in order],
+            np.asarray(data["embeddings"], dtype=np.float32)[order],
+        )
+
+    def test_round_trip_without_reembedding(self):
+        manifest = self.source.export_collection(self.export_dir, page_size=3)
+        self.assertEqual((manifest["count"], manifest["dim"]), (7, 256))
+        with open(os.path.join(self.export_dir, "records.jsonl"), encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 7)
+
+        embedded = self.embeddings.embedded
+        target = self._db("target", NumpyVectorDB)
+        self.assertEqual(target.import_collection(self.export_dir, batch_size=2), 7)
+        self.assertEqual(self.embeddings.embedded, embedded)
+        expected, actual = self._contents(self.source), self._contents(target)
+        self.assertEqual(actual[:3], expected[:3])
+        np.testing.assert_array_equal(actual[3], expected[3])
+        self.assertEqual(target.recorded_embedding, self.source.recorded_embedding)
+        question = "What did you do before software?"
+        self.assertEqual(target.query(question, k=3)["ids"], self.source.query(question, k=3)["ids"])
+        # Derived files are rebuilt next to the imported collection
+        self.assertTrue(os.path.exists(persona_context_path(target)))
+        self.assertTrue(os.path.exists(lexical_index_path(target)))
+
+    def test_export_reads_in_pages(self):
+        spy = GetSpy(self.source.collection)
+        self.source.collection = spy
+        export_collection(self.source, self.export_dir, page_size=3)
+        self.assertTrue(spy.limits)
+        self.assertTrue(all(limit == 3 for limit in spy.limits))
+        self.assertEqual(sum(len(page["ids"]) for page in iter_collection(self.source, page_size=3)), 7)
+
+    def test_existing_target_is_not_overwritten(self):
+        os.makedirs(self.export_dir)
+        with self.assertRaises(FileExistsError):
+            self.source.export_collection(self.export_dir)
+        self.assertEqual(os.listdir(os.path.dirname(self.export_dir)), ["v1"])
+
+    def test_replace_rolls_back_to_the_export(self):
+        self.source.export_collection(self.export_dir)
+        self.source.add_documents(["A chunk added after the export"], ids=["later"], metadatas=[{"source": "x"}])
+        import_collection(self.source, self.export_dir)
+        self.assertEqual(self.source.count(), 8)
+        import_collection(self.source, self.export_dir, replace=True)
+        self.assertEqual(self.source.count(), 7)
+        self.assertFalse(self.source.existing_ids(["later"]))
+
+    def test_other_embedding_model_is_rejected(self):
+        self.source.export_collection(self.export_dir)
+        other = self._db("other", embedding_model=HashingEmbeddings(dim=128))
+        with self.assertRaises(EmbeddingModelMismatchError):
+            other.import_collection(self.export_dir)
+        self.assertEqual(other.count(), 0)
+
+    def test_export_from_snapshot_reader(self):
+        root = os.path.join(self._tmp.name, "snapshots")
+        publish_snapshot(self.source, root)
+        reader = SnapshotVectorDB(
+            persist_directory=root, embedding_model=self.embeddings, query_cache=EmbeddingCache(max_entries=0)
+        )
+        reader.export_collection(self.export_dir, page_size=2)
+        with open(os.path.join(self.export_dir, "records.jsonl"), encoding="utf-8") as f:
+            ids = [json.loads(line)["id"] for line in f]
+        self.assertEqual(sorted(ids), [f"id{i}" for i in range(7)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from tests.fakes import FakeOpenAI, FakeVectorDB
+from utils.answer_cache import AnswerCache
+from utils.chat import Me
+from utils.conversation_log import ConversationLog
+from utils.guardrails import TieredGuardrail
+
+
+def _read_jsonl(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+class TestConversationLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "conversations.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_records_are_flushed_on_close(self):
+        log = ConversationLog(self.path, flush_records=1000, flush_interval=60)
+        for i in range(10):
+            log.log_turn(message=f"q{i}", response="a")
+        log.close()
+        records = _read_jsonl(self.path)
+        self.assertEqual([r["message"] for r in records], [f"q{i}" for i in range(10)])
+        self.assertIn("ts", records[0])
+
+    def test_idle_listener_flushes(self):
+        log = ConversationLog(self.path, flush_records=1000, flush_interval=0.05)
+        log.log_turn(message="q", response="a")
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline and not _size(self.path):
+            time.sleep(0.02)
+        self.assertEqual(len(_read_jsonl(self.path)), 1)
+        log.close()
+
+    def test_rotation_gzips_old_files(self):
+        log = ConversationLog(self.path, max_bytes=2000, backup_count=2, compress=True)
+        for i in range(100):
+            log.log_turn(message=f"question {i}", response="x" * 50)
+        log.close()
+        self.assertTrue(os.path.exists(self.path + ".1.gz"))
+        self.assertFalse(os.path.exists(self.path + ".3.gz"))
+        self.assertLessEqual(os.path.getsize(self.path), 2000)
+        rotated = _read_jsonl(self.path + ".1.gz")
+        current = _read_jsonl(self.path)
+        self.assertEqual(current[-1]["message"], "question 99")
+        self.assertEqual(
+            int(rotated[-1]["message"].split()[1]) + 1, int(current[0]["message"].split()[1])
+        )
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        log = ConversationLog(self.path, queue_size=1)
+        gate = threading.Event()
+        handler = log._listener.handlers[0]
+        original = handler.emit
+        handler.emit = lambda record: (gate.wait(), original(record))
+        try:
+            start = time.perf_counter()
+            for i in range(50):
+                log.log_turn(message=f"q{i}")
+            self.assertLess(time.perf_counter() - start, 0.5)
+            self.assertGreater(log.dropped, 0)
+        finally:
+            gate.set()
+            log.close()
+
+    def test_disabled(self):
+        log = ConversationLog(None)
+        log.log_turn(message="q")
+        self.assertFalse(log.enabled)
+
+    def test_each_worker_writes_its_own_file(self):
+        with mock.patch.dict(os.environ, {"CONVERSATION_LOG_PATH": self.path, "WORKER_ID": "2"}):
+            log = ConversationLog.from_env()
+        log.log_turn(message="q")
+        log.close()
+        self.assertEqual(log.path, os.path.join(self.tmp.name, "conversations.worker2.jsonl"))
+        self.assertEqual(len(_read_jsonl(log.path)), 1)
+        self.assertFalse(os.path.exists(self.path))
+        with mock.patch.dict(os.environ, {"CONVERSATION_LOG_PATH": ""}):
+            self.assertFalse(ConversationLog.from_env().enabled)
+
+
+class TestChatConversationLog(unittest.TestCase):
+    def test_turns_are_logged_with_outcome(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "conversations.jsonl")
+            log = ConversationLog(path)
+            me = Me(
+                openai_client=FakeOpenAI(tokens=["Hi", " there"]),
+                vector_db=FakeVectorDB(),
+                answer_cache=AnswerCache(max_entries=0),
+                guardrails=TieredGuardrail.llm_only(),
+                conversation_log=log,
+            )
+            list(me.chat("Tell me about your last role", []))
+            me.openai.guardrail_verdict = "False"
+            list(me.chat("Something nasty", []))
+            log.close()
+            records = _read_jsonl(path)
+        self.assertEqual([r["outcome"] for r in records], ["answered", "blocked"])
+        self.assertEqual(records[0]["response"], "Hi there")
+        self.assertEqual(records[0]["tools"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
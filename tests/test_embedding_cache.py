@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+from utils.embedding_cache import EmbeddingCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def test_normalized_text_shares_entry(self):
+        cache = EmbeddingCache()
+        cache.put("Tell me about  your last role", "m", [0.1, 0.2])
+        self.assertEqual(cache.get("  tell me about your LAST role ", "m"), [0.1, 0.2])
+        self.assertIsNone(cache.get("Tell me about your last role", "other-model"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(max_entries=2)
+        cache.put("a", "m", [1.0])
+        cache.put("b", "m", [2.0])
+        cache.get("a", "m")
+        cache.put("c", "m", [3.0])
+        self.assertIsNone(cache.get("b", "m"))
+        self.assertEqual(cache.get("a", "m"), [1.0])
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = EmbeddingCache(ttl_seconds=10, clock=clock)
+        cache.put("a", "m", [1.0])
+        clock.now += 11
+        self.assertIsNone(cache.get("a", "m"))
+        self.assertEqual(len(cache), 0)
+
+    def test_persistent_tier_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "query_embeddings.sqlite3")
+            EmbeddingCache(persist_path=path).put("hello", "m", [0.5, 0.25])
+            warm = EmbeddingCache(persist_path=path)
+            self.assertEqual(warm.get("hello", "m"), [0.5, 0.25])
+            self.assertEqual(warm.stats()["persistent_hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
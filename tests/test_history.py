@@ -0,0 +1,101 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from tests.fakes import FakeOpenAI, FakeVectorDB
+from utils.answer_cache import AnswerCache
+from utils.chat import Me
+from utils.guardrails import TieredGuardrail
+from utils.history import SUMMARY_PREFIX, HistoryManager, split_turns
+from utils.tokenizer import count_message_tokens
+
+
+def _conversation(turns, words=20):
+    history = [{"role": "assistant", "content": "Hi, ask me anything."}]
+    for i in range(turns):
+        history.append({"role": "user", "content": f"question {i} " + "word " * words})
+        history.append({"role": "assistant", "content": f"answer {i} " + "word " * words})
+    return history
+
+
+class RecordingSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, summary, messages):
+        self.calls.append((summary, messages))
+        questions = [m["content"].split()[1] for m in messages if m["role"] == "user"]
+        return (summary + " " + " ".join(questions)).strip()
+
+
+class TestHistoryManager(unittest.TestCase):
+    def test_greeting_joins_first_turn(self):
+        turns = split_turns(_conversation(2))
+        self.assertEqual(len(turns), 2)
+        self.assertEqual([m["role"] for m in turns[0]], ["assistant", "user", "assistant"])
+
+    def test_short_history_is_verbatim(self):
+        manager = HistoryManager(summarizer=RecordingSummarizer(), keep_turns=4)
+        history = _conversation(3)
+        self.assertEqual(manager.compact(history), history)
+
+    def test_summary_is_incremental(self):
+        summarizer = RecordingSummarizer()
+        manager = HistoryManager(summarizer=summarizer, keep_turns=2, total_budget=None)
+        history = _conversation(3)
+        messages = manager.compact(history)
+        self.assertEqual(messages[0], {"role": "system", "content": SUMMARY_PREFIX + "0"})
+        self.assertEqual(len(messages), 1 + 4)
+
+        # Each later turn only folds the single turn that left the window
+        for turns in range(4, 8):
+            messages = manager.compact(_conversation(turns))
+        self.assertEqual(len(summarizer.calls), 5)
+        self.assertTrue(all(len(call[1]) == 2 for call in summarizer.calls[1:]))
+        self.assertEqual(messages[0]["content"], SUMMARY_PREFIX + "0 1 2 3 4")
+        self.assertEqual(manager.last_report.summarized_turns, 5)
+
+    def test_budget_drops_oldest_turns(self):
+        manager = HistoryManager(keep_turns=50, total_budget=200)
+        messages = manager.compact(_conversation(20), reserved_tokens=50)
+        self.assertLessEqual(count_message_tokens(messages), 150)
+        self.assertTrue(messages)
+        self.assertEqual(messages[-1]["content"].split()[1], "19")
+        self.assertGreater(manager.last_report.dropped_turns, 0)
+
+    def test_failed_summarizer_drops_turns(self):
+        def broken(summary, messages):
+            raise RuntimeError("down")
+
+        manager = HistoryManager(summarizer=broken, keep_turns=2, total_budget=10_000)
+        messages = manager.compact(_conversation(5))
+        self.assertNotIn("system", [m["role"] for m in messages])
+        self.assertEqual(manager.last_report.verbatim_turns, 5)
+
+    def test_background_summary_is_used_next_turn(self):
+        summarizer = RecordingSummarizer()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            manager = HistoryManager(summarizer=summarizer, keep_turns=2, executor=executor)
+            first = manager.compact(_conversation(3))
+            self.assertEqual(first[0]["role"], "assistant")
+        second = manager.compact(_conversation(3))
+        self.assertEqual(second[0]["content"], SUMMARY_PREFIX + "0")
+
+
+class TestMeHistoryBudget(unittest.TestCase):
+    def test_prompt_stays_within_budget(self):
+        client = FakeOpenAI()
+        me = Me(
+            openai_client=client,
+            vector_db=FakeVectorDB(documents=["snippet " * 2000]),
+            answer_cache=AnswerCache(max_entries=0),
+            guardrails=TieredGuardrail.llm_only(),
+            history_manager=HistoryManager(keep_turns=4, total_budget=1500),
+        )
+        list(me.chat("And what next?", _conversation(30)))
+        prompt = next(call for call in client.calls if "tools" in call)["messages"]
+        self.assertLessEqual(count_message_tokens(prompt), 1500)
+        self.assertEqual(prompt[-1], {"role": "user", "content": "And what next?"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from tests.fakes import CountingEmbeddings
+from utils.embedding_cache import EmbeddingCache
+from utils.ingest_pipeline import IngestPipeline
+from utils.text_processing import DocumentProcessing
+from utils.vector_db import VectorDB
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class FlakyEmbeddings(CountingEmbeddings):
+    """Fails the first ``failures`` batch requests with a 429-style error."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def embed_documents(self, texts):
+        if self.failures > 0:
+            self.failures -= 1
+            raise RateLimited("slow down")
+        return super().embed_documents(texts)
+
+
+class TestIngestPipeline(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.docs_dir = os.path.join(self._tmp.name, "docs")
+        os.makedirs(self.docs_dir)
+        for i in range(4):
+            with open(os.path.join(self.docs_dir, f"file{i}.txt"), "w") as f:
+                f.write("\n\n".join(f"file {i} paragraph {j}" for j in range(10)))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _processor(self, embeddings):
+        vector_db = VectorDB(
+            collection_name="test_profile",
+            persist_directory=os.path.join(self._tmp.name, "chroma"),
+            embedding_model=embeddings,
+            query_cache=EmbeddingCache(max_entries=0),
+        )
+        return DocumentProcessing(
+            embeddings=embeddings,
+            vector_db=vector_db,
+            text_splitter=RecursiveCharacterTextSplitter(chunk_size=25, chunk_overlap=0),
+        )
+
+    def test_fixed_size_batches_across_files(self):
+        embeddings = CountingEmbeddings()
+        processor = self._processor(embeddings)
+        stats = processor.create_vector_db_from_directory(
+            self.docs_dir, batch_size=16, max_workers=2
+        )
+        self.assertEqual(stats.embedded_chunks, 40)
+        self.assertEqual(processor.vector_db.count(), 40)
+        self.assertEqual(sorted(len(call) for call in embeddings.document_calls), [8, 16, 16])
+        self.assertGreater(stats.embedded_tokens, 0)
+        self.assertGreater(stats.chunks_per_sec, 0)
+
+        rerun = self._processor(CountingEmbeddings()).create_vector_db_from_directory(
+            self.docs_dir, batch_size=16
+        )
+        self.assertEqual(rerun.skipped_files, 4)
+        self.assertEqual(rerun.embedded_chunks, 0)
+
+    def test_rate_limited_batches_are_retried(self):
+        embeddings = FlakyEmbeddings(failures=2)
+        processor = self._processor(embeddings)
+        stats = IngestPipeline(
+            processor, batch_size=64, max_workers=0, base_delay=0.01
+        ).run([os.path.join(self.docs_dir, "file0.txt")])
+        self.assertEqual(stats.retries, 2)
+        self.assertEqual(stats.embedded_chunks, 10)
+        self.assertEqual(stats.failed_files, 0)
+
+    def test_failed_batches_leave_file_for_next_run(self):
+        embeddings = FlakyEmbeddings(failures=10)
+        processor = self._processor(embeddings)
+        stats = IngestPipeline(
+            processor, batch_size=64, max_workers=0, max_retries=1, base_delay=0.01
+        ).run([os.path.join(self.docs_dir, "file0.txt")])
+        self.assertEqual(stats.failed_files, 1)
+        self.assertEqual(processor.manifest.files, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
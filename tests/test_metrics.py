@@ -0,0 +1,123 @@
+import unittest
+
+from tests.fakes import FakeOpenAI, FakeVectorDB
+from utils.answer_cache import AnswerCache
+from utils.chat import Me
+from utils.conversation_log import ConversationLog
+from utils.guardrails import TieredGuardrail
+from utils.metrics import Metrics, NullMetrics
+
+
+def _me(metrics, client=None):
+    return Me(
+        openai_client=client or FakeOpenAI(tokens=["Hi", " there"]),
+        vector_db=FakeVectorDB(),
+        answer_cache=AnswerCache(),
+        guardrails=TieredGuardrail.llm_only(),
+        conversation_log=ConversationLog(None),
+        metrics=metrics,
+    )
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render_prometheus_text(self):
+        metrics = Metrics()
+        metrics.inc("turns_total", outcome="answered")
+        metrics.inc("turns_total", outcome="answered")
+        with metrics.span("retrieval"):
+            pass
+        metrics.register_collector(
+            "test", lambda: [("cache_entries", "gauge", [({"cache": 'a"b'}, 3)])]
+        )
+        text = metrics.render()
+        self.assertIn("# TYPE digital_cv_turns_total counter", text)
+        self.assertIn('digital_cv_turns_total{outcome="answered"} 2.0', text)
+        self.assertIn('digital_cv_stage_duration_seconds_bucket{stage="retrieval",le="+Inf"} 1', text)
+        self.assertIn('digital_cv_stage_duration_seconds_count{stage="retrieval"} 1', text)
+        self.assertIn('digital_cv_cache_entries{cache="a\\"b"} 3', text)
+
+    def test_failing_collector_does_not_break_scrape(self):
+        metrics = Metrics()
+        metrics.register_collector("broken", lambda: 1 / 0)
+        metrics.inc("turns_total")
+        self.assertIn("digital_cv_turns_total 1.0", metrics.render())
+
+    def test_null_metrics_is_a_no_op(self):
+        metrics = NullMetrics()
+        self.assertIs(metrics.span("a"), metrics.span("b"))
+        with metrics.span("retrieval"):
+            metrics.inc("turns_total")
+        self.assertEqual(metrics.render(), "\n")
+
+
+class TestChatInstrumentation(unittest.TestCase):
+    def test_turn_records_stages_tokens_and_cache(self):
+        metrics = Metrics()
+        me = _me(metrics)
+        list(me.chat("Tell me about your last role", []))
+        list(me.chat("Tell me about your last role", []))
+
+        for stage in ("retrieval", "build_messages", "guardrail", "stream_open", "stream"):
+            self.assertEqual(
+                metrics.histogram("stage_duration_seconds", stage=stage)["count"], 1, stage
+            )
+        self.assertEqual(metrics.histogram("time_to_first_token_seconds")["count"], 2)
+        self.assertEqual(metrics.counter_value("turns_total", outcome="answered"), 1)
+        self.assertEqual(metrics.counter_value("turns_total", outcome="cached"), 1)
+        self.assertEqual(metrics.counter_value("llm_requests_total"), 1)
+        self.assertGreater(metrics.counter_value("prompt_tokens_total"), 0)
+        self.assertGreater(metrics.counter_value("completion_tokens_total"), 0)
+        text = metrics.render()
+        self.assertIn('digital_cv_answer_cache_requests_total{result="hit"} 1', text)
+        self.assertIn('digital_cv_guardrail_decisions_total{tier="llm",verdict="allowed"} 1', text)
+
+    def test_tool_loop_iterations_are_counted(self):
+        metrics = Metrics()
+        client = FakeOpenAI(
+            turns=[
+                {"tool_calls": [("record_unknown_question", {"question": "Favourite food?"})]},
+                {"tokens": ["I'll find out!"]},
+            ]
+        )
+        me = _me(metrics, client)
+        me.tool_registry = type(me.tool_registry)()
+        me.tool_registry.register(
+            {
+                "name": "record_unknown_question",
+                "parameters": {
+                    "type": "object",
+                    "properties": {"question": {"type": "string"}},
+                    "required": ["question"],
+                },
+            },
+            lambda question: {"recorded": "ok"},
+        )
+        list(me.chat("Favourite food?", []))
+        self.assertEqual(metrics.counter_value("llm_requests_total"), 2)
+        self.assertEqual(
+            metrics.counter_value("tool_calls_total", tool="record_unknown_question"), 1
+        )
+        self.assertEqual(
+            metrics.histogram("stage_duration_seconds", stage="tool_execution")["count"], 1
+        )
+
+    def test_spans_are_exported_to_opentelemetry(self):
+        try:
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+            from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+                InMemorySpanExporter,
+            )
+        except ImportError:
+            self.skipTest("opentelemetry-sdk not installed")
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        me = _me(Metrics(tracer=provider.get_tracer("test")))
+        list(me.chat("Tell me about your last role", []))
+        names = {span.name for span in exporter.get_finished_spans()}
+        self.assertTrue({"digital_cv.retrieval", "digital_cv.stream_open"} <= names)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from utils.metrics import Metrics
+from utils.notification_queue import NotificationQueue
+
+
+class PushoverStandIn:
+    """Local HTTP server that fails the first ``failures`` requests with 500."""
+
+    def __init__(self, failures=0, delay=0.0, status=200):
+        self.failures = failures
+        self.delay = delay
+        self.status = status
+        self.messages = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(stand_in.delay)
+                if stand_in.failures > 0:
+                    stand_in.failures -= 1
+                    self.send_response(500)
+                else:
+                    stand_in.messages.append(body.decode())
+                    self.send_response(stand_in.status)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/1/messages.json"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestNotificationQueue(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.spill_path = os.path.join(self._tmp.name, "pending.jsonl")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _queue(self, stand_in, **kwargs):
+        env = mock.patch.dict(os.environ, {"PUSHOVER_URL": stand_in.url})
+        env.start()
+        self.addCleanup(env.stop)
+        queue = NotificationQueue(spill_path=self.spill_path, base_delay=0.01, **kwargs)
+        self.addCleanup(queue.stop, 1.0)
+        return queue
+
+    def test_enqueue_does_not_wait_for_slow_endpoint(self):
+        stand_in = PushoverStandIn(delay=0.5)
+        self.addCleanup(stand_in.close)
+        queue = self._queue(stand_in).start()
+        start = time.perf_counter()
+        queue.enqueue("hello")
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertTrue(queue.wait_idle(timeout=5))
+        self.assertEqual(queue.metrics()["delivered"], 1)
+
+    def test_retries_with_backoff_until_delivered(self):
+        stand_in = PushoverStandIn(failures=2)
+        self.addCleanup(stand_in.close)
+        queue = self._queue(stand_in).start()
+        queue.enqueue("retry me")
+        self.assertTrue(queue.wait_idle(timeout=5))
+        metrics = queue.metrics()
+        self.assertEqual(metrics["retries"], 2)
+        self.assertEqual(metrics["delivered"], 1)
+        self.assertEqual(metrics["depth"], 0)
+        self.assertIn("retry+me", stand_in.messages[0])
+
+    def test_client_errors_are_not_retried(self):
+        stand_in = PushoverStandIn(status=400)
+        self.addCleanup(stand_in.close)
+        queue = self._queue(stand_in).start()
+        queue.enqueue("bad token")
+        self.assertTrue(queue.wait_idle(timeout=5))
+        self.assertEqual(queue.metrics()["failed"], 1)
+        self.assertEqual(queue.metrics()["retries"], 0)
+
+    def test_backlog_is_exported_as_metrics(self):
+        stand_in = PushoverStandIn(status=500)
+        self.addCleanup(stand_in.close)
+        queue = self._queue(stand_in, max_attempts=2).start()
+        queue.enqueue("one")
+        queue.enqueue("two")
+        self.assertTrue(queue.wait_idle(timeout=5))
+        metrics = Metrics()
+        metrics.register_collector("notifications", queue.collect_metrics)
+        text = metrics.render()
+        self.assertIn("digital_cv_notification_queue_depth 0", text)
+        self.assertIn('digital_cv_notifications_total{outcome="failed"} 2', text)
+        self.assertIn("digital_cv_notification_retries_total 2", text)
+
+    def test_pending_jobs_survive_restart(self):
+        stand_in = PushoverStandIn()
+        self.addCleanup(stand_in.close)
+        # Never started, as if the process died before delivery
+        self._queue(stand_in).enqueue("survive restart")
+
+        restarted = self._queue(stand_in)
+        self.assertEqual(restarted.metrics()["replayed"], 1)
+        restarted.start()
+        self.assertTrue(restarted.wait_idle(timeout=5))
+        self.assertEqual(len(stand_in.messages), 1)
+
+        # Delivered jobs are acknowledged and not replayed again
+        self.assertEqual(self._queue(stand_in).metrics()["replayed"], 0)
+
+    def test_journal_is_compacted_while_running(self):
+        stand_in = PushoverStandIn()
+        self.addCleanup(stand_in.close)
+        queue = self._queue(stand_in, compact_after=5).start()
+        for i in range(12):
+            queue.enqueue(f"message {i}")
+        self.assertTrue(queue.wait_idle(timeout=5))
+        with open(self.spill_path, encoding="utf-8") as f:
+            lines = f.readlines()
+        # Two compactions; only the records since the last one remain
+        self.assertLess(len(lines), 6)
+        self.assertEqual(self._queue(stand_in).metrics()["replayed"], 0)
+
+        # A job still pending at compaction time is kept and replayed
+        stopped = self._queue(stand_in, compact_after=1)
+        stopped.enqueue("still pending")
+        stopped._journal({"id": "other", "done": "delivered"})
+        with open(self.spill_path, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["text"] for line in f], ["still pending"])
+        self.assertEqual(self._queue(stand_in).metrics()["replayed"], 1)
+
+    def test_workers_replay_only_their_own_journal(self):
+        stand_in = PushoverStandIn()
+        self.addCleanup(stand_in.close)
+        env = {"PUSHOVER_URL": stand_in.url, "NOTIFICATION_SPILL_PATH": self.spill_path}
+        with mock.patch.dict(os.environ, dict(env, WORKER_ID="0")):
+            first = NotificationQueue(base_delay=0.01)
+            first.enqueue("from worker 0")
+        with mock.patch.dict(os.environ, dict(env, WORKER_ID="1")):
+            second = NotificationQueue(base_delay=0.01)
+        self.assertEqual(first.spill_path, os.path.join(self._tmp.name, "pending.worker0.jsonl"))
+        self.assertEqual(second.metrics()["replayed"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
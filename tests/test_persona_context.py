@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from tests.fakes import FakeOpenAI
+from utils.chat import Me
+from utils.embedding_cache import EmbeddingCache
+from utils.embeddings import HashingEmbeddings
+from utils.persona_context import (
+    build_persona_context,
+    load_persona_context,
+    persona_context_path,
+    select_representative,
+)
+from utils.vector_db import VectorDB
+
+
+DOCUMENTS = [
+    "I build RAG systems with LangChain and Chroma",
+    "RAG assistants with retrieval and Chroma vector search",
+    "I was an analytical chemist at Sanofi and Recipharm",
+    "Analytical chemistry, extractables and leachables at Sanofi",
+    "I enjoy cycling and walking the dog at weekends",
+    "Weekends are for cycling, walking and family time",
+]
+
+
+class TestSelectRepresentative(unittest.TestCase):
+    def test_one_pick_per_cluster(self):
+        rng = np.random.default_rng(0)
+        centres = np.eye(3, 16)
+        points = np.vstack([centre + 0.05 * rng.standard_normal((10, 16)) for centre in centres])
+        picks = select_representative(points, 3)
+        self.assertEqual(sorted(pick // 10 for pick in picks), [0, 1, 2])
+        self.assertEqual(picks, select_representative(points, 3))
+
+    def test_small_corpus_returns_everything(self):
+        self.assertEqual(select_representative(np.eye(2, 4), 5), [0, 1])
+
+
+class TestPersonaContext(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.vector_db = VectorDB(
+            collection_name="test_profile",
+            persist_directory=self._tmp.name,
+            embedding_model=HashingEmbeddings(),
+            query_cache=EmbeddingCache(max_entries=0),
+        )
+        self.vector_db.add_documents(
+            DOCUMENTS,
+            metadatas=[{"source": "me/summary.txt", "chunk_id": i} for i in range(6)],
+            ids=[f"c{i}" for i in range(6)],
+        )
+        self.path = persona_context_path(self.vector_db)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _me(self):
+        return Me(openai_client=FakeOpenAI(), vector_db=self.vector_db)
+
+    def test_build_covers_themes_and_skips_when_unchanged(self):
+        payload = build_persona_context(self.vector_db, k=3)
+        texts = " ".join(entry["text"] for entry in payload["entries"])
+        for theme in ("RAG", "Sanofi", "cycling"):
+            self.assertIn(theme, texts)
+        mtime = os.stat(self.path).st_mtime_ns
+        build_persona_context(self.vector_db, k=3)
+        self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+
+    def test_system_prompt_is_stable_until_collection_changes(self):
+        build_persona_context(self.vector_db, k=3)
+        me = self._me()
+        prompt = me.system_prompt()
+        self.assertIs(me.system_prompt(), prompt)
+        self.assertEqual(self._me().system_prompt(), prompt)
+
+        self.vector_db.add_documents(
+            ["Kaggle competitions and mathematics puzzles"],
+            metadatas=[{"source": "me/summary.txt", "chunk_id": 6}],
+            ids=["c6"],
+        )
+        payload = build_persona_context(self.vector_db, k=4)
+        self.assertEqual(load_persona_context(self.path), payload)
+        self.assertIn("Kaggle", me.system_prompt())
+
+    def test_falls_back_to_peek_without_file(self):
+        self.assertIn("Source: me/summary.txt", self._me().system_prompt())
+
+
+if __name__ == "__main__":
+    unittest.main()
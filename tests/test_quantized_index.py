@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from utils.numpy_index import NumpyIndex
+from utils.quantized_index import QuantizedIndex, quantize
+
+N, DIM = 2000, 256
+
+
+def matryoshka_like(rng, n, dim):
+    """Vectors whose leading dimensions carry most of the variance."""
+
+    return rng.standard_normal((n, dim), dtype=np.float32) / np.sqrt(np.arange(1, dim + 1, dtype=np.float32))
+
+
+class TestQuantizedIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(7)
+        cls.vectors = matryoshka_like(rng, N, DIM)
+        cls.ids = [f"id{i}" for i in range(N)]
+        cls.queries = cls.vectors[:20] + 0.3 * matryoshka_like(rng, 20, DIM)
+        cls.exact, cls.exact_scores = NumpyIndex(cls.ids, cls.vectors).top_k(cls.queries, 10)
+
+    def _recall(self, indices):
+        return np.mean([len(set(a) & set(b)) / 10 for a, b in zip(indices, self.exact)])
+
+    def test_rescoring_recovers_exact_results(self):
+        for quantization in ("float16", "int8"):
+            index = QuantizedIndex(self.ids, self.vectors, quantization=quantization, rescore=4)
+            indices, scores = index.top_k(self.queries, 10)
+            np.testing.assert_array_equal(indices, self.exact)
+            # Rescored scores are full precision
+            np.testing.assert_allclose(scores, self.exact_scores, atol=1e-5)
+
+    def test_int8_codes_are_a_quarter_of_float32(self):
+        index = QuantizedIndex(self.ids, self.vectors, quantization="int8", rescore=0)
+        self.assertEqual(index.codes.dtype, np.int8)
+        self.assertLess(index.nbytes, self.vectors.nbytes / 3.9)
+        self.assertGreaterEqual(self._recall(index.top_k(self.queries, 10)[0]), 0.9)
+
+    def test_truncated_dims_with_rescoring(self):
+        index = QuantizedIndex(self.ids, self.vectors, quantization="int8", dims=64, rescore=8)
+        self.assertEqual(index.codes.shape, (N, 64))
+        self.assertGreaterEqual(self._recall(index.top_k(self.queries, 10)[0]), 0.9)
+
+    def test_query_shape_matches_numpy_index(self):
+        index = QuantizedIndex(self.ids, self.vectors, documents=[str(i) for i in range(N)])
+        result = index.query(self.queries[:1], n_results=3)
+        self.assertEqual(result["ids"][0], [self.ids[i] for i in self.exact[0][:3]])
+        self.assertEqual(result["documents"][0], [str(i) for i in self.exact[0][:3]])
+
+    def test_int8_scales_cover_each_dimension(self):
+        codes, scales = quantize(np.array([[0.6, -0.8], [0.0, 1.0]], dtype=np.float32), "int8")
+        np.testing.assert_array_equal(codes, [[127, -102], [0, 127]])
+        np.testing.assert_allclose(scales, [0.6 / 127, 1.0 / 127])
+        with self.assertRaises(ValueError):
+            quantize(self.vectors, "int4")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,49 @@
+import tempfile
+import time
 import unittest
+
+from utils.chunking import get_text_splitter
+from utils.embedding_cache import EmbeddingCache
+from utils.embeddings import HashingEmbeddings
+from utils.text_processing import DocumentProcessing
 from utils.vector_db import VectorDB
 
+
 class TestQuery(unittest.TestCase):
+    """Retrieval over the real profile, fully offline via the hashing backend."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.vector_db = VectorDB(
+            persist_directory=cls._tmp.name,
+            embedding_model=HashingEmbeddings(),
+            query_cache=EmbeddingCache(max_entries=0),
+        )
+        # Pinned to the character splitter these expectations were written against
+        DocumentProcessing(
+            vector_db=cls.vector_db, text_splitter=get_text_splitter("recursive")
+        ).create_vector_db_from_file("me/summary.txt")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
     def test_query(self):
-        vector_db = VectorDB()
-        result = vector_db.query("What is my name?")
-        self.assertEqual(result["documents"][0], "Daniel Halwell")
\ No newline at end of file
+        result = self.vector_db.query("Who are you and what is your career focus?")
+        self.assertEqual(len(result["documents"][0]), 5)
+        self.assertIn("Daniel Halwell", result["documents"][0][0])
+
+    def test_query_finds_employer(self):
+        result = self.vector_db.query("What do you do at AstraZeneca?", k=3)
+        self.assertIn("AstraZeneca", result["documents"][0][0])
+
+    def test_collection_records_embedding_model(self):
+        self.assertEqual(self.vector_db.collection_name, "me_profile__hashing-tfidf-512")
+        self.assertEqual(self.vector_db.recorded_embedding, ("hashing-tfidf-512", 512))
+
+    def test_local_query_latency(self):
+        start = time.perf_counter()
+        for i in range(20):
+            self.vector_db.query(f"Which Python libraries do you use? {i}", k=4)
+        self.assertLess((time.perf_counter() - start) / 20, 0.05)
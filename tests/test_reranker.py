@@ -0,0 +1,147 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest import mock
+
+from utils.reranker import LexicalReranker, RerankingRetriever, get_reranker
+
+DOCUMENTS = {
+    "hobby": "Outside work I enjoy hiking, photography and cooking",
+    "chem": "I worked as an analytical chemist running HPLC and mass spectrometry",
+    "python": "Python libraries I use daily: pandas, numpy, scikit-learn and PyTorch",
+    "rag": "I build retrieval-augmented generation systems with LangChain and Chroma",
+}
+
+
+class StaticRetriever:
+    """First stage returning ``DOCUMENTS`` in a fixed order."""
+
+    def __init__(self, order=None):
+        self.order = order or list(DOCUMENTS)
+        self.candidates = 4
+        self.calls = []
+
+    def query(self, query, *, k=4):
+        self.calls.append(k)
+        ids = self.order[:k]
+        return {
+            "ids": [ids],
+            "documents": [[DOCUMENTS[i] for i in ids]],
+            "metadatas": [[{"source": f"me/{i}.txt"} for i in ids]],
+            "distances": [[None] * len(ids)],
+        }
+
+    async def aquery(self, query, *, k=4):
+        return self.query(query, k=k)
+
+    def stats(self):
+        return {"hybrid": len(self.calls)}
+
+
+class CountingScorer:
+    blocking = False
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.scored = 0
+
+    def score(self, query, documents):
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        time.sleep(self.delay)
+        self.scored += len(documents)
+        return LexicalReranker().score(query, documents)
+
+
+class TestLexicalReranker(unittest.TestCase):
+    def test_matching_chunk_scores_highest(self):
+        scores = LexicalReranker().score("Which Python libraries do you use?", list(DOCUMENTS.values()))
+        self.assertEqual(max(range(len(scores)), key=scores.__getitem__), 2)
+
+    def test_get_reranker_none_disables(self):
+        self.assertIsNone(get_reranker("none"))
+        self.assertIsInstance(get_reranker("lexical"), LexicalReranker)
+        with self.assertRaises(ValueError):
+            get_reranker("bogus")
+
+
+class TestRerankingRetriever(unittest.TestCase):
+    def test_reorders_first_stage_candidates(self):
+        first = StaticRetriever()
+        retriever = RerankingRetriever(first, CountingScorer(), fetch_k=4, budget_ms=None)
+        result = retriever.query("What Python libraries do you use?", k=2)
+        self.assertEqual(result["ids"][0][0], "python")
+        self.assertEqual(len(result["ids"][0]), 2)
+        self.assertEqual(first.calls, [4])
+        scores = result["rerank_scores"][0]
+        self.assertGreaterEqual(scores[0], scores[1])
+
+    def test_raises_first_stage_candidates_to_fetch_k(self):
+        first = StaticRetriever()
+        RerankingRetriever(first, CountingScorer(), fetch_k=12)
+        self.assertEqual(first.candidates, 12)
+
+    def test_token_budget_limits_snippets(self):
+        retriever = RerankingRetriever(StaticRetriever(), CountingScorer(), token_budget=20, budget_ms=None)
+        result = retriever.query("What Python libraries do you use?", k=4)
+        # The best chunk always fits; the rest only while under the budget
+        self.assertEqual(result["ids"][0][0], "python")
+        self.assertLess(len(result["ids"][0]), 4)
+
+    def test_repeated_query_uses_cached_scores(self):
+        scorer = CountingScorer()
+        retriever = RerankingRetriever(StaticRetriever(), scorer, budget_ms=None)
+        retriever.query("Python libraries?", k=2)
+        retriever.query("  python LIBRARIES? ", k=2)
+        self.assertEqual(scorer.scored, 4)
+        stats = retriever.rerank_stats()
+        self.assertEqual((stats["cache_hits"], stats["cache_misses"]), (4, 4))
+        self.assertEqual(stats["outcomes"]["reranked"], 2)
+
+    def test_budget_exceeded_keeps_first_stage_order(self):
+        order = ["hobby", "chem", "python", "rag"]
+        retriever = RerankingRetriever(
+            StaticRetriever(order), CountingScorer(delay=0.02), budget_ms=1, batch_size=2
+        )
+        result = retriever.query("What Python libraries do you use?", k=2)
+        self.assertEqual(result["ids"], [["hobby", "chem"]])
+        self.assertEqual(result["rerank_scores"], [[None, None]])
+        self.assertEqual(retriever.rerank_stats()["outcomes"]["budget_exceeded"], 1)
+
+    def test_late_last_batch_still_reranks(self):
+        order = ["hobby", "chem", "python", "rag"]
+        retriever = RerankingRetriever(
+            StaticRetriever(order), CountingScorer(delay=0.02), budget_ms=1, batch_size=8
+        )
+        result = retriever.query("What Python libraries do you use?", k=2)
+        self.assertEqual(result["ids"][0][0], "python")
+        stats = retriever.rerank_stats()
+        self.assertEqual(stats["outcomes"]["reranked"], 1)
+        self.assertEqual(stats["overruns"], 1)
+
+    def test_scorer_error_keeps_first_stage_order(self):
+        retriever = RerankingRetriever(StaticRetriever(), CountingScorer(fail=True))
+        with self.assertLogs("utils.app_logging", level="ERROR"):
+            result = retriever.query("What Python libraries do you use?", k=2)
+        self.assertEqual(result["ids"], [["hobby", "chem"]])
+        self.assertEqual(retriever.rerank_stats()["outcomes"]["error"], 1)
+
+    def test_aquery_matches_query(self):
+        retriever = RerankingRetriever(StaticRetriever(), CountingScorer(), budget_ms=None)
+        expected = retriever.query("HPLC experience", k=2)
+        self.assertEqual(asyncio.run(retriever.aquery("HPLC experience", k=2)), expected)
+
+    def test_from_env_none_returns_first_stage(self):
+        first = StaticRetriever()
+        with mock.patch.dict(os.environ, {"RERANKER": "none"}):
+            self.assertIs(RerankingRetriever.from_env(first), first)
+        with mock.patch.dict(os.environ, {"RERANK_CANDIDATES": "6", "RERANK_BUDGET_MS": "0"}):
+            retriever = RerankingRetriever.from_env(first)
+        self.assertEqual(retriever.fetch_k, 6)
+        self.assertIsNone(retriever.budget_ms)
+
+
+if __name__ == "__main__":
+    unittest.main()
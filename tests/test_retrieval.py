@@ -0,0 +1,132 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from tests.fakes import FakeOpenAI, FakeVectorDB
+from utils.chat import Me
+from utils.conversation_log import ConversationLog
+from utils.embedding_cache import EmbeddingCache
+from utils.embeddings import HashingEmbeddings
+from utils.lexical_index import BM25Index, build_lexical_index, lexical_index_path, load_lexical_index
+from utils.retrieval import HybridRetriever, reciprocal_rank_fusion
+from utils.vector_db import NumpyVectorDB
+
+DOCUMENTS = {
+    "python": "Python libraries I use daily: pandas, numpy, scikit-learn and PyTorch",
+    "chem": "I worked as an analytical chemist running HPLC and mass spectrometry",
+    "rag": "I build retrieval-augmented generation systems with LangChain and Chroma",
+    "hobby": "Outside work I enjoy hiking, photography and cooking",
+}
+
+
+class TestBM25Index(unittest.TestCase):
+    def setUp(self):
+        self.index = BM25Index(list(DOCUMENTS), list(DOCUMENTS.values()))
+
+    def test_exact_terms_rank_first(self):
+        result = self.index.query("Have you used PyTorch?", k=2)
+        self.assertEqual(result["ids"][0][0], "python")
+        result = self.index.query("HPLC experience", k=2)
+        self.assertEqual(result["ids"], [["chem"]])
+
+    def test_no_matching_terms_returns_nothing(self):
+        self.assertEqual(self.index.query("what is the weather", k=3)["ids"], [[]])
+
+    def test_payload_round_trip(self):
+        restored = BM25Index.from_payload(self.index.to_payload())
+        query = "retrieval with chroma and numpy"
+        self.assertEqual(restored.scores(query), self.index.scores(query))
+
+
+class TestReciprocalRankFusion(unittest.TestCase):
+    def test_items_ranked_well_by_both_lists_win(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]])
+        self.assertEqual([item for item, _ in fused], ["b", "a", "d", "c"])
+
+
+class TestHybridRetriever(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = NumpyVectorDB(
+            collection_name="test_profile",
+            persist_directory=self._tmp.name,
+            embedding_model=HashingEmbeddings(dim=512),
+            query_cache=EmbeddingCache(max_entries=0),
+        )
+        self.db.add_documents(
+            list(DOCUMENTS.values()),
+            metadatas=[{"source": f"me/{key}.txt"} for key in DOCUMENTS],
+            ids=list(DOCUMENTS),
+        )
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_index_is_persisted_and_reused(self):
+        path = lexical_index_path(self.db)
+        build_lexical_index(self.db)
+        mtime = os.stat(path).st_mtime_ns
+        build_lexical_index(self.db)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        self.assertEqual(len(load_lexical_index(path)), 4)
+
+    def test_hybrid_fuses_both_sides(self):
+        build_lexical_index(self.db)
+        retriever = HybridRetriever(self.db, candidates=4)
+        result = retriever.query("Which Python libraries do you know?", k=2)
+        self.assertEqual(result["ids"][0][0], "python")
+        self.assertIsNotNone(result["distances"][0][0])
+        self.assertEqual(retriever.stats()["hybrid"], 1)
+
+    def test_index_is_reloaded_after_reingest(self):
+        build_lexical_index(self.db)
+        retriever = HybridRetriever(self.db, mode="lexical")
+        self.assertEqual(retriever.query("kubernetes")["ids"], [[]])
+        self.db.add_documents(
+            ["I deploy to Kubernetes"], metadatas=[{"source": "me/ops.txt"}], ids=["ops"]
+        )
+        build_lexical_index(self.db)
+        self.assertEqual(retriever.query("kubernetes")["ids"], [["ops"]])
+
+    def test_lexical_fallback_when_vector_side_is_slow(self):
+        slow = FakeVectorDB(latency=0.5)
+        index = BM25Index(list(DOCUMENTS), list(DOCUMENTS.values()))
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            retriever = HybridRetriever(
+                slow, embed_timeout=0.05, executor=executor, lexical_index=index
+            )
+            start = time.perf_counter()
+            result = retriever.query("PyTorch and pandas", k=2)
+            self.assertLess(time.perf_counter() - start, 0.4)
+        self.assertEqual(result["ids"][0][0], "python")
+        self.assertEqual(retriever.stats()["fallback"], 1)
+
+        result = asyncio.run(retriever.aquery("HPLC", k=2))
+        self.assertEqual(result["ids"], [["chem"]])
+        self.assertEqual(retriever.stats()["fallback"], 2)
+
+    def test_chat_retrieval_does_not_queue_behind_chat_threads(self):
+        with mock.patch.dict(os.environ, {"RERANKER": "none", "CHAT_WORKER_THREADS": "1"}):
+            me = Me(openai_client=FakeOpenAI(), vector_db=self.db, conversation_log=ConversationLog(None))
+        release = threading.Event()
+        self.addCleanup(release.set)
+        # A long guardrail check or summary occupying the chat pool
+        me._executor.submit(release.wait)
+        me.retriever.embed_timeout = 0.5
+        me.retriever.query("PyTorch and pandas", k=2)
+        self.assertEqual(me.retriever.stats()["fallback"], 0)
+
+    def test_store_without_collection_data_uses_vector_only(self):
+        retriever = HybridRetriever(FakeVectorDB())
+        result = retriever.query("anything", k=2)
+        self.assertEqual(result["ids"], [["doc_0"]])
+        self.assertEqual(retriever.stats()["vector"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
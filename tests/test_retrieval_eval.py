@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.retrieval_eval import RecordedEmbeddings, evaluate, load_questions
+from utils.embeddings import HashingEmbeddings
+
+# Floors for the offline question set at the default chunking (2000:200);
+# the hashing backend scores lower than a neural model, so these catch
+# regressions in chunking and retrieval, not absolute quality
+RECALL_AT_5_FLOOR = {"numpy": 0.6, "lexical": 0.9, "hybrid": 0.85}
+
+
+class TestRetrievalEval(unittest.TestCase):
+    def test_quality_floors(self):
+        rows = evaluate(
+            HashingEmbeddings(),
+            backends=("chroma", "numpy", "lexical", "hybrid"),
+            chunking=("2000:200",),
+            ks=(1, 5),
+            repeats=1,
+        )
+        by_backend = {row["backend"]: row for row in rows}
+        # Exact NumPy search must rank like Chroma over the same collection
+        self.assertEqual(by_backend["numpy"]["recall@5"], by_backend["chroma"]["recall@5"])
+        for backend, floor in RECALL_AT_5_FLOOR.items():
+            row = by_backend[backend]
+            self.assertGreaterEqual(row["recall@5"], floor, (backend, row["misses"]))
+            self.assertLessEqual(row["recall@1"], row["recall@5"])
+            self.assertGreater(row["mrr"], 0)
+
+    def test_structured_chunks_shrink_prompt_context(self):
+        rows = evaluate(
+            HashingEmbeddings(),
+            backends=("lexical",),
+            chunking=("2000:200", "t200:30"),
+            ks=(1, 5),
+            repeats=1,
+        )
+        recursive, structured = rows
+        self.assertGreaterEqual(structured["recall@5"], 0.8, structured["misses"])
+        self.assertLess(structured["context_tokens"], recursive["context_tokens"] / 2)
+
+    def test_question_gold_phrases_exist_in_sources(self):
+        with open("me/summary.txt", encoding="utf-8") as f:
+            text = f.read()
+        for question in load_questions():
+            self.assertTrue(any(p in text for p in question.gold), question.id)
+
+    def test_recorded_embeddings_replay_offline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "recording.npz")
+            source = HashingEmbeddings(dim=32)
+            recorder = RecordedEmbeddings(path, source)
+            vector = recorder.embed_query("What do you build?")
+            recorder.save()
+
+            replay = RecordedEmbeddings(path)
+            self.assertEqual(replay.model, source.model)
+            self.assertAlmostEqual(replay.embed_query("What do you build?")[0], vector[0], places=6)
+            with self.assertRaises(KeyError):
+                replay.embed_query("never recorded")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from utils.embedding_cache import EmbeddingCache
+from utils.embeddings import HashingEmbeddings
+from utils.lexical_index import lexical_index_path
+from utils.persona_context import load_persona_context, persona_context_path
+from utils.quantized_index import QuantizedIndex
+from utils.retrieval import HybridRetriever
+from utils.snapshot import (
+    SnapshotReadOnlyError,
+    SnapshotVectorDB,
+    load_manifest,
+    publish_snapshot,
+    read_current_version,
+    set_current_version,
+    snapshot_lexical_path,
+    snapshot_persona_path,
+)
+from utils.vector_db import EmbeddingModelMismatchError, NumpyVectorDB, open_vector_db
+
+DOCUMENTS = [
+    "I build retrieval-augmented generation systems in Python",
+    "Before software I worked as an analytical chemist",
+    "I enjoy hiking and photography at the weekend",
+    "I deploy services with Docker and FastAPI",
+]
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self._tmp.name, "snapshots")
+        self.embeddings = HashingEmbeddings(dim=512)
+        self.writer = NumpyVectorDB(
+            collection_name="test_profile",
+            persist_directory=os.path.join(self._tmp.name, "chroma"),
+            embedding_model=self.embeddings,
+            query_cache=EmbeddingCache(max_entries=0),
+        )
+        self.writer.add_documents(
+            DOCUMENTS,
+            metadatas=[{"source": "me/summary.txt", "chunk_id": i} for i in range(4)],
+            ids=[f"id{i}" for i in range(4)],
+        )
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _reader(self, **kwargs):
+        return SnapshotVectorDB(
+            persist_directory=self.root,
+            embedding_model=kwargs.pop("embedding_model", self.embeddings),
+            query_cache=EmbeddingCache(max_entries=0),
+            **kwargs,
+        )
+
+    def test_reader_matches_writer(self):
+        publish_snapshot(self.writer, self.root)
+        reader = self._reader()
+        # Served straight from the memory-mapped file, not a private copy
+        self.assertFalse(reader.index.matrix.flags.owndata)
+        self.assertFalse(reader.index.matrix.flags.writeable)
+        self.assertEqual(reader.collection_name, "test_profile")
+        self.assertEqual(reader.count(), 4)
+        for question in ("What do you build?", "What did you do before software?"):
+            expected = self.writer.query(question, k=2)
+            result = reader.query(question, k=2)
+            self.assertEqual(result["ids"], expected["ids"])
+            np.testing.assert_allclose(result["distances"], expected["distances"], atol=1e-5)
+        self.assertEqual(reader.get(["id1"])["documents"], [DOCUMENTS[1]])
+
+    def test_publish_writes_persona_context_for_readers(self):
+        version = publish_snapshot(self.writer, self.root)
+        path = snapshot_persona_path(self.root, version, "test_profile")
+        self.assertTrue(load_persona_context(path)["entries"])
+        reader = self._reader()
+        self.assertEqual(persona_context_path(reader), path)
+        self.assertEqual(lexical_index_path(reader), snapshot_lexical_path(self.root, version, "test_profile"))
+
+    def test_lexical_index_follows_the_served_version(self):
+        old_version = publish_snapshot(self.writer, self.root)
+        reader = self._reader(poll_interval=0)
+        retriever = HybridRetriever(reader, mode="lexical", candidates=5)
+        self.assertNotIn("id4", retriever.query("French Spanish", k=5)["ids"][0])
+
+        self.writer.add_documents(
+            ["I speak French and Spanish"], metadatas=[{"source": "me/languages.txt"}], ids=["id4"]
+        )
+        new_version = publish_snapshot(self.writer, self.root)
+        self.assertEqual(retriever.query("French Spanish", k=5)["ids"][0][0], "id4")
+
+        # Rolling CURRENT back takes the lexical index back with it
+        set_current_version(self.root, old_version)
+        self.assertNotIn("id4", retriever.query("French Spanish", k=5)["ids"][0])
+        self.assertNotEqual(old_version, new_version)
+
+    def test_unchanged_collection_is_not_republished(self):
+        first = publish_snapshot(self.writer, self.root)
+        self.assertEqual(publish_snapshot(self.writer, self.root), first)
+        self.assertEqual(len(os.listdir(os.path.join(self.root, "versions"))), 1)
+
+    def test_quantized_snapshot_maps_codes_and_rescores(self):
+        version = publish_snapshot(self.writer, self.root, quantization="int8", dims=128)
+        self.assertEqual(
+            load_manifest(self.root, version)["quantization"], {"dtype": "int8", "dims": 128}
+        )
+        reader = self._reader()
+        self.assertIsInstance(reader.index, QuantizedIndex)
+        self.assertEqual(reader.index.codes.shape, (4, 128))
+        self.assertFalse(reader.index.codes.flags.owndata)
+        expected = self.writer.query("What do you build?", k=2)
+        result = reader.query("What do you build?", k=2)
+        self.assertEqual(result["ids"], expected["ids"])
+        np.testing.assert_allclose(result["distances"], expected["distances"], atol=1e-5)
+
+        # Same settings are a no-op; new settings publish a new version
+        self.assertEqual(publish_snapshot(self.writer, self.root, quantization="int8", dims=128), version)
+        self.assertNotEqual(publish_snapshot(self.writer, self.root, quantization="float32"), version)
+
+    def test_reader_swaps_to_new_version(self):
+        publish_snapshot(self.writer, self.root)
+        reader = self._reader(poll_interval=0)
+        old_version = reader.version
+        self.writer.add_documents(
+            ["I speak French and Spanish"], metadatas=[{"source": "me/languages.txt"}], ids=["id4"]
+        )
+        new_version = publish_snapshot(self.writer, self.root)
+        self.assertNotEqual(new_version, old_version)
+        result = reader.query("Which languages do you speak?", k=1)
+        self.assertEqual(reader.version, new_version)
+        self.assertEqual(result["ids"], [["id4"]])
+
+    def test_old_versions_are_pruned(self):
+        for i in range(4):
+            self.writer.add_documents(
+                [f"Extra fact number {i}"], metadatas=[{"source": "me/extra.txt"}], ids=[f"extra{i}"]
+            )
+            publish_snapshot(self.writer, self.root, keep=2)
+        versions = sorted(os.listdir(os.path.join(self.root, "versions")))
+        self.assertEqual(len(versions), 2)
+        self.assertEqual(versions[-1], read_current_version(self.root))
+
+    def test_reader_is_read_only(self):
+        publish_snapshot(self.writer, self.root)
+        reader = self._reader()
+        with self.assertRaises(SnapshotReadOnlyError):
+            reader.add_documents(["new"], ids=["x"])
+        with self.assertRaises(SnapshotReadOnlyError):
+            reader.delete(["id0"])
+
+    def test_reader_rejects_other_embedding_model(self):
+        publish_snapshot(self.writer, self.root)
+        with self.assertRaises(EmbeddingModelMismatchError):
+            self._reader(embedding_model=HashingEmbeddings(dim=256))
+
+    def test_missing_snapshot_is_a_clear_error(self):
+        with self.assertRaises(FileNotFoundError):
+            open_vector_db("snapshot", persist_directory=self.root, embedding_model=self.embeddings)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import unittest
+
+from benchmarks.import_profile import profile_imports
+
+# Imported on first use (building Me, ingesting), never on the startup path
+DEFERRED_MODULES = (
+    "openai",
+    "chromadb",
+    "langchain_core",
+    "langchain_openai",
+    "langchain_community",
+    "sentence_transformers",
+)
+
+# Seconds of cumulative import time for the chat module (currently ~0.25 s;
+# it was 1.7 s with openai/chromadb/langchain imported eagerly)
+CHAT_IMPORT_BUDGET = float(os.getenv("CHAT_IMPORT_BUDGET", "1.0"))
+
+
+class TestStartupImports(unittest.TestCase):
+    def test_chat_module_imports_stay_light(self):
+        profile = profile_imports("utils.chat")
+        eager = [name for name in DEFERRED_MODULES if name in profile]
+        self.assertEqual(eager, [], "heavy modules imported by utils.chat")
+        self.assertLess(profile["utils.chat"][1] / 1e6, CHAT_IMPORT_BUDGET)
+
+    def test_app_import_defers_me(self):
+        try:
+            import gradio  # noqa: F401
+        except ImportError:
+            self.skipTest("gradio not installed")
+        profile = profile_imports("app")
+        eager = [name for name in DEFERRED_MODULES if name in profile]
+        self.assertEqual(eager, [], "heavy modules imported by app")
+
+
+if __name__ == "__main__":
+    unittest.main()
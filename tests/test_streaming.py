@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+
+from tests.fakes import FakeAsyncOpenAI, FakeOpenAI, FakeVectorDB
+from utils.answer_cache import AnswerCache
+from utils.chat import Me
+from utils.conversation_log import ConversationLog
+from utils.guardrails import TieredGuardrail
+from utils.streaming import StreamBuffer
+
+TOKENS = [f" word{i}" for i in range(50)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStreamBuffer(unittest.TestCase):
+    def test_first_flush_is_immediate_then_coalesced(self):
+        clock = FakeClock()
+        buffer = StreamBuffer(interval=0.03, clock=clock)
+        self.assertFalse(buffer.ready())
+        buffer.append("Hello")
+        self.assertTrue(buffer.ready())
+        self.assertEqual(buffer.flush(), "Hello")
+        buffer.append(" there")
+        clock.now = 0.01
+        self.assertFalse(buffer.ready())
+        clock.now = 0.03
+        self.assertTrue(buffer.ready())
+        self.assertEqual(buffer.flush(), "Hello there")
+        self.assertFalse(buffer.pending)
+
+    def test_size_trigger(self):
+        buffer = StreamBuffer(interval=10.0, max_chars=10, clock=FakeClock())
+        buffer.append("a")
+        buffer.flush()
+        buffer.append("123456789")
+        self.assertFalse(buffer.ready())
+        buffer.append("0")
+        self.assertTrue(buffer.ready())
+
+    def test_zero_interval_flushes_every_delta(self):
+        buffer = StreamBuffer(interval=0, clock=FakeClock())
+        for token in TOKENS[:3]:
+            buffer.append(token)
+            self.assertTrue(buffer.ready())
+            buffer.flush()
+        self.assertEqual(buffer.text, "".join(TOKENS[:3]))
+
+
+class TestChatStreamCoalescing(unittest.TestCase):
+    def _me(self, interval, **clients):
+        return Me(
+            vector_db=FakeVectorDB(),
+            answer_cache=AnswerCache(max_entries=0),
+            guardrails=TieredGuardrail.llm_only(),
+            conversation_log=ConversationLog(None),
+            stream_buffer=lambda: StreamBuffer(interval=interval),
+            **clients,
+        )
+
+    def test_tokens_are_coalesced(self):
+        me = self._me(60.0, openai_client=FakeOpenAI(tokens=TOKENS))
+        outputs = list(me.chat("Tell me about yourself", []))
+        # First token straight away, the rest in one flush at the end
+        self.assertEqual(outputs, [TOKENS[0], "".join(TOKENS)])
+
+    def test_per_token_mode(self):
+        me = self._me(0, openai_client=FakeOpenAI(tokens=TOKENS))
+        outputs = list(me.chat("Tell me about yourself", []))
+        self.assertEqual(len(outputs), len(TOKENS))
+        self.assertEqual(outputs[-1], "".join(TOKENS))
+
+    def test_async_tokens_are_coalesced(self):
+        me = self._me(60.0, async_openai_client=FakeAsyncOpenAI(tokens=TOKENS))
+
+        async def collect():
+            return [chunk async for chunk in me.achat("Tell me about yourself", [])]
+
+        self.assertEqual(asyncio.run(collect()), [TOKENS[0], "".join(TOKENS)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from tests.fakes import CountingEmbeddings
+from utils.embedding_cache import EmbeddingCache
+from utils.retrieval import HybridRetriever
+from utils.text_processing import DocumentProcessing
+from utils.vector_db import VectorDB
+
+
+class TestIncrementalIngestion(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.docs_dir = os.path.join(self._tmp.name, "me")
+        os.makedirs(self.docs_dir)
+        self._write("summary.txt", "I am Daniel.\n\nI build RAG systems.")
+        self._write("notes.txt", "I like Python and automation.")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, name, text):
+        with open(os.path.join(self.docs_dir, name), "w") as f:
+            f.write(text)
+
+    def _processor(self):
+        embeddings = CountingEmbeddings()
+        vector_db = VectorDB(
+            collection_name="test_profile",
+            persist_directory=os.path.join(self._tmp.name, "chroma"),
+            embedding_model=embeddings,
+            query_cache=EmbeddingCache(max_entries=0),
+        )
+        processor = DocumentProcessing(
+            embeddings=embeddings,
+            vector_db=vector_db,
+            text_splitter=RecursiveCharacterTextSplitter(chunk_size=20, chunk_overlap=0),
+        )
+        return processor, embeddings
+
+    def test_files_do_not_collide_and_rerun_embeds_nothing(self):
+        processor, embeddings = self._processor()
+        processor.create_vector_db_from_directory(self.docs_dir)
+        first_count = processor.vector_db.count()
+        self.assertGreater(first_count, 2)
+        sources = {m["source"] for m in processor.vector_db.get_all()["metadatas"]}
+        self.assertEqual(len(sources), 2)
+
+        processor, embeddings = self._processor()
+        processor.create_vector_db_from_directory(self.docs_dir)
+        self.assertEqual(embeddings.calls, 0)
+        self.assertEqual(processor.vector_db.count(), first_count)
+
+    def test_changed_file_embeds_only_new_chunks_and_drops_stale(self):
+        processor, _ = self._processor()
+        processor.create_vector_db_from_directory(self.docs_dir)
+
+        self._write("summary.txt", "I am Daniel.\n\nI build agents now.")
+        processor, embeddings = self._processor()
+        processor.create_vector_db_from_directory(self.docs_dir)
+        embedded = [text for call in embeddings.document_calls for text in call]
+        self.assertEqual(embedded, ["I build agents now."])
+        texts = processor.vector_db.get_all_texts()
+        self.assertIn("I build agents now.", texts)
+        self.assertNotIn("I build RAG systems.", texts)
+
+    def test_removed_file_is_deleted(self):
+        processor, _ = self._processor()
+        processor.create_vector_db_from_directory(self.docs_dir)
+        os.remove(os.path.join(self.docs_dir, "notes.txt"))
+
+        processor, _ = self._processor()
+        processor.create_vector_db_from_directory(self.docs_dir)
+        sources = {m["source"] for m in processor.vector_db.get_all()["metadatas"]}
+        self.assertEqual(sources, {os.path.join(self.docs_dir, "summary.txt")})
+
+    def test_single_file_ingest_refreshes_bm25(self):
+        processor, _ = self._processor()
+        path = os.path.join(self.docs_dir, "summary.txt")
+        processor.create_vector_db_from_file(path)
+        retriever = HybridRetriever(processor.vector_db, mode="lexical")
+        self.assertEqual(retriever.query("RAG")["documents"][0], ["I build RAG"])
+
+        self._write("summary.txt", "I am Daniel.\n\nI build agents now.")
+        processor.create_vector_db_from_file(path)
+        self.assertEqual(retriever.query("RAG")["documents"][0], [])
+        self.assertEqual(retriever.query("agents")["documents"][0], ["I build agents now."])
+
+
+if __name__ == "__main__":
+    unittest.main()
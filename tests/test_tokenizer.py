@@ -0,0 +1,37 @@
+import unittest
+from unittest import mock
+
+from utils import tokenizer
+
+
+class TestGetEncoding(unittest.TestCase):
+    def setUp(self):
+        for cache in (tokenizer._encodings, tokenizer._encoding_retry_at):
+            patcher = mock.patch.dict(cache, clear=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.now = [100.0]
+        patcher = mock.patch.object(tokenizer.time, "monotonic", lambda: self.now[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failure_is_logged_once_and_retried(self):
+        encoding = mock.Mock()
+        encoding.encode.side_effect = lambda text, **kwargs: text.split()
+        load = mock.Mock(side_effect=[OSError("offline"), encoding])
+        with mock.patch("tiktoken.get_encoding", load), self.assertLogs(
+            tokenizer.logger, "WARNING"
+        ) as logs:
+            self.assertEqual(tokenizer.count_tokens("one two three four five six seven eight", "test"), 9)
+            self.assertIsNone(tokenizer.get_encoding("test"))
+            self.assertEqual(load.call_count, 1)
+
+            self.now[0] += tokenizer.ENCODING_RETRY_SECONDS + 1
+            self.assertEqual(tokenizer.count_tokens("one two three", "test"), 3)
+            self.assertIs(tokenizer.get_encoding("test"), encoding)
+        self.assertEqual(load.call_count, 2)
+        self.assertEqual(len([r for r in logs.records if r.levelname == "WARNING"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
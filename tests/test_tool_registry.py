@@ -0,0 +1,82 @@
+import json
+import time
+import unittest
+from unittest import mock
+
+from tests.fakes import FakeOpenAI, FakeVectorDB
+from utils.chat import Me, record_unknown_question_json, record_user_details_json
+from utils.tool_registry import ToolRegistry, ToolValidationError
+
+
+class TestToolRegistry(unittest.TestCase):
+    def setUp(self):
+        self.recorded = []
+        self.registry = ToolRegistry()
+
+        def record_user_details(email, name="Name not provided", notes="not provided"):
+            self.recorded.append(email)
+            return {"recorded": "ok"}
+
+        def record_unknown_question(question):
+            time.sleep(0.2)
+            return {"recorded": "ok"}
+
+        self.registry.register(record_user_details_json, record_user_details)
+        self.registry.register(record_unknown_question_json, record_unknown_question)
+
+    def test_schema_must_match_signature(self):
+        def wrong(question, extra):
+            return {}
+
+        with self.assertRaises(ToolValidationError):
+            self.registry.register(record_unknown_question_json, wrong)
+
+    def test_arguments_are_validated(self):
+        self.assertEqual(
+            self.registry.call("record_user_details", '{"email": "a@b.com"}'),
+            {"recorded": "ok"},
+        )
+        self.assertIn("error", self.registry.call("record_user_details", '{"name": "x"}'))
+        self.assertIn(
+            "error",
+            self.registry.call("record_user_details", {"email": "a@b.com", "phone": "1"}),
+        )
+        self.assertIn("error", self.registry.call("record_user_details", {"email": 5}))
+        self.assertIn("error", self.registry.call("no_such_tool", "{}"))
+        self.assertEqual(self.recorded, ["a@b.com"])
+
+    def test_calls_from_one_turn_run_in_parallel(self):
+        start = time.perf_counter()
+        results = self.registry.call_many(
+            [("record_unknown_question", {"question": f"q{i}"}) for i in range(3)]
+        )
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(results, [{"recorded": "ok"}] * 3)
+        histogram = self.registry.latency_histograms()["record_unknown_question"]
+        self.assertEqual(histogram["count"], 3)
+        self.assertEqual(histogram["buckets"][0.25], 3)
+
+    def test_chat_dispatches_streamed_tool_calls(self):
+        client = FakeOpenAI(
+            turns=[
+                {"tool_calls": [("record_user_details", {"email": "visitor@example.com"})]},
+                {"tokens": ["Thanks", "!"]},
+            ]
+        )
+        me = Me(
+            openai_client=client,
+            vector_db=FakeVectorDB(),
+            tool_registry=self.registry,
+            pipeline_guardrails=False,
+        )
+        with mock.patch.object(me.conversation_log, "log_turn"):
+            outputs = list(me.chat("My email is visitor@example.com", []))
+        self.assertEqual(outputs[-1], "Thanks!")
+        self.assertEqual(self.recorded, ["visitor@example.com"])
+        tool_message = client.calls[-1]["messages"][-1]
+        self.assertEqual(tool_message["role"], "tool")
+        self.assertEqual(json.loads(tool_message["content"]), {"recorded": "ok"})
+
+
+if __name__ == "__main__":
+    unittest.main()
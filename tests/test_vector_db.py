@@ -0,0 +1,154 @@
+import asyncio
+import tempfile
+import unittest
+
+from tests.fakes import CountingEmbeddings
+from utils.embedding_cache import EmbeddingCache
+from utils.embeddings import HashingEmbeddings
+from utils.vector_db import EmbeddingModelMismatchError, NumpyVectorDB, VectorDB
+
+
+class TestVectorDBQuery(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.embeddings = CountingEmbeddings()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _db(self, query_cache=None):
+        db = VectorDB(
+            collection_name="test_profile",
+            persist_directory=self._tmp.name,
+            embedding_model=self.embeddings,
+            query_cache=query_cache if query_cache is not None else EmbeddingCache(max_entries=0),
+        )
+        db.add_documents(
+            ["I build RAG systems", "I was an analytical chemist", "I like Python"],
+            metadatas=[{"source": "me/summary.txt"}] * 3,
+            ids=["a", "b", "c"],
+        )
+        self.embeddings.document_calls.clear()
+        return db
+
+    def test_single_query_embeds_once(self):
+        db = self._db()
+        result = db.query("What do you build?", k=2)
+        self.assertEqual(self.embeddings.calls, 1)
+        self.assertEqual(self.embeddings.query_calls, ["What do you build?"])
+        self.assertEqual(len(result["ids"][0]), 2)
+
+    def test_query_batch_is_one_embedding_request(self):
+        db = self._db()
+        result = db.query(["one", "two", "three", "two"], k=1)
+        self.assertEqual(self.embeddings.calls, 1)
+        self.assertEqual(self.embeddings.document_calls, [["one", "two", "three"]])
+        self.assertEqual(len(result["ids"]), 4)
+
+    def test_cached_queries_skip_embedding(self):
+        db = self._db(query_cache=EmbeddingCache())
+        db.query("What do you build?")
+        db.query("what do you  build?")
+        self.assertEqual(self.embeddings.calls, 1)
+
+
+class TestVectorDBEmbeddingModel(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _db(self, embeddings):
+        return VectorDB(
+            collection_name="test_profile",
+            persist_directory=self._tmp.name,
+            embedding_model=embeddings,
+            query_cache=EmbeddingCache(max_entries=0),
+        )
+
+    def test_first_write_records_model_and_dim(self):
+        db = self._db(CountingEmbeddings())
+        self.assertEqual(db.recorded_embedding, (None, None))
+        db.add_documents(["I like Python"], metadatas=[{"source": "s"}], ids=["a"])
+        self.assertEqual(db.recorded_embedding, ("counting-fake", 8))
+
+    def test_reopening_with_other_model_raises(self):
+        self._db(CountingEmbeddings()).add_documents(
+            ["I like Python"], metadatas=[{"source": "s"}], ids=["a"]
+        )
+        with self.assertRaises(EmbeddingModelMismatchError):
+            self._db(CountingEmbeddings(model="other-model"))
+
+    def test_dimension_mismatch_raises_on_write(self):
+        db = self._db(CountingEmbeddings())
+        db.add_documents(["I like Python"], metadatas=[{"source": "s"}], ids=["a"])
+        with self.assertRaises(EmbeddingModelMismatchError):
+            db.upsert(["Go"], metadatas=[{"source": "s"}], ids=["b"], embeddings=[[0.1] * 4])
+
+
+class TestNumpyVectorDB(unittest.TestCase):
+    DOCUMENTS = [
+        "I build RAG systems with LangChain and Chroma",
+        "I was an analytical chemist at Sanofi",
+        "I like Python, FastAPI and Gradio",
+        "Nitrosamine investigations at AstraZeneca",
+        "Bayesian optimisation for lab automation",
+    ]
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.chroma = self._db(VectorDB)
+        self.chroma.add_documents(
+            self.DOCUMENTS,
+            metadatas=[{"source": "me/summary.txt", "chunk_id": i} for i in range(5)],
+            ids=[f"c{i}" for i in range(5)],
+        )
+        self.numpy_db = self._db(NumpyVectorDB)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _db(self, cls):
+        return cls(
+            collection_name="test_profile",
+            persist_directory=self._tmp.name,
+            embedding_model=HashingEmbeddings(),
+            query_cache=EmbeddingCache(max_entries=0),
+        )
+
+    def test_matches_chroma_results(self):
+        include = ["documents", "metadatas", "distances"]
+        for question in ("Which Python frameworks?", "chemist at Sanofi", "RAG with Chroma"):
+            expected = self.chroma.query(question, k=3, include=include)
+            actual = self.numpy_db.query(question, k=3, include=include)
+            for got, want in zip(actual["distances"][0], expected["distances"][0]):
+                self.assertAlmostEqual(got, want, places=4)
+            # Documents sharing no terms with the query tie at distance 2.0
+            matched = sum(1 for d in expected["distances"][0] if d < 1.999)
+            self.assertGreater(matched, 0)
+            for key in ("ids", "documents", "metadatas"):
+                self.assertEqual(actual[key][0][:matched], expected[key][0][:matched])
+
+    def test_k_larger_than_collection(self):
+        result = self.numpy_db.query("Python", k=50)
+        self.assertEqual(sorted(result["ids"][0]), [f"c{i}" for i in range(5)])
+
+    def test_writes_invalidate_snapshot(self):
+        self.numpy_db.query("Python")
+        self.numpy_db.upsert(
+            ["Kaggle competitions and mathematics"],
+            metadatas=[{"source": "me/summary.txt"}],
+            ids=["c5"],
+        )
+        self.assertEqual(self.numpy_db.query("Kaggle mathematics", k=1)["ids"], [["c5"]])
+        self.numpy_db.delete(["c5"])
+        self.assertNotIn("c5", self.numpy_db.query("Kaggle mathematics", k=5)["ids"][0])
+
+    def test_aquery(self):
+        result = asyncio.run(self.numpy_db.aquery("analytical chemist", k=1))
+        self.assertEqual(result["ids"], [["c1"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
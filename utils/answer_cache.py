@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from utils.embedding_cache import normalize_query
+from utils.numpy_index import normalize_rows
+
+
+_WORD_RE = re.compile(r"\s*\S+\s*")
+
+# Details that make a reply specific to one visitor ("Hi Sarah, ..."); such
+# questions are never stored and never matched by similarity
+_PERSONAL_RE = re.compile(
+    r"[\w.+-]+@[\w-]+\.[\w.-]+"  # email
+    r"|\+?\(?\d(?:[ ()-]{0,2}\d){8,}"  # phone number (9+ digits)
+    r"|\b(?i:i'?m|i am|this is|my name is|my name's)\s+[A-Z][a-z]+"  # "I'm Sarah"
+    r"|\b(?i:my name|i work (?:at|for)|i'?m (?:with|at)|i am (?:with|at)|i represent|"
+    r"on behalf of|our (?:company|team|startup|firm|client)|we'?re (?:a|an|hiring)|we are (?:a|an|hiring))\b"
+)
+
+
+def contains_personal_details(text: str) -> bool:
+    """True if ``text`` carries a name, email, phone number or company introduction."""
+
+    return bool(_PERSONAL_RE.search(text))
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    question: str
+    answer: str
+    version: Optional[str]
+    created_at: float
+
+
+@dataclass(frozen=True)
+class AnswerHit:
+    entry: CachedAnswer
+    similarity: float
+    exact: bool
+
+
+class AnswerCache:
+    """Semantic cache of complete answers to first-turn visitor questions.
+
+    A lookup first tries the normalized question text, then the nearest stored
+    question embedding by cosine similarity. Only answers at or above
+    ``threshold`` count as hits. Entries are tagged with the collection version
+    they were generated from. A lookup under a different version drops every
+    entry, so re-ingesting the knowledge base invalidates the cache.
+    Questions with personal details (see ``contains_personal_details``) are
+    not stored and only ever get exact hits, so a reply addressed to one
+    visitor is never replayed to another. ``max_entries=0`` disables the cache.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 256,
+        threshold: float = 0.95,
+        ttl_seconds: Optional[float] = 7 * 86400,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._vectors: dict[str, np.ndarray] = {}
+        self._matrix: Optional[tuple[list[str], np.ndarray]] = None
+        self._version: Optional[str] = None
+        self.lookups = 0
+        self.hits = 0
+        self.exact_hits = 0
+        self.stores = 0
+        self.personal_skips = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> "AnswerCache":
+        """Build a cache configured by ``ANSWER_CACHE_*`` env vars."""
+
+        ttl = float(os.getenv("ANSWER_CACHE_TTL", str(7 * 86400)))
+        return cls(
+            max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "256")),
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+            ttl_seconds=ttl if ttl > 0 else None,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def lookup(
+        self, question: str, embedding: Sequence[float], version: Optional[str]
+    ) -> Optional[AnswerHit]:
+        """Return the best cached answer for ``question``, if close enough."""
+
+        if not self.enabled:
+            return None
+        key = normalize_query(question)
+        with self._lock:
+            self.lookups += 1
+            self._sync_version(version)
+            hit = self._exact(key)
+            if hit is None and not contains_personal_details(question):
+                hit = self._nearest(embedding)
+            if hit is None:
+                return None
+            self.hits += 1
+            if hit.exact:
+                self.exact_hits += 1
+            return hit
+
+    def put(
+        self,
+        question: str,
+        embedding: Sequence[float],
+        answer: str,
+        version: Optional[str],
+    ) -> None:
+        if not self.enabled or not answer:
+            return
+        if contains_personal_details(question):
+            with self._lock:
+                self.personal_skips += 1
+            return
+        key = normalize_query(question)
+        vector = normalize_rows(embedding)[0]
+        with self._lock:
+            self._sync_version(version)
+            self._entries[key] = CachedAnswer(question, answer, version, self._clock())
+            self._entries.move_to_end(key)
+            self._vectors[key] = vector
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._vectors.pop(evicted, None)
+            self._matrix = None
+            self.stores += 1
+
+    def contains(self, question: str) -> bool:
+        with self._lock:
+            return normalize_query(question) in self._entries
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "exact_hits": self.exact_hits,
+                "misses": self.lookups - self.hits,
+                "stores": self.stores,
+                "personal_skips": self.personal_skips,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            }
+
+    # ------------------------------------------------------------------
+    # Internals (call with the lock held)
+    # ------------------------------------------------------------------
+    def _clear(self) -> None:
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._vectors.clear()
+        self._matrix = None
+
+    def _sync_version(self, version: Optional[str]) -> None:
+        if version != self._version:
+            self._clear()
+            self._version = version
+
+    def _expired(self, entry: CachedAnswer) -> bool:
+        return self.ttl_seconds is not None and self._clock() - entry.created_at > self.ttl_seconds
+
+    def _exact(self, key: str) -> Optional[AnswerHit]:
+        entry = self._entries.get(key)
+        if entry is None or self._expired(entry):
+            return None
+        self._entries.move_to_end(key)
+        return AnswerHit(entry, 1.0, True)
+
+    def _nearest(self, embedding: Sequence[float]) -> Optional[AnswerHit]:
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            keys = list(self._entries)
+            self._matrix = (keys, np.vstack([self._vectors[key] for key in keys]))
+        keys, matrix = self._matrix
+        scores = matrix @ normalize_rows(embedding)[0]
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+        entry = self._entries.get(keys[best])
+        if entry is None or similarity < self.threshold or self._expired(entry):
+            return None
+        self._entries.move_to_end(keys[best])
+        return AnswerHit(entry, similarity, False)
+
+
+def replay_prefixes(answer: str, words_per_chunk: int = 3) -> Iterator[str]:
+    """Yield growing prefixes of ``answer``, a few words at a time.
+
+    Mirrors what the UI receives from a live stream, so cached answers render
+    the same way as generated ones.
+    """
+
+    words = _WORD_RE.findall(answer)
+    if not words:
+        if answer:
+            yield answer
+        return
+    for end in range(words_per_chunk, len(words) + words_per_chunk, words_per_chunk):
+        yield "".join(words[:end])
@@ -1,35 +1,212 @@
+import atexit
+import gzip
 import logging
+import logging.handlers
 import os
+import queue
+import shutil
+import threading
+import time
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def worker_path(path):
+    """``path`` made private to this worker process when ``WORKER_ID`` is set.
+
+    ``app.py`` starts each worker with its own ``WORKER_ID``; files a process
+    appends to, rotates or compacts (the app log, the conversation log, the
+    notification journal) get ``.worker<id>`` before their extension, so no
+    two processes ever write the same file.
+    """
+    worker_id = os.getenv("WORKER_ID")
+    if not path or not worker_id:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.worker{worker_id}{ext}"
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """``QueueHandler`` that never blocks the caller.
+
+    When the bounded queue is full the record is counted and dropped rather
+    than stalling a request thread or the event loop on a slow disk.
+    """
+
+    def __init__(self, log_queue, *, format_in_caller: bool = True):
+        super().__init__(log_queue)
+        self.format_in_caller = format_in_caller
+        self.dropped = 0
+
+    def prepare(self, record):
+        if self.format_in_caller:
+            return super().prepare(record)
+        # Structured payloads are serialized by the listener thread instead
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """``QueueListener`` that flushes its handlers whenever the queue goes idle."""
+
+    def __init__(self, log_queue, *handlers, flush_interval: float = 1.0):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+
+    def enqueue_sentinel(self):
+        # Block rather than fail if the queue is full at shutdown
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+            for handler in self.handlers:
+                try:
+                    handler.flush()
+                except (OSError, ValueError):
+                    # The stream may already be closed at interpreter exit
+                    pass
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class BatchingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-rotated file handler that flushes every ``flush_records`` records.
+
+    ``RotatingFileHandler`` flushes (and stats the file) on every record; here
+    writes are buffered and flushed in batches, when the listener goes idle or
+    after ``flush_interval`` seconds. With ``compress`` rotated files are
+    gzipped as ``<name>.1.gz``, ``<name>.2.gz``, ...
+    """
+
+    def __init__(
+        self,
+        filename,
+        *,
+        max_bytes: int = 0,
+        backup_count: int = 0,
+        compress: bool = False,
+        flush_records: int = 64,
+        flush_interval: float = 1.0,
+    ):
+        super().__init__(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+        if compress:
+            self.namer = _gzip_namer
+            self.rotator = _gzip_rotator
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def emit(self, record):
+        try:
+            line = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            if self.maxBytes > 0 and self.stream.tell() + len(line) >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(line)
+            self._pending += 1
+            if (
+                self._pending >= self.flush_records
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        super().flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+
+def start_queue_listener(*handlers, queue_size: int = 10000, flush_interval: float = 1.0):
+    """Start a background listener for ``handlers``; return ``(queue, listener)``.
+
+    The listener is stopped (and its handlers flushed) at interpreter exit.
+    """
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = FlushingQueueListener(log_queue, *handlers, flush_interval=flush_interval)
+    listener.start()
+    atexit.register(listener.stop)
+    return log_queue, listener
 
 
 def setup_logging():
-    """Setup logging for the application."""
-    global logger
+    """Setup logging for the application.
+
+    Records are formatted in the calling thread and handed to a background
+    listener that writes the console and ``digital-cv.log`` (``LOG_FILE``; empty
+    for console only), so logging never blocks a request on terminal or disk
+    I/O. The log file is rotated by size (``LOG_MAX_BYTES``,
+    ``LOG_BACKUP_COUNT``) and the level is ``LOG_LEVEL``.
+    Expensive payloads should be logged at DEBUG with ``%s`` arguments so they
+    are only rendered when that level is enabled.
+    """
+    global logger, _listener
     logger = logging.getLogger(__name__)
-    logger.setLevel(logging.INFO)
-    # Set common formatter
-    _formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    with _listener_lock:
+        if _listener is not None:
+            return logger
+        level = getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO)
+        logger.setLevel(level)
+        # Set common formatter
+        _formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
 
-    # Ensure logs appear in terminal even if root isn't configured
-    _has_console = any(isinstance(h, logging.StreamHandler) and not isinstance(h, logging.FileHandler) for h in logger.handlers)
-    if not _has_console:
+        # Ensure logs appear in terminal even if root isn't configured
         _console_handler = logging.StreamHandler()
-        _console_handler.setLevel(logging.INFO)
         _console_handler.setFormatter(_formatter)
-        logger.addHandler(_console_handler)
-        logger.propagate = False
+        handlers = [_console_handler]
 
-    # Ensure logs are also saved to a file next to this script
-    _log_file = os.path.join(os.path.dirname(__file__), "digital-cv.log")
-    _has_file = any(isinstance(h, logging.FileHandler) and getattr(h, "baseFilename", "") == _log_file for h in logger.handlers)
-    if not _has_file:
-        try:
-            _file_handler = logging.FileHandler(_log_file)
-            _file_handler.setLevel(logging.INFO)
-            _file_handler.setFormatter(_formatter)
-            logger.addHandler(_file_handler)
-        except Exception:
-            # If file handler can't be created, continue with console-only logging
-            pass
+        # Ensure logs are also saved to a file next to this script
+        _log_file = worker_path(
+            os.getenv("LOG_FILE", os.path.join(os.path.dirname(__file__), "digital-cv.log"))
+        )
+        if _log_file:
+            try:
+                _file_handler = BatchingRotatingFileHandler(
+                    _log_file,
+                    max_bytes=int(os.getenv("LOG_MAX_BYTES", str(5 * 1024 * 1024))),
+                    backup_count=int(os.getenv("LOG_BACKUP_COUNT", "3")),
+                )
+                _file_handler.setFormatter(_formatter)
+                handlers.append(_file_handler)
+            except Exception:
+                # If file handler can't be created, continue with console-only logging
+                pass
+
+        log_queue, _listener = start_queue_listener(
+            *handlers, queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+        )
+        logger.addHandler(DroppingQueueHandler(log_queue))
+        logger.propagate = False
     return logger
-    
\ No newline at end of file
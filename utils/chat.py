@@ -1,32 +1,42 @@
 from __future__ import annotations
 
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
 from dotenv import load_dotenv
-from openai import OpenAI
+import inspect
 import json
 import os
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
+from utils.answer_cache import AnswerCache, AnswerHit, replay_prefixes
 from utils.app_logging import setup_logging
-from utils.vector_db import VectorDB
+from utils.conversation_log import ConversationLog, get_conversation_log
+from utils.guardrails import TieredGuardrail
+from utils.history import HistoryManager, format_transcript
+from utils.persona_context import (
+    load_persona_context,
+    persona_context_path,
+    render_persona_context,
+)
+from utils.metrics import Metrics, get_metrics
+from utils.reranker import RerankingRetriever
+from utils.retrieval import HybridRetriever
+from utils.streaming import StreamBuffer
+from utils.tokenizer import CHAT_ENCODING, count_message_tokens, count_tokens, truncate_to_tokens
+from utils.tool_calls import record_unknown_question, record_user_details
+from utils.tool_registry import ToolRegistry
+from utils.vector_db import VectorDB, open_vector_db
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
 
 
 load_dotenv(override=True)
 logger = setup_logging()
 
 
-def chat_log(message, history):
-    """Save each user and assistant message to a file after each generation.
-    This is not a tool, it's just for logging.
-    Args:
-        message: The message to save.
-        history: The chat history to save.
-    """
-    logger.info(f"Saving chat log: {message}")
-    with open("chat_log.txt", "a") as f:
-        f.write(f"User: {message}\n")
-        f.write(f"Assistant: {history[-1]['content']}\n")
-
-
 record_user_details_json = {
     "name": "record_user_details",
     "description": "Use this tool to record that a user is interested in being in touch and provided an email address",
@@ -82,21 +92,251 @@ tools = [
     },
 ]
 
+# Name -> callable dispatch; schemas are validated once here at import
+default_tool_registry = ToolRegistry()
+default_tool_registry.register(record_user_details_json, record_user_details)
+default_tool_registry.register(record_unknown_question_json, record_unknown_question)
+
 # Chat Completions-compatible tools schema
-chat_tools = [
-    {"type": "function", "function": record_user_details_json},
-    {"type": "function", "function": record_unknown_question_json},
-]
+chat_tools = default_tool_registry.chat_tools()
+
+
+class _GuardrailGate:
+    """Hold streamed output back until a pending guardrail verdict arrives.
+
+    Works with both ``concurrent.futures.Future`` and ``asyncio.Task``; async
+    callers must ``await`` the task before polling with ``wait=True``.
+    """
+
+    def __init__(self, future: Optional[Future | asyncio.Task]):
+        self._future = future
+        self.allowed: Optional[bool] = True if future is None else None
+
+    def poll(self, wait: bool = False) -> Optional[bool]:
+        """Return the verdict if known, optionally blocking until it is."""
+        if self.allowed is None and (wait or self._future.done()):
+            self.allowed = bool(self._future.result())
+        return self.allowed
+
+
+def _close_stream(stream) -> None:
+    """Close a streaming response so the server stops generating tokens."""
+    close = getattr(stream, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception as exc:
+            logger.error(f"Failed to close stream: {exc}")
+
+
+async def _aclose_stream(stream) -> None:
+    """Async counterpart of ``_close_stream`` for ``AsyncStream`` responses."""
+    close = getattr(stream, "close", None)
+    if callable(close):
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as exc:
+            logger.error(f"Failed to close stream: {exc}")
+
+
+class _ToolCall:
+    """Tool call assembled from streamed deltas, shaped like the SDK object."""
+
+    def __init__(self, name, arguments, id):
+        self.function = type("Function", (), {})()
+        self.function.name = name
+        self.function.arguments = arguments
+        self.id = id
+
+
+def _merge_tool_call_deltas(streamed_tool_calls: Dict[int, Dict[str, Any]], delta) -> None:
+    """Accumulate streamed tool call fragments keyed by their index."""
+    for tc in delta.tool_calls:
+        idx = tc.index
+        if idx not in streamed_tool_calls:
+            streamed_tool_calls[idx] = {
+                "id": getattr(tc, "id", None),
+                "name": None,
+                "arguments": "",
+            }
+        func = getattr(tc, "function", None)
+        if func and getattr(func, "name", None):
+            streamed_tool_calls[idx]["name"] = func.name
+        if func and getattr(func, "arguments", None):
+            streamed_tool_calls[idx]["arguments"] += func.arguments
+
+
+def _tool_call_messages(streamed_tool_calls: Dict[int, Dict[str, Any]]):
+    """Build the assistant tool_call message and handler inputs from deltas."""
+    # Build assistant tool_call message stub
+    assistant_tool_msg = {
+        "role": "assistant",
+        "tool_calls": [
+            {
+                "id": item.get("id") or f"call_{idx}",
+                "type": "function",
+                "function": {
+                    "name": item["name"],
+                    "arguments": item.get("arguments", ""),
+                },
+            }
+            for idx, item in sorted(streamed_tool_calls.items())
+        ],
+    }
+    logger.debug("Assistant tool message: %s", assistant_tool_msg)
+    # Convert to handle_tool_call inputs
+    tool_calls_for_handler = []
+    for idx, item in sorted(streamed_tool_calls.items()):
+        logger.debug("Tool call for handler: %s", item)
+        tool_calls_for_handler.append(
+            _ToolCall(
+                name=item["name"],
+                arguments=item.get("arguments", ""),
+                id=item.get("id") or f"call_{idx}",
+            )
+        )
+    return assistant_tool_msg, tool_calls_for_handler
 
 
 class Me:
-    def __init__(self):
-        """Initialize persona context, vector database, and OpenAI client."""
-        self.openai = OpenAI()
+    def __init__(
+        self,
+        *,
+        openai_client: Optional[OpenAI] = None,
+        async_openai_client: Optional[AsyncOpenAI] = None,
+        vector_db: Optional[VectorDB] = None,
+        tool_registry: Optional[ToolRegistry] = None,
+        pipeline_guardrails: Optional[bool] = None,
+        answer_cache: Optional[AnswerCache] = None,
+        guardrails: Optional[TieredGuardrail] = None,
+        history_manager: Optional[HistoryManager] = None,
+        conversation_log: Optional[ConversationLog] = None,
+        metrics: Optional[Metrics] = None,
+        retriever: Optional[HybridRetriever] = None,
+        stream_buffer: Optional[Callable[[], StreamBuffer]] = None,
+    ):
+        """Initialize persona context, vector database, and OpenAI client.
+
+        Args:
+            openai_client: Optional pre-built OpenAI client (defaults to ``OpenAI()``,
+                created on first use).
+            async_openai_client: Optional ``AsyncOpenAI`` client used by ``achat``;
+                created on first use when omitted.
+            vector_db: Optional pre-built vector store (defaults to ``open_vector_db()``,
+                which honours ``VECTOR_DB_BACKEND``).
+            tool_registry: Tools available to the model (defaults to the module
+                registry holding ``record_user_details``/``record_unknown_question``).
+            pipeline_guardrails: Run guardrails concurrently with retrieval and
+                generation, buffering tokens until the verdict arrives. Defaults to
+                the ``CHAT_PIPELINE_GUARDRAILS`` env var (enabled unless set to ``0``).
+            answer_cache: Semantic cache of first-turn answers (defaults to
+                ``AnswerCache.from_env()``; ``AnswerCache(max_entries=0)`` disables it).
+            guardrails: Tiered guardrail (verdict cache, local classifier, LLM);
+                defaults to ``TieredGuardrail.from_env()``.
+            history_manager: Token budget and rolling summary for prompt history;
+                defaults to ``HistoryManager.from_env()`` summarizing in the background.
+            conversation_log: JSONL log every turn is queued to (defaults to the
+                process-wide log configured by ``CONVERSATION_LOG_*``).
+            metrics: Stage spans, counters and histograms (defaults to the process-wide
+                registry; ``METRICS_ENABLED=0`` makes it a no-op ``NullMetrics``).
+            retriever: Fuses vector and BM25 results for the prompt snippets;
+                defaults to ``HybridRetriever.from_env()`` over ``vector_db``, reranked
+                and token-budgeted by ``RerankingRetriever.from_env()``.
+            stream_buffer: Factory for the per-stream token accumulator that decides
+                when streamed text is yielded (defaults to ``StreamBuffer.from_env``,
+                coalescing tokens into ``CHAT_STREAM_FLUSH_MS`` flushes).
+        """
+        self._openai = openai_client
+        self._async_openai = async_openai_client
         self.name = "Daniel Halwell"
-        self.vector_db = VectorDB()
-        self.system_context = self._build_system_context()
+        self.vector_db = vector_db or open_vector_db()
+        self.tool_registry = tool_registry or default_tool_registry
+        self._prompt_lock = threading.Lock()
+        # ((persona file path, mtime), collection version, rendered system prompt)
+        self._prompt_cache: Optional[
+            tuple[tuple[Optional[str], Optional[int]], Optional[str], str]
+        ] = None
         self.email = "danielhalwell@gmail.com"
+        if pipeline_guardrails is None:
+            pipeline_guardrails = os.getenv("CHAT_PIPELINE_GUARDRAILS", "1") != "0"
+        self.pipeline_guardrails = pipeline_guardrails
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("CHAT_WORKER_THREADS", "16")),
+            thread_name_prefix="me-chat",
+        )
+        if retriever is None:
+            # Its own pool: waiting behind guardrail checks and summaries in the
+            # shared one would count against the embed timeout
+            retrieval_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("RETRIEVAL_WORKER_THREADS", "4")),
+                thread_name_prefix="me-retrieval",
+            )
+            retriever = RerankingRetriever.from_env(
+                HybridRetriever.from_env(self.vector_db, executor=retrieval_executor)
+            )
+        self.retriever = retriever
+        self.answer_cache = answer_cache if answer_cache is not None else AnswerCache.from_env()
+        self.guardrails = guardrails if guardrails is not None else TieredGuardrail.from_env()
+        self._replay_delay = float(os.getenv("ANSWER_CACHE_REPLAY_DELAY", "0"))
+        self._stream_buffer = stream_buffer or StreamBuffer.from_env
+        self.history_manager = history_manager or HistoryManager.from_env(
+            summarizer=self._summarize_history, executor=self._executor
+        )
+        self.conversation_log = (
+            conversation_log if conversation_log is not None else get_conversation_log()
+        )
+        self.metrics = metrics if metrics is not None else get_metrics()
+        self.metrics.register_collector("chat", self._collect_metrics)
+        # (system prompt, its token count)
+        self._prompt_tokens: Optional[tuple[str, int]] = None
+
+    @property
+    def openai(self) -> OpenAI:
+        """Lazily constructed client; importing ``openai`` is deferred until first use."""
+        if self._openai is None:
+            from openai import OpenAI
+
+            self._openai = OpenAI()
+        return self._openai
+
+    @property
+    def async_openai(self) -> AsyncOpenAI:
+        """Lazily constructed async client so sync-only callers never need one."""
+        if self._async_openai is None:
+            from openai import AsyncOpenAI
+
+            self._async_openai = AsyncOpenAI()
+        return self._async_openai
+
+    @property
+    def _persona_path(self) -> Optional[str]:
+        # Resolved per use: a snapshot store serves each version's own file
+        return persona_context_path(self.vector_db)
+
+    @property
+    def system_context(self) -> str:
+        """Persona context embedded in the system prompt."""
+        return self._load_persona_context()[0]
+
+    def _load_persona_context(self, path: Optional[str] = None) -> tuple[str, Optional[str]]:
+        """Return the persona context and the collection version it came from.
+
+        Prefers the representative chunks selected at ingest time
+        (``persona_context.json``); falls back to peeking the collection when
+        the file has not been built yet.
+        """
+
+        payload = load_persona_context(path or self._persona_path)
+        if payload and payload.get("entries"):
+            context = (
+                "You are provided with an indexed knowledge base about Daniel Halwell."
+                " Use it to answer questions faithfully.\n\n"
+                + render_persona_context(payload["entries"])
+            )
+            return context, payload.get("collection_version")
+        return self._build_system_context(), None
 
     def _build_system_context(self) -> str:
         """Render a concise persona context from vector store contents."""
@@ -165,14 +405,30 @@ class Me:
             return ""
 
         try:
-            results = self.vector_db.query(
-                query,
-                k=4,
-                include=["documents", "metadatas", "distances"],
-            )
+            results = self.retriever.query(query, k=4)
+        except Exception as exc:
+            logger.error(f"Retrieval failed: {exc}")
+            return ""
+        return self._format_retrieval_context(results)
+
+    async def _abuild_retrieval_context(
+        self, message: str, history: Optional[List[Dict[str, Any]]]
+    ) -> str:
+        """Async counterpart of ``_build_retrieval_context``."""
+
+        query = self._compose_retrieval_query(message, history)
+        if not query:
+            return ""
+
+        try:
+            results = await self.retriever.aquery(query, k=4)
         except Exception as exc:
-            logger.error(f"Vector DB query failed: {exc}")
+            logger.error(f"Retrieval failed: {exc}")
             return ""
+        return self._format_retrieval_context(results)
+
+    def _format_retrieval_context(self, results: Any) -> str:
+        """Render Chroma-style query results as numbered prompt snippets."""
 
         documents = []
         metadatas = []
@@ -207,31 +463,70 @@ class Me:
     def handle_tool_call(self, tool_calls):
         """Execute streamed tool calls and return tool result messages.
 
+        Calls are dispatched through the tool registry, which validates the
+        arguments and runs multiple calls from one turn in parallel.
+
         Args:
             tool_calls: Iterable of tool call objects containing name, arguments, and id.
 
         Returns:
             A list of tool result message dicts compatible with the OpenAI responses API.
         """
-        results = []
+        tool_calls = list(tool_calls)
         for tool_call in tool_calls:
-            tool_name = tool_call.function.name
-            arguments = json.loads(tool_call.function.arguments)
-            logger.info(f"Tool called: {tool_name} with arguments: {arguments}")
-            tool = globals().get(tool_name)
-            result = tool(**arguments) if tool else {}
-            results.append(
-                {
-                    "role": "tool",
-                    "content": json.dumps(result),
-                    "tool_call_id": tool_call.id,
-                }
+            logger.info(
+                f"Tool called: {tool_call.function.name} with arguments: {tool_call.function.arguments}"
             )
-        return results
+        outputs = self.tool_registry.call_many(
+            [(tc.function.name, tc.function.arguments) for tc in tool_calls]
+        )
+        return [
+            {
+                "role": "tool",
+                "content": json.dumps(output),
+                "tool_call_id": tool_call.id,
+            }
+            for tool_call, output in zip(tool_calls, outputs)
+        ]
+
+    async def ahandle_tool_call(self, tool_calls):
+        """Run ``handle_tool_call`` off the event loop so tool I/O never blocks it."""
+        return await asyncio.to_thread(self.handle_tool_call, tool_calls)
 
     def system_prompt(self):
-        """Construct the system prompt using persona context and vector DB summary."""
+        """Return the system prompt, rendered once per persona context version.
 
+        The result is cached and reused verbatim across turns and sessions so
+        the prompt prefix stays byte-identical (and provider prompt caching
+        can hit). Each call only stats the persona context file; the prompt is
+        re-rendered when a rebuild changed the collection version.
+        """
+
+        path = self._persona_path
+        mtime: Optional[int] = None
+        if path:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+        stamp = (path, mtime)
+        cached = self._prompt_cache
+        if cached is not None and cached[0] == stamp:
+            return cached[2]
+
+        with self._prompt_lock:
+            cached = self._prompt_cache
+            if cached is not None and cached[0] == stamp:
+                return cached[2]
+            context, version = self._load_persona_context(path)
+            if cached is not None and version is not None and cached[1] == version:
+                prompt = cached[2]
+            else:
+                prompt = self._render_system_prompt(context)
+            self._prompt_cache = (stamp, version, prompt)
+            return prompt
+
+    def _render_system_prompt(self, system_context: str) -> str:
         return f"""
 You are acting as {self.name}. You are answering questions on {self.name}'s website, particularly questions related to {self.name}'s career, background, skills and experience.
 Your responsibility is to represent {self.name} for interactions on the website as faithfully as possible.
@@ -239,14 +534,15 @@ You have access to a retrieval system that stores vetted chunks about {self.name
 Sound warm, upbeat, and conversational — imagine you are chatting with someone you’d happily grab coffee with. Use friendly acknowledgements (e.g. “Great question,” “Happy to share,” “Thanks for asking”) before giving specifics. Keep explanations concise but encouraging, and invite them to follow up or email you if they want deeper detail.
 If you cannot answer confidently, log the question via the record_unknown_question tool and gently mention you’ll circle back.
 Context preview:
-{self.system_context}
+{system_context}
 """
 
     def chat_guardrails(self, message, history):
         """Return True if the user message is appropriate, False otherwise.
 
-        Uses an LLM to classify sentiment and appropriateness without any
-        allow/deny heuristics. Falls back to True on error.
+        Checks the verdict cache, then the local classifier, and only sends
+        ambiguous messages to the LLM classifier. Falls back to True if the
+        LLM call fails.
 
         Args:
             message: The latest user message string.
@@ -255,6 +551,37 @@ Context preview:
         Returns:
             Boolean indicating whether the message is appropriate.
         """
+        with self.metrics.span("guardrail"):
+            return self.guardrails.check(message, self._llm_guardrail)
+
+    async def achat_guardrails(self, message, history):
+        """Async counterpart of ``chat_guardrails`` using the ``AsyncOpenAI`` client."""
+        with self.metrics.span("guardrail"):
+            return await self.guardrails.acheck(message, self._allm_guardrail)
+
+    def _llm_guardrail(self, message) -> Optional[bool]:
+        """Classify ``message`` with the LLM; ``None`` if the call failed."""
+        try:
+            resp = self.openai.chat.completions.create(**self._guardrail_request(message))
+            return self._parse_guardrail_verdict(resp)
+        except Exception as e:
+            logger.error("Guardrails call failed, defaulting to allowing the message")
+            logger.error(f"Exception: {e}")
+            return None
+
+    async def _allm_guardrail(self, message) -> Optional[bool]:
+        try:
+            resp = await self.async_openai.chat.completions.create(
+                **self._guardrail_request(message)
+            )
+            return self._parse_guardrail_verdict(resp)
+        except Exception as e:
+            logger.error("Guardrails call failed, defaulting to allowing the message")
+            logger.error(f"Exception: {e}")
+            return None
+
+    def _guardrail_request(self, message) -> Dict[str, Any]:
+        """Build the chat completion kwargs for the guardrail classifier."""
         system_msg = (
             "You are a sentiment and safety classifier. First assess sentiment "
             "(positive, neutral, or negative). Then determine if the message is "
@@ -263,27 +590,23 @@ Context preview:
             "or 'False' if not. Do not output anything else."
             "The only exception to PII is email, which is allowed if it's in the context of the conversation."
         )
-        try:
-            resp = self.openai.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_msg},
-                    {"role": "user", "content": message},
-                ],
-                temperature=0,
-                max_tokens=3,
-            )
-            raw = (resp.choices[0].message.content or "").strip()
-            cleaned = "".join(ch for ch in raw if ch.isalpha()).lower()
-            verdict = (
-                True if cleaned == "true" else False if cleaned == "false" else True
-            )
-            logger.info(f"Guardrails response: {raw} -> {verdict}")
-            return verdict
-        except Exception as e:
-            logger.error("Guardrails call failed, defaulting to allowing the message")
-            logger.error(f"Exception: {e}")
-            return True
+        return {
+            "model": "gpt-4o",
+            "messages": [
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": message},
+            ],
+            "temperature": 0,
+            "max_tokens": 3,
+        }
+
+    def _parse_guardrail_verdict(self, resp) -> bool:
+        """Map the classifier output to a verdict, defaulting to True if unclear."""
+        raw = (resp.choices[0].message.content or "").strip()
+        cleaned = "".join(ch for ch in raw if ch.isalpha()).lower()
+        verdict = True if cleaned == "true" else False if cleaned == "false" else True
+        logger.info(f"Guardrails response: {raw} -> {verdict}")
+        return verdict
 
     def chat_guardrails_response(self):
         """Return a standard response for blocked (inappropriate) messages."""
@@ -292,59 +615,311 @@ Context preview:
             "about sensitive or inappropriate topics."
         )
 
+    def _build_messages(
+        self,
+        message: str,
+        history: Optional[List[Dict[str, Any]]],
+        retrieval_context: str,
+    ) -> List[Dict[str, Any]]:
+        """Assemble the system prompt, retrieved snippets, history and user turn.
+
+        History goes through the history manager, which keeps recent turns
+        verbatim, summarizes older ones and fits everything in the prompt
+        token budget. If the system prompt, snippets and user message alone
+        exceed the budget, the snippets are truncated.
+        """
+
+        system_prompt = self.system_prompt()
+        fixed = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": message},
+        ]
+        # The prompt is byte-identical across turns, so count it once per render
+        if self._prompt_tokens is None or self._prompt_tokens[0] is not system_prompt:
+            self._prompt_tokens = (system_prompt, count_message_tokens(fixed[:1]))
+        fixed_tokens = self._prompt_tokens[1] + count_message_tokens(fixed[1:])
+
+        retrieval_messages: List[Dict[str, Any]] = []
+        if retrieval_context:
+            preamble = (
+                "Use the following retrieved snippets when forming your answer."
+                f" If they are empty, rely on your general knowledge of Daniel Halwell. If you don't know the answer, log the question via the record_unknown_question tool. My email is {self.email}.\n"
+            )
+            budget = self.history_manager.total_budget
+            if budget is not None:
+                available = budget - fixed_tokens - count_message_tokens(
+                    [{"role": "system", "content": preamble}]
+                )
+                retrieval_context = truncate_to_tokens(retrieval_context, available)
+            if retrieval_context:
+                retrieval_messages = [{"role": "system", "content": preamble + retrieval_context}]
+                fixed_tokens += count_message_tokens(retrieval_messages)
+
+        history_messages = self.history_manager.compact(history, reserved_tokens=fixed_tokens)
+        return fixed[:1] + retrieval_messages + history_messages + fixed[1:]
+
+    def _summarize_history(self, summary: str, messages: List[Dict[str, Any]]) -> str:
+        """Fold ``messages`` into the running conversation ``summary``."""
+        transcript = format_transcript(messages)
+        resp = self.openai.chat.completions.create(
+            model=os.getenv("CHAT_SUMMARY_MODEL", "gpt-4o-mini"),
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        f"You maintain a running summary of a website chat between a visitor"
+                        f" and {self.name}. Merge the new messages into the existing summary."
+                        " Keep names, contact details the visitor shared, questions asked and"
+                        " commitments made. Reply with the updated summary only, in under"
+                        " 200 words."
+                    ),
+                },
+                {
+                    "role": "user",
+                    "content": f"Existing summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}",
+                },
+            ],
+            temperature=0,
+            max_tokens=300,
+        )
+        return resp.choices[0].message.content or summary
+
+    def _finish_turn(
+        self,
+        message: str,
+        history: Optional[List[Dict[str, Any]]],
+        response: str,
+        turn: Dict[str, Any],
+        start: float,
+    ) -> None:
+        """Record metrics for the finished (or abandoned) turn and queue its log record."""
+        duration = time.perf_counter() - start
+        if response == self.chat_guardrails_response():
+            turn["outcome"] = "blocked"
+        ttft = turn.pop("ttft", None)
+        metrics = self.metrics
+        if metrics.enabled:
+            metrics.inc("turns_total", outcome=turn["outcome"])
+            metrics.observe("turn_duration_seconds", duration)
+            if ttft is not None:
+                metrics.observe("time_to_first_token_seconds", ttft)
+            for name in turn["tools"]:
+                metrics.inc("tool_calls_total", tool=name)
+        self.conversation_log.log_turn(
+            message=message,
+            response=response,
+            history_messages=len(history or []),
+            duration_ms=round(duration * 1000, 1),
+            ttft_ms=round(ttft * 1000, 1) if ttft is not None else None,
+            **turn,
+        )
+
+    def _record_request(self, messages: List[Dict[str, Any]]) -> None:
+        if self.metrics.enabled:
+            self.metrics.inc("llm_requests_total")
+            self.metrics.inc("prompt_tokens_total", count_message_tokens(messages))
+
+    def _record_completion(self, content: str, stream_start: float) -> None:
+        if self.metrics.enabled:
+            self.metrics.record_stage("stream", time.perf_counter() - stream_start)
+            if content:
+                self.metrics.inc("completion_tokens_total", count_tokens(content, CHAT_ENCODING))
+
+    def _collect_metrics(self):
+        """Scrape-time metric families from the caches, guardrails and tools."""
+        answer = self.answer_cache.stats()
+        yield "answer_cache_requests_total", "counter", [
+            ({"result": "hit"}, answer["hits"]),
+            ({"result": "miss"}, answer["misses"]),
+        ]
+        yield "answer_cache_entries", "gauge", [({}, answer["entries"])]
+        query_cache = getattr(self.vector_db, "query_cache", None)
+        if query_cache is not None:
+            embedding = query_cache.stats()
+            yield "embedding_cache_requests_total", "counter", [
+                ({"result": "hit"}, embedding["hits"]),
+                ({"result": "miss"}, embedding["misses"]),
+            ]
+        yield "retrieval_queries_total", "counter", [
+            ({"outcome": outcome}, count) for outcome, count in self.retriever.stats().items()
+        ]
+        rerank_stats = getattr(self.retriever, "rerank_stats", None)
+        if rerank_stats is not None:
+            rerank = rerank_stats()
+            yield "rerank_total", "counter", [
+                ({"outcome": outcome}, count) for outcome, count in rerank["outcomes"].items()
+            ]
+            yield "rerank_overruns_total", "counter", [({}, rerank["overruns"])]
+            yield "rerank_cache_requests_total", "counter", [
+                ({"result": "hit"}, rerank["cache_hits"]),
+                ({"result": "miss"}, rerank["cache_misses"]),
+            ]
+        guardrails = self.guardrails.stats()
+        yield "guardrail_decisions_total", "counter", [
+            ({"tier": tier, "verdict": verdict}, count)
+            for tier, counts in guardrails["decisions"].items()
+            for verdict, count in counts.items()
+        ]
+        yield "guardrail_llm_errors_total", "counter", [({}, guardrails["llm_errors"])]
+        yield "guardrail_latency_seconds", "histogram", [
+            ({"tier": tier}, snapshot) for tier, snapshot in guardrails["latency"].items()
+        ]
+        yield "tool_latency_seconds", "histogram", [
+            ({"tool": name}, snapshot)
+            for name, snapshot in self.tool_registry.latency_histograms().items()
+        ]
+        yield "conversation_log_dropped_total", "counter", [({}, self.conversation_log.dropped)]
+
+    # ------------------------------------------------------------------
+    # Answer cache
+    # ------------------------------------------------------------------
+    def _collection_version(self) -> Optional[str]:
+        """Version of the indexed collection, as recorded in the persona context."""
+        self.system_prompt()
+        return self._prompt_cache[1] if self._prompt_cache else None
+
+    def _answer_cacheable(self, message: str, history: Optional[List[Dict[str, Any]]]) -> bool:
+        """Only first turns are cached; later answers depend on the conversation.
+
+        The UI seeds history with an assistant greeting, so only user turns count.
+        """
+        if not self.answer_cache.enabled or not message.strip():
+            return False
+        if not hasattr(self.vector_db, "embed_queries"):
+            return False
+        return not any(isinstance(m, dict) and m.get("role") == "user" for m in (history or []))
+
+    def _lookup_answer(
+        self, message: str
+    ) -> tuple[Optional[AnswerHit], Optional[List[float]], Optional[str]]:
+        """Embed ``message`` (shared with retrieval via the query cache) and look it up."""
+        try:
+            query = self._compose_retrieval_query(message, None)
+            embedding = self.vector_db.embed_queries([query])[0]
+        except Exception as exc:
+            logger.error(f"Answer cache lookup failed: {exc}")
+            return None, None, None
+        version = self._collection_version()
+        return self.answer_cache.lookup(message, embedding, version), embedding, version
+
+    async def _alookup_answer(
+        self, message: str
+    ) -> tuple[Optional[AnswerHit], Optional[List[float]], Optional[str]]:
+        """Async counterpart of ``_lookup_answer``."""
+        try:
+            query = self._compose_retrieval_query(message, None)
+            embedding = (await self.vector_db.aembed_queries([query]))[0]
+        except Exception as exc:
+            logger.error(f"Answer cache lookup failed: {exc}")
+            return None, None, None
+        version = self._collection_version()
+        return self.answer_cache.lookup(message, embedding, version), embedding, version
+
+    def _replay_answer(self, answer: str):
+        """Replay a cached answer as a simulated token stream."""
+        for prefix in replay_prefixes(answer):
+            yield prefix
+            if self._replay_delay:
+                time.sleep(self._replay_delay)
+
+    async def _areplay_answer(self, answer: str):
+        for prefix in replay_prefixes(answer):
+            yield prefix
+            if self._replay_delay:
+                await asyncio.sleep(self._replay_delay)
+
+    def prewarm_answer_cache(self, prompts: List[str]) -> int:
+        """Generate and cache answers for known prompts, e.g. the UI's examples.
+
+        Returns:
+            The number of prompts that now have a cached answer.
+        """
+        warmed = 0
+        for prompt in prompts:
+            if not self._answer_cacheable(prompt, []):
+                continue
+            try:
+                for _ in self.chat(prompt, []):
+                    pass
+            except Exception as exc:
+                logger.error(f"Failed to prewarm answer for {prompt!r}: {exc}")
+                continue
+            warmed += self.answer_cache.contains(prompt)
+        logger.info(f"Answer cache prewarmed with {warmed}/{len(prompts)} prompts")
+        return warmed
+
     def chat(self, message, history):
         """Generator that streams a chat response and handles tool calls.
 
+        When ``pipeline_guardrails`` is enabled the guardrail classifier runs on a
+        worker thread while retrieval runs and the completion stream opens. Tokens
+        are buffered until the verdict arrives; a negative verdict closes the
+        stream and nothing generated is shown.
+
         Args:
             message: The latest user message string.
             history: Prior conversation history as a list of role/content dicts.
 
         Returns:
-            Yields progressively longer assistant message strings for streaming UI updates.
+            Yields progressively longer assistant message strings for streaming UI updates,
+            coalesced by the stream buffer (``CHAT_STREAM_FLUSH_MS``) rather than one per token.
         """
 
-        # Sanitize incoming history to only include role/content pairs
-        def _sanitize(msg):
-            return {"role": msg.get("role"), "content": msg.get("content", "")}
-
-        retrieval_context = self._build_retrieval_context(message, history)
-
-        messages = (
-            [{"role": "system", "content": self.system_prompt()}]
-            + (
-                [
-                    {
-                        "role": "system",
-                        "content": (
-                            "Use the following retrieved snippets when forming your answer."
-                            f" If they are empty, rely on your general knowledge of Daniel Halwell. If you don't know the answer, log the question via the record_unknown_question tool. My email is {self.email}.\n"
-                            + retrieval_context
-                        ),
-                    }
-                ]
-                if retrieval_context
-                else []
-            )
-            + [
-                _sanitize(m)
-                for m in (history or [])
-                if isinstance(m, dict) and m.get("role") in {"user", "assistant"}
-            ]
-            + [{"role": "user", "content": message}]
-        )
+        turn: Dict[str, Any] = {"outcome": "incomplete", "tools": []}
+        start = time.perf_counter()
+        response = ""
+        try:
+            for response in self._chat_turn(message, history, turn):
+                if "ttft" not in turn:
+                    turn["ttft"] = time.perf_counter() - start
+                yield response
+        finally:
+            self._finish_turn(message, history, response, turn, start)
+
+    def _chat_turn(self, message, history, turn: Dict[str, Any]):
         logger.info(f"User: {message}")
-        if not self.chat_guardrails(message, history):
+        cache_embedding = cache_version = None
+        if self._answer_cacheable(message, history):
+            with self.metrics.span("answer_cache_lookup"):
+                hit, cache_embedding, cache_version = self._lookup_answer(message)
+            if hit is not None:
+                logger.info(f"Answer cache hit (similarity {hit.similarity:.3f})")
+                turn["outcome"] = "cached"
+                # A near-duplicate is still new text, so it still gets classified
+                if not hit.exact and not self.chat_guardrails(message, history):
+                    yield self.chat_guardrails_response()
+                    return
+                yield from self._replay_answer(hit.entry.answer)
+                return
+        used_tools = False
+        guardrail_future = (
+            self._executor.submit(self.chat_guardrails, message, history)
+            if self.pipeline_guardrails
+            else None
+        )
+        with self.metrics.span("retrieval"):
+            retrieval_context = self._build_retrieval_context(message, history)
+        with self.metrics.span("build_messages"):
+            messages = self._build_messages(message, history, retrieval_context)
+        if guardrail_future is None and not self.chat_guardrails(message, history):
             yield self.chat_guardrails_response()
             return
+        gate = _GuardrailGate(guardrail_future)
         while True:
-            stream = self.openai.chat.completions.create(
-                model="gpt-5-mini",
-                messages=messages,
-                tools=chat_tools,
-                stream=True,
-            )
+            if gate.poll() is False:
+                yield self.chat_guardrails_response()
+                return
+            self._record_request(messages)
+            with self.metrics.span("stream_open"):
+                stream = self.openai.chat.completions.create(
+                    model="gpt-5-mini",
+                    messages=messages,
+                    tools=self.tool_registry.chat_tools(),
+                    stream=True,
+                )
+            stream_start = time.perf_counter()
 
-            content_accumulated = ""
+            buffer = self._stream_buffer()
             streamed_tool_calls = {}
             finish_reason = None
 
@@ -354,70 +929,178 @@ Context preview:
                 choice = event.choices[0]
                 delta = getattr(choice, "delta", None)
                 if delta and getattr(delta, "content", None):
-                    content_accumulated += delta.content
-                    yield content_accumulated
+                    buffer.append(delta.content)
+                    verdict = gate.poll()
+                    if verdict is False:
+                        _close_stream(stream)
+                        yield self.chat_guardrails_response()
+                        return
+                    if verdict and buffer.ready():
+                        yield buffer.flush()
                 # Collect tool call deltas
                 if delta and getattr(delta, "tool_calls", None):
-                    for tc in delta.tool_calls:
-                        idx = tc.index
-                        if idx not in streamed_tool_calls:
-                            streamed_tool_calls[idx] = {
-                                "id": getattr(tc, "id", None),
-                                "name": None,
-                                "arguments": "",
-                            }
-                        func = getattr(tc, "function", None)
-                        if func and getattr(func, "name", None):
-                            streamed_tool_calls[idx]["name"] = func.name
-                        if func and getattr(func, "arguments", None):
-                            streamed_tool_calls[idx]["arguments"] += func.arguments
+                    _merge_tool_call_deltas(streamed_tool_calls, delta)
                 if getattr(choice, "finish_reason", None):
                     finish_reason = choice.finish_reason
                     break
+            content_accumulated = buffer.text
+            self._record_completion(content_accumulated, stream_start)
+            # Never flush buffered tokens or run tools before the verdict is in
+            if gate.allowed is None and not gate.poll(wait=True):
+                _close_stream(stream)
+                yield self.chat_guardrails_response()
+                return
+            if buffer.pending:
+                yield buffer.flush()
             # If the model wants tool calls, execute them and continue the loop
             if finish_reason == "tool_calls" and streamed_tool_calls:
-                # Build assistant tool_call message stub
-                assistant_tool_msg = {
-                    "role": "assistant",
-                    "tool_calls": [
-                        {
-                            "id": item.get("id") or f"call_{idx}",
-                            "type": "function",
-                            "function": {
-                                "name": item["name"],
-                                "arguments": item.get("arguments", ""),
-                            },
-                        }
-                        for idx, item in sorted(streamed_tool_calls.items())
-                    ],
-                }
-                logger.info(f"Assistant tool message: {assistant_tool_msg}")
-                # Convert to handle_tool_call inputs
-                tool_calls_for_handler = []
-                for idx, item in sorted(streamed_tool_calls.items()):
-
-                    class ToolCall:
-                        def __init__(self, name, arguments, id):
-                            self.function = type("Function", (), {})()
-                            self.function.name = name
-                            self.function.arguments = arguments
-                            self.id = id
-
-                    logger.info(f"Tool call for handler: {item}")
-                    tool_calls_for_handler.append(
-                        ToolCall(
-                            name=item["name"],
-                            arguments=item.get("arguments", ""),
-                            id=item.get("id") or f"call_{idx}",
-                        )
-                    )
+                assistant_tool_msg, tool_calls_for_handler = _tool_call_messages(
+                    streamed_tool_calls
+                )
                 logger.info(f"Tool calls for handler: {tool_calls_for_handler}")
-                results = self.handle_tool_call(tool_calls_for_handler)
+                with self.metrics.span("tool_execution"):
+                    results = self.handle_tool_call(tool_calls_for_handler)
+                used_tools = True
+                turn["tools"].extend(tc.function.name for tc in tool_calls_for_handler)
                 messages.append(assistant_tool_msg)
                 messages.extend(results)
-                logger.info(f"Messages: {messages}")
-                chat_log(message, messages)
+                logger.debug("Messages: %s", messages)
                 continue
 
             logger.info(f"Assistant final response: {content_accumulated}")
+            turn["outcome"] = "answered"
+            if cache_embedding is not None and not used_tools:
+                self.answer_cache.put(message, cache_embedding, content_accumulated, cache_version)
             return
+
+    async def achat(self, message, history):
+        """Async generator counterpart of ``chat`` built on ``AsyncOpenAI``.
+
+        Runs the guardrail classifier as a task alongside retrieval and the
+        completion stream, so many conversations can share one event loop
+        instead of each holding a worker thread.
+
+        Args:
+            message: The latest user message string.
+            history: Prior conversation history as a list of role/content dicts.
+
+        Returns:
+            Yields progressively longer assistant message strings for streaming UI updates,
+            coalesced by the stream buffer (``CHAT_STREAM_FLUSH_MS``) rather than one per token.
+        """
+
+        turn: Dict[str, Any] = {"outcome": "incomplete", "tools": []}
+        start = time.perf_counter()
+        response = ""
+        try:
+            async for response in self._achat_turn(message, history, turn):
+                if "ttft" not in turn:
+                    turn["ttft"] = time.perf_counter() - start
+                yield response
+        finally:
+            self._finish_turn(message, history, response, turn, start)
+
+    async def _achat_turn(self, message, history, turn: Dict[str, Any]):
+        logger.info(f"User: {message}")
+        cache_embedding = cache_version = None
+        if self._answer_cacheable(message, history):
+            with self.metrics.span("answer_cache_lookup"):
+                hit, cache_embedding, cache_version = await self._alookup_answer(message)
+            if hit is not None:
+                logger.info(f"Answer cache hit (similarity {hit.similarity:.3f})")
+                turn["outcome"] = "cached"
+                if not hit.exact and not await self.achat_guardrails(message, history):
+                    yield self.chat_guardrails_response()
+                    return
+                async for prefix in self._areplay_answer(hit.entry.answer):
+                    yield prefix
+                return
+        used_tools = False
+        guardrail_task = (
+            asyncio.create_task(self.achat_guardrails(message, history))
+            if self.pipeline_guardrails
+            else None
+        )
+        try:
+            with self.metrics.span("retrieval"):
+                retrieval_context = await self._abuild_retrieval_context(message, history)
+            with self.metrics.span("build_messages"):
+                messages = self._build_messages(message, history, retrieval_context)
+            if guardrail_task is None and not await self.achat_guardrails(
+                message, history
+            ):
+                yield self.chat_guardrails_response()
+                return
+            gate = _GuardrailGate(guardrail_task)
+            while True:
+                if gate.poll() is False:
+                    yield self.chat_guardrails_response()
+                    return
+                self._record_request(messages)
+                with self.metrics.span("stream_open"):
+                    stream = await self.async_openai.chat.completions.create(
+                        model="gpt-5-mini",
+                        messages=messages,
+                        tools=self.tool_registry.chat_tools(),
+                        stream=True,
+                    )
+                stream_start = time.perf_counter()
+
+                buffer = self._stream_buffer()
+                streamed_tool_calls = {}
+                finish_reason = None
+
+                async for event in stream:
+                    if not getattr(event, "choices", None):
+                        continue
+                    choice = event.choices[0]
+                    delta = getattr(choice, "delta", None)
+                    if delta and getattr(delta, "content", None):
+                        buffer.append(delta.content)
+                        verdict = gate.poll()
+                        if verdict is False:
+                            await _aclose_stream(stream)
+                            yield self.chat_guardrails_response()
+                            return
+                        if verdict and buffer.ready():
+                            yield buffer.flush()
+                    if delta and getattr(delta, "tool_calls", None):
+                        _merge_tool_call_deltas(streamed_tool_calls, delta)
+                    if getattr(choice, "finish_reason", None):
+                        finish_reason = choice.finish_reason
+                        break
+                content_accumulated = buffer.text
+                self._record_completion(content_accumulated, stream_start)
+                # Never flush buffered tokens or run tools before the verdict is in
+                if gate.allowed is None:
+                    await guardrail_task
+                    if not gate.poll(wait=True):
+                        await _aclose_stream(stream)
+                        yield self.chat_guardrails_response()
+                        return
+                if buffer.pending:
+                    yield buffer.flush()
+                if finish_reason == "tool_calls" and streamed_tool_calls:
+                    assistant_tool_msg, tool_calls_for_handler = _tool_call_messages(
+                        streamed_tool_calls
+                    )
+                    with self.metrics.span("tool_execution"):
+                        results = await self.ahandle_tool_call(tool_calls_for_handler)
+                    used_tools = True
+                    turn["tools"].extend(tc.function.name for tc in tool_calls_for_handler)
+                    messages.append(assistant_tool_msg)
+                    messages.extend(results)
+                    logger.debug("Messages: %s", messages)
+                    continue
+
+                logger.info(f"Assistant final response: {content_accumulated}")
+                turn["outcome"] = "answered"
+                if cache_embedding is not None and not used_tools:
+                    self.answer_cache.put(
+                        message, cache_embedding, content_accumulated, cache_version
+                    )
+                return
+        finally:
+            # A stopped or finished conversation must not leave the classifier running
+            if guardrail_task is not None and not guardrail_task.done():
+                guardrail_task.cancel()
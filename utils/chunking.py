@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional, Sequence
+
+import numpy as np
+
+from utils.embeddings import tokenize
+from utils.tokenizer import EMBEDDING_ENCODING, count_tokens
+
+
+# ----------------------------------------------------------------------
+# Document structure
+# ----------------------------------------------------------------------
+# Section headings of a LinkedIn profile export, each on a line of its own
+PROFILE_HEADINGS = frozenset(
+    {
+        "Contact",
+        "Top Skills",
+        "Languages",
+        "Certifications",
+        "Honors-Awards",
+        "Publications",
+        "Patents",
+        "Summary",
+        "Experience",
+        "Education",
+    }
+)
+
+_MONTHS = (
+    "January|February|March|April|May|June|July|August|September|October|November|December"
+    "|Jan|Feb|Mar|Apr|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec"
+)
+# "May 2021 - Present (4 years 5 months)": the line under a role title
+_ROLE_DATES = re.compile(rf"^(?:{_MONTHS})\s+\d{{4}}\s+-\s+(?:Present|(?:{_MONTHS})\s+\d{{4}})")
+# "4 years 1 month": an employer's total tenure, above its first role
+_TENURE = re.compile(r"^\d+ years?(?: \d+ months?)?$|^\d+ months?$")
+_PAGE_FOOTER = re.compile(r"^\s*Page \d+ of \d+\s*$")
+_RULE = re.compile(r"^\s*(?:—|--+|–)\s*$")
+_BULLET = re.compile(r"^\s*(?:[•▪◦*\-–]|\d+[.)])\s+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class Chunk:
+    """A chunk of text and the section of the document it came from."""
+
+    text: str
+    section: Optional[str] = None
+    tokens: int = 0
+
+    @property
+    def metadata(self) -> dict[str, Any]:
+        # Chroma rejects None metadata values, so absent fields are left out
+        return {"section": self.section} if self.section else {}
+
+
+@dataclass
+class _Block:
+    section: Optional[str]
+    units: list[str] = field(default_factory=list)
+
+
+def _is_label(line: str) -> bool:
+    """Whether ``line`` looks like a company or job title rather than wrapped prose."""
+
+    line = line.strip()
+    return 0 < len(line) <= 60 and line[0].isupper() and not line.endswith((".", ",", ";", ":"))
+
+
+def parse_blocks(text: str) -> list[_Block]:
+    """Split ``text`` into blocks of paragraphs and bullet items, by section.
+
+    Recognised boundaries:
+
+    * ``—`` / ``--`` rules, with a title line between two rules naming a new
+      section (the narrative ``summary.txt`` format);
+    * ``[Metadata] ... [/Metadata]`` annotations, which start a new block and
+      are not indexed themselves;
+    * LinkedIn export headings (``Experience``, ``Education``, ...) and, under
+      ``Experience``, each role (company and title above a date range; a
+      later role at the same employer keeps its company).
+
+    Hard-wrapped lines are joined into one paragraph; each bullet item is a
+    unit of its own so a chunk never ends half-way through one.
+    """
+
+    lines = [line.rstrip() for line in text.splitlines() if not _PAGE_FOOTER.match(line)]
+    blocks: list[_Block] = [_Block(section=None)]
+    heading: Optional[str] = None
+    company: Optional[str] = None
+    paragraph: list[str] = []
+
+    def end_paragraph() -> None:
+        if paragraph:
+            blocks[-1].units.append(" ".join(part.strip() for part in paragraph))
+            paragraph.clear()
+
+    def new_block(section: Optional[str]) -> None:
+        end_paragraph()
+        if blocks[-1].units:
+            blocks.append(_Block(section=section))
+        else:
+            blocks[-1].section = section
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        if _RULE.match(line):
+            # "—\nTitle\n—" names a section; a lone rule just separates blocks
+            if i + 2 < len(lines) and lines[i + 1].strip() and _RULE.match(lines[i + 2]):
+                heading = lines[i + 1].strip()
+                new_block(heading)
+                i += 3
+                continue
+            new_block(heading)
+        elif stripped == "[Metadata]":
+            new_block(heading)
+            while i < len(lines) and lines[i].strip() != "[/Metadata]":
+                i += 1
+        elif stripped in PROFILE_HEADINGS:
+            heading = stripped
+            new_block(heading)
+        elif heading == "Experience" and _ROLE_DATES.match(stripped):
+            # The title (and, for a new employer, the company and total tenure)
+            # lines above the dates belong to the new role
+            title = paragraph.pop().strip() if paragraph and _is_label(paragraph[-1]) else None
+            if paragraph and _TENURE.match(paragraph[-1].strip()):
+                paragraph.pop()
+                company = paragraph.pop().strip() if paragraph else company
+            elif paragraph and _is_label(paragraph[-1]):
+                company = paragraph.pop().strip()
+            label = [part for part in (company, title) if part]
+            new_block(f"Experience: {', '.join(label)}" if label else heading)
+            blocks[-1].units.append(" | ".join(label + [stripped]))
+        elif not stripped:
+            end_paragraph()
+        elif _BULLET.match(line):
+            end_paragraph()
+            paragraph.append(stripped)
+        else:
+            paragraph.append(stripped)
+        i += 1
+    end_paragraph()
+    return [block for block in blocks if block.units]
+
+
+# ----------------------------------------------------------------------
+# Near-duplicate detection
+# ----------------------------------------------------------------------
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, for near-duplicate detection.
+
+    The share of equal signature slots between two texts estimates the
+    Jaccard similarity of their shingle sets. Permutations are seeded, so
+    signatures are stable across processes and runs.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1) -> None:
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+    def _shingles(self, text: str) -> set[str]:
+        words = tokenize(text)
+        size = min(self.shingle_size, len(words)) or 1
+        return {" ".join(words[i : i + size]) for i in range(max(1, len(words) - size + 1))}
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (
+                int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+                for s in self._shingles(text)
+            ),
+            dtype=np.uint64,
+        )
+        # (a * x + b) mod p stays below 2**64 for 32-bit a, b and x
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+
+def deduplicate(
+    chunks: Sequence[Chunk], *, threshold: float = 0.85, hasher: Optional[MinHasher] = None
+) -> tuple[list[Chunk], int]:
+    """Drop chunks whose estimated Jaccard similarity to a kept one is ``>= threshold``.
+
+    Returns:
+        The kept chunks, in order, and the number dropped.
+    """
+
+    if threshold <= 0 or len(chunks) < 2:
+        return list(chunks), 0
+    hasher = hasher or MinHasher()
+    kept: list[Chunk] = []
+    signatures: list[np.ndarray] = []
+    for chunk in chunks:
+        signature = hasher.signature(chunk.text)
+        if signatures and (np.vstack(signatures) == signature).mean(axis=1).max() >= threshold:
+            continue
+        kept.append(chunk)
+        signatures.append(signature)
+    return kept, len(chunks) - len(kept)
+
+
+# ----------------------------------------------------------------------
+# Chunking
+# ----------------------------------------------------------------------
+class StructuredChunker:
+    """Token-sized chunks that follow the document's sections and lists.
+
+    Documents are parsed into sections and units (paragraphs, bullet items,
+    roles) by ``parse_blocks``. Units are packed into chunks of at most
+    ``chunk_tokens`` tokens without crossing a section, carrying whole
+    trailing units up to ``overlap_tokens`` into the next chunk of the same
+    section; only a unit longer than a chunk is cut, at sentence and then
+    word boundaries. Each chunk starts with its section title, which is also
+    kept as ``section`` metadata. Near-identical chunks are dropped with
+    MinHash (``dedupe_threshold``, ``0`` disables).
+
+    ``split_text`` matches the LangChain text splitter interface, so the
+    chunker can stand in wherever one is accepted.
+    """
+
+    def __init__(
+        self,
+        *,
+        chunk_tokens: int = 200,
+        overlap_tokens: int = 30,
+        dedupe_threshold: float = 0.85,
+        encoding_name: str = EMBEDDING_ENCODING,
+    ) -> None:
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.dedupe_threshold = dedupe_threshold
+        self.encoding_name = encoding_name
+
+    @classmethod
+    def from_env(cls) -> "StructuredChunker":
+        """Configure from ``CHUNK_TOKENS``, ``CHUNK_OVERLAP_TOKENS`` and ``CHUNK_DEDUPE_THRESHOLD``."""
+
+        return cls(
+            chunk_tokens=int(os.getenv("CHUNK_TOKENS", "200")),
+            overlap_tokens=int(os.getenv("CHUNK_OVERLAP_TOKENS", "30")),
+            dedupe_threshold=float(os.getenv("CHUNK_DEDUPE_THRESHOLD", "0.85")),
+        )
+
+    def _count(self, text: str) -> int:
+        return count_tokens(text, self.encoding_name)
+
+    def split_text(self, text: str) -> list[str]:
+        return [chunk.text for chunk in self.split_documents([text])]
+
+    def split_documents(self, texts: Iterable[str]) -> list[Chunk]:
+        """Chunk the pages of one document; sections may continue across pages."""
+
+        chunks: list[Chunk] = []
+        for block in parse_blocks("\n".join(texts)):
+            chunks.extend(self._pack(block))
+        # Consecutive blocks of one section are packed together when they fit
+        chunks = self._merge(chunks)
+        kept, _ = deduplicate(chunks, threshold=self.dedupe_threshold)
+        return kept
+
+    def _units(self, block: _Block, budget: int) -> list[tuple[str, int]]:
+        """``(text, tokens)`` per unit, cutting any unit longer than ``budget``."""
+
+        units = []
+        for unit in block.units:
+            tokens = self._count(unit)
+            if tokens <= budget:
+                units.append((unit, tokens))
+                continue
+            pieces = _SENTENCE_END.split(unit)
+            for piece in pieces:
+                piece_tokens = self._count(piece)
+                if piece_tokens <= budget:
+                    units.append((piece, piece_tokens))
+                else:
+                    units.extend(self._cut_words(piece, budget))
+        return units
+
+    def _cut_words(self, text: str, budget: int) -> list[tuple[str, int]]:
+        pieces: list[tuple[str, int]] = []
+        current: list[str] = []
+        for word in text.split():
+            candidate = " ".join(current + [word])
+            if current and self._count(candidate) > budget:
+                piece = " ".join(current)
+                pieces.append((piece, self._count(piece)))
+                current = [word]
+            else:
+                current.append(word)
+        if current:
+            piece = " ".join(current)
+            pieces.append((piece, self._count(piece)))
+        return pieces
+
+    def _pack(self, block: _Block) -> list[Chunk]:
+        title = block.section
+        title_tokens = self._count(title) + 1 if title else 0
+        budget = max(1, self.chunk_tokens - title_tokens)
+        chunks: list[Chunk] = []
+        current: list[tuple[str, int]] = []
+        size = 0
+        fresh = 0  # units in ``current`` not already emitted as overlap
+        for unit, tokens in self._units(block, budget):
+            if current and size + tokens > budget:
+                chunks.append(self._chunk(title, current))
+                # Carry whole trailing units, up to the overlap budget
+                carried: list[tuple[str, int]] = []
+                carried_size = 0
+                for previous in reversed(current):
+                    if carried_size + previous[1] > self.overlap_tokens:
+                        break
+                    carried.insert(0, previous)
+                    carried_size += previous[1]
+                if carried_size + tokens > budget:
+                    carried, carried_size = [], 0
+                current, size, fresh = carried, carried_size, 0
+            current.append((unit, tokens))
+            size += tokens
+            fresh += 1
+        if current and fresh:
+            chunks.append(self._chunk(title, current))
+        return chunks
+
+    def _chunk(self, title: Optional[str], units: list[tuple[str, int]]) -> Chunk:
+        body = "\n".join(unit for unit, _ in units)
+        text = f"{title}\n{body}" if title else body
+        return Chunk(text=text, section=title, tokens=self._count(text))
+
+    def _merge(self, chunks: list[Chunk]) -> list[Chunk]:
+        merged: list[Chunk] = []
+        for chunk in chunks:
+            previous = merged[-1] if merged else None
+            if (
+                previous is not None
+                and previous.section == chunk.section
+                and previous.tokens + chunk.tokens <= self.chunk_tokens
+            ):
+                body = chunk.text[len(chunk.section) + 1 :] if chunk.section else chunk.text
+                text = f"{previous.text}\n{body}"
+                merged[-1] = Chunk(text=text, section=chunk.section, tokens=self._count(text))
+            else:
+                merged.append(chunk)
+        return merged
+
+
+def get_text_splitter(name: Optional[str] = None) -> Any:
+    """Build the splitter selected by ``CHUNKER``: ``structured`` (default) or ``recursive``.
+
+    ``recursive`` is the previous character-based splitter (2000 characters,
+    200 overlap), kept for comparison and for existing collections.
+    """
+
+    name = (name or os.getenv("CHUNKER", "structured")).lower()
+    if name == "structured":
+        return StructuredChunker.from_env()
+    if name == "recursive":
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        return RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200)
+    raise ValueError(f"Unknown CHUNKER: {name}")
+
+
+def splitter_fingerprint(text_splitter: Any) -> str:
+    """Short description of a splitter's settings, e.g. ``structured:200:30:0.85``."""
+
+    if isinstance(text_splitter, StructuredChunker):
+        return (
+            f"structured:{text_splitter.chunk_tokens}:{text_splitter.overlap_tokens}"
+            f":{text_splitter.dedupe_threshold:g}"
+        )
+    size = getattr(text_splitter, "_chunk_size", None)
+    overlap = getattr(text_splitter, "_chunk_overlap", None)
+    return f"{type(text_splitter).__name__}:{size}:{overlap}"
+
+
+def split_documents(text_splitter: Any, texts: Sequence[str]) -> list[Chunk]:
+    """Chunk one document's page texts with any splitter.
+
+    Structure-aware splitters see the whole document; LangChain splitters
+    split each page on its own, as before, and give no section metadata.
+    """
+
+    if isinstance(text_splitter, StructuredChunker):
+        return text_splitter.split_documents(texts)
+    return [Chunk(text=text) for page in texts for text in text_splitter.split_text(page)]
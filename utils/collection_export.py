@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+import numpy as np
+
+from utils.app_logging import setup_logging
+from utils.lexical_index import build_lexical_index
+from utils.persona_context import build_persona_context, collection_version
+from utils.snapshot import EMBEDDINGS_FILENAME, MANIFEST_FILENAME, RECORDS_FILENAME, _fsync_file
+from utils.vector_db import EmbeddingModelMismatchError
+
+if TYPE_CHECKING:
+    from utils.vector_db import VectorDB
+
+
+logger = setup_logging()
+
+EXPORT_FORMAT = 1
+EXPORT_KIND = "collection_export"
+
+
+def default_page_size() -> int:
+    """``VECTOR_EXPORT_PAGE_SIZE``: rows per ``collection.get`` page and per import upsert."""
+
+    return int(os.getenv("VECTOR_EXPORT_PAGE_SIZE", "1000"))
+
+
+def iter_collection(
+    vector_db: VectorDB, *, page_size: Optional[int] = None, include_data: bool = True
+) -> Iterator[dict[str, Any]]:
+    """Yield the collection in pages of at most ``page_size`` rows.
+
+    Each page holds ``ids`` and, with ``include_data``, ``embeddings`` (a
+    float32 matrix), ``documents`` and ``metadatas``. Only one page is held in
+    memory at a time.
+    """
+
+    page_size = page_size or default_page_size()
+    include = ["embeddings", "documents", "metadatas"] if include_data else []
+    offset = 0
+    while True:
+        page = vector_db.collection.get(limit=page_size, offset=offset, include=include)
+        ids = list(page.get("ids") or [])
+        if not ids:
+            return
+        if include_data:
+            count = len(ids)
+            embeddings = page.get("embeddings")
+            yield {
+                "ids": ids,
+                "embeddings": np.asarray(embeddings, dtype=np.float32).reshape(count, -1),
+                "documents": page.get("documents") or [None] * count,
+                "metadatas": page.get("metadatas") or [None] * count,
+            }
+        else:
+            yield {"ids": ids}
+        if len(ids) < page_size:
+            return
+        offset += len(ids)
+
+
+def export_collection(
+    vector_db: VectorDB, path: str, *, page_size: Optional[int] = None
+) -> dict[str, Any]:
+    """Write ``vector_db``'s collection to the new directory ``path``.
+
+    The layout matches a snapshot version: ``embeddings.npy`` (float32, as
+    stored, not normalized), ``records.jsonl`` (id, document and metadata per
+    row, in the same order) and ``manifest.json``. Rows are read in pages and
+    written straight into the memory-mapped ``.npy``, so memory stays at one
+    page whatever the collection size. Files are written into a temporary
+    sibling directory and renamed into place when complete.
+
+    Returns:
+        The manifest written.
+
+    Raises:
+        FileExistsError: ``path`` already exists.
+        RuntimeError: the collection changed size while it was exported.
+    """
+
+    if os.path.exists(path):
+        raise FileExistsError(f"Export target already exists: {path}")
+    start = time.perf_counter()
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = os.path.join(parent, f".tmp-{os.path.basename(path)}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(tmp_dir)
+    try:
+        expected = vector_db.count()
+        embeddings_path = os.path.join(tmp_dir, EMBEDDINGS_FILENAME)
+        records_path = os.path.join(tmp_dir, RECORDS_FILENAME)
+        matrix = None
+        ids: list[str] = []
+        with open(records_path, "w", encoding="utf-8") as records:
+            for page in iter_collection(vector_db, page_size=page_size):
+                rows = page["embeddings"]
+                if matrix is None:
+                    matrix = np.lib.format.open_memmap(
+                        embeddings_path, mode="w+", dtype=np.float32, shape=(expected, rows.shape[1])
+                    )
+                if len(ids) + len(rows) > expected:
+                    raise RuntimeError("Collection grew during export; retry when ingestion is idle")
+                matrix[len(ids) : len(ids) + len(rows)] = rows
+                for chunk_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    record = {"id": chunk_id, "document": document, "metadata": metadata}
+                    records.write(json.dumps(record, ensure_ascii=False) + "\n")
+                ids.extend(page["ids"])
+        if len(ids) != expected:
+            raise RuntimeError("Collection shrank during export; retry when ingestion is idle")
+        if matrix is None:
+            np.save(embeddings_path, np.zeros((0, 0), dtype=np.float32))
+            dim = 0
+        else:
+            matrix.flush()
+            dim = int(matrix.shape[1])
+            del matrix
+        collection_metadata = {
+            key: value
+            for key, value in (vector_db.collection.metadata or {}).items()
+            if not key.startswith("hnsw:")
+        }
+        manifest = {
+            "format": EXPORT_FORMAT,
+            "kind": EXPORT_KIND,
+            "collection_name": vector_db.collection_name,
+            "collection_metadata": collection_metadata,
+            "collection_version": collection_version(ids),
+            "embedding_model": vector_db.embedding_model_name,
+            "count": len(ids),
+            "dim": dim,
+            "dtype": "float32",
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        manifest_path = os.path.join(tmp_dir, MANIFEST_FILENAME)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        for file_path in (embeddings_path, records_path, manifest_path):
+            _fsync_file(file_path)
+        os.rename(tmp_dir, path)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    logger.info(
+        f"Exported {len(ids)} chunks of '{vector_db.collection_name}' to {path} "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return manifest
+
+
+def load_export_manifest(path: str) -> dict[str, Any]:
+    with open(os.path.join(path, MANIFEST_FILENAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("kind") != EXPORT_KIND or manifest.get("format") != EXPORT_FORMAT:
+        raise ValueError(f"{path} is not a collection export (format {EXPORT_FORMAT})")
+    return manifest
+
+
+def import_collection(
+    vector_db: VectorDB,
+    path: str,
+    *,
+    batch_size: Optional[int] = None,
+    replace: bool = False,
+) -> int:
+    """Upsert an export written by ``export_collection`` into ``vector_db``.
+
+    The stored embeddings are written as they are, so nothing is re-embedded,
+    in upserts of ``batch_size`` rows read from the memory-mapped matrix and
+    the records file. Importing twice is harmless. With ``replace``, chunks
+    that are not in the export are deleted afterwards (a rollback); the
+    collection is never empty in between. The persona context and BM25
+    index files are rebuilt from the imported chunks, as after an ingest.
+
+    Returns:
+        The number of chunks imported.
+
+    Raises:
+        EmbeddingModelMismatchError: the export was made with another model.
+        ValueError: ``path`` is not an export, or its files disagree.
+    """
+
+    start = time.perf_counter()
+    manifest = load_export_manifest(path)
+    if manifest.get("embedding_model") != vector_db.embedding_model_name:
+        raise EmbeddingModelMismatchError(
+            f"Export {path} holds embeddings from '{manifest.get('embedding_model')}', "
+            f"not '{vector_db.embedding_model_name}'"
+        )
+    batch_size = batch_size or default_page_size()
+    count = int(manifest["count"])
+    matrix = np.load(os.path.join(path, EMBEDDINGS_FILENAME), mmap_mode="r")
+    if count and matrix.shape != (count, manifest["dim"]):
+        raise ValueError(f"{EMBEDDINGS_FILENAME} is shaped {matrix.shape}, expected {(count, manifest['dim'])}")
+
+    imported: set[str] = set()
+    batch: list[dict[str, Any]] = []
+    row = 0
+
+    def flush() -> None:
+        nonlocal row
+        vector_db.upsert(
+            [record.get("document") for record in batch],
+            metadatas=[record.get("metadata") for record in batch],
+            ids=[record["id"] for record in batch],
+            embeddings=np.asarray(matrix[row : row + len(batch)], dtype=np.float32),
+        )
+        imported.update(record["id"] for record in batch)
+        row += len(batch)
+        batch.clear()
+
+    with open(os.path.join(path, RECORDS_FILENAME), encoding="utf-8") as records:
+        for line in records:
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+    if row != count:
+        raise ValueError(f"{RECORDS_FILENAME} holds {row} records, manifest says {count}")
+
+    removed = 0
+    if replace:
+        stale = [
+            chunk_id
+            for page in iter_collection(vector_db, page_size=batch_size, include_data=False)
+            for chunk_id in page["ids"]
+            if chunk_id not in imported
+        ]
+        for offset in range(0, len(stale), batch_size):
+            vector_db.delete(stale[offset : offset + batch_size])
+        removed = len(stale)
+    # Derived from the chunks, so rebuilt here rather than exported
+    build_persona_context(vector_db)
+    build_lexical_index(vector_db)
+    logger.info(
+        f"Imported {count} chunks into '{vector_db.collection_name}' from {path} "
+        f"in {time.perf_counter() - start:.2f}s"
+        + (f"; removed {removed} not in the export" if removed else "")
+    )
+    return count
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+from utils.app_logging import (
+    BatchingRotatingFileHandler,
+    DroppingQueueHandler,
+    setup_logging,
+    start_queue_listener,
+    worker_path,
+)
+
+
+logger = setup_logging()
+
+DEFAULT_CONVERSATION_LOG_PATH = str(
+    Path(__file__).resolve().parent.parent / "data" / "conversations.jsonl"
+)
+
+
+class JsonlFormatter(logging.Formatter):
+    """Serialize a record whose ``msg`` is a dict as one JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        timestamp = datetime.fromtimestamp(record.created, tz=timezone.utc)
+        payload = {"ts": timestamp.isoformat(timespec="milliseconds"), **record.msg}
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class ConversationLog:
+    """Structured JSONL log of chat turns, written off the request path.
+
+    ``log_turn`` only builds a ``LogRecord`` around the payload dict and puts
+    it on a bounded queue (dropping it if the queue is full), so it costs
+    microseconds however many conversations are streaming. A background
+    ``QueueListener`` serializes records, writes them in batches and rotates
+    the file by size, gzipping old files when ``compress`` is set.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_CONVERSATION_LOG_PATH,
+        *,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        compress: bool = True,
+        flush_records: int = 64,
+        flush_interval: float = 1.0,
+        queue_size: int = 10000,
+    ) -> None:
+        self.path = path
+        self._handler: Optional[DroppingQueueHandler] = None
+        self._listener = None
+        if not path:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = BatchingRotatingFileHandler(
+            path,
+            max_bytes=max_bytes,
+            backup_count=backup_count,
+            compress=compress,
+            flush_records=flush_records,
+            flush_interval=flush_interval,
+        )
+        file_handler.setFormatter(JsonlFormatter())
+        log_queue, self._listener = start_queue_listener(
+            file_handler, queue_size=queue_size, flush_interval=flush_interval
+        )
+        self._handler = DroppingQueueHandler(log_queue, format_in_caller=False)
+
+    @classmethod
+    def from_env(cls) -> "ConversationLog":
+        """Configure from the ``CONVERSATION_LOG_*`` env vars (empty path disables).
+
+        Each worker process (``WORKER_ID``) writes and rotates its own file.
+        """
+
+        return cls(
+            worker_path(os.getenv("CONVERSATION_LOG_PATH", DEFAULT_CONVERSATION_LOG_PATH)) or None,
+            max_bytes=int(os.getenv("CONVERSATION_LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            backup_count=int(os.getenv("CONVERSATION_LOG_BACKUPS", "5")),
+            compress=os.getenv("CONVERSATION_LOG_GZIP", "1") != "0",
+            flush_records=int(os.getenv("CONVERSATION_LOG_FLUSH_RECORDS", "64")),
+            flush_interval=float(os.getenv("CONVERSATION_LOG_FLUSH_SECONDS", "1.0")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self._handler is not None
+
+    @property
+    def dropped(self) -> int:
+        """Records discarded because the queue was full."""
+        return self._handler.dropped if self._handler is not None else 0
+
+    def log_turn(self, **fields: Any) -> None:
+        """Queue one conversation record; never blocks."""
+
+        if self._handler is None:
+            return
+        record = logging.makeLogRecord(
+            {"name": "conversations", "levelno": logging.INFO, "levelname": "INFO", "msg": fields}
+        )
+        self._handler.handle(record)
+
+    def close(self) -> None:
+        """Drain the queue and flush the file."""
+
+        if self._listener is not None:
+            self._listener.stop()
+
+
+_default_log: Optional[ConversationLog] = None
+_default_lock = threading.Lock()
+
+
+def get_conversation_log() -> ConversationLog:
+    """Process-wide ``ConversationLog`` configured from the environment."""
+
+    global _default_log
+    with _default_lock:
+        if _default_log is None:
+            _default_log = ConversationLog.from_env()
+        return _default_log
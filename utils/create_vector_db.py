@@ -7,11 +7,49 @@ if __name__ == "__main__":
     if str(project_root) not in sys.path:
         sys.path.insert(0, str(project_root))
 
+import argparse
+
 from utils.text_processing import DocumentProcessing
 
 def main():
+    parser = argparse.ArgumentParser(description="Ingest the me/ directory into the vector store")
+    parser.add_argument(
+        "--import",
+        dest="import_path",
+        metavar="DIR",
+        help="load an export written by --export instead of ingesting me/ (no embedding calls)",
+    )
+    parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="with --import, delete chunks that are not in the export (rollback)",
+    )
+    parser.add_argument(
+        "--export",
+        dest="export_path",
+        metavar="DIR",
+        help="write the collection to a new directory as embeddings.npy + records.jsonl",
+    )
+    parser.add_argument(
+        "--publish",
+        action="store_true",
+        help="publish a read-only snapshot for multi-worker serving after ingesting",
+    )
+    args = parser.parse_args()
+
     document_processing = DocumentProcessing()
-    document_processing.create_vector_db_from_directory("me")
+    if args.import_path:
+        count = document_processing.vector_db.import_collection(args.import_path, replace=args.replace)
+        print(f"Imported {count} chunks from {args.import_path}")
+    else:
+        document_processing.create_vector_db_from_directory("me")
+    if args.export_path:
+        manifest = document_processing.vector_db.export_collection(args.export_path)
+        print(f"Exported {manifest['count']} chunks to {args.export_path}")
+    if args.publish:
+        from utils.snapshot import publish_snapshot
+
+        print(f"Published snapshot {publish_snapshot(document_processing.vector_db)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Optional, Sequence
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace and case so near-identical queries share a key."""
+
+    return " ".join(text.split()).casefold()
+
+
+class EmbeddingCache:
+    """Bounded in-process cache of query embeddings.
+
+    Entries are keyed on ``(model, normalized text)`` and evicted by LRU once
+    ``max_entries`` is reached, or lazily once older than ``ttl_seconds``. An
+    optional SQLite file acts as a second tier so restarts begin warm.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = 24 * 60 * 60,
+        persist_path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple[float, list[float]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        if persist_path:
+            self._open_persistent_tier(persist_path)
+
+    @classmethod
+    def from_env(cls) -> Optional["EmbeddingCache"]:
+        """Build a cache from ``EMBEDDING_CACHE_*`` env vars (size 0 disables it)."""
+
+        max_entries = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+        if max_entries <= 0:
+            return None
+        ttl = float(os.getenv("EMBEDDING_CACHE_TTL", str(24 * 60 * 60)))
+        return cls(
+            max_entries=max_entries,
+            ttl_seconds=ttl if ttl > 0 else None,
+            persist_path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    @staticmethod
+    def key(text: str, model: str) -> str:
+        digest = hashlib.sha256(f"{model}\0{normalize_query(text)}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, text: str, model: str) -> Optional[list[float]]:
+        """Return the cached embedding for ``text`` or ``None`` on a miss."""
+
+        key = self.key(text, model)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, embedding = entry
+                if not self._expired(created_at, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return embedding
+                del self._entries[key]
+
+            stored = self._load_persistent(key, now)
+            if stored is not None:
+                created_at, embedding = stored
+                self._store(key, embedding, created_at)
+                self.hits += 1
+                self.persistent_hits += 1
+                return embedding
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, model: str, embedding: Sequence[float]) -> None:
+        key = self.key(text, model)
+        now = self._clock()
+        embedding = list(embedding)
+        with self._lock:
+            self._store(key, embedding, now)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (key, model, embedding, created_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, model, array("f", embedding).tobytes(), now),
+                )
+                self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM query_embeddings")
+                self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "persistent_hits": self.persistent_hits,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------------
+    # Internals (callers hold ``self._lock``)
+    # ------------------------------------------------------------------
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _store(self, key: str, embedding: list[float], created_at: float) -> None:
+        self._entries[key] = (created_at, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _open_persistent_tier(self, path: str) -> None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            " key TEXT PRIMARY KEY, model TEXT, embedding BLOB, created_at REAL)"
+        )
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM query_embeddings WHERE created_at < ?",
+                (self._clock() - self.ttl_seconds,),
+            )
+        self._conn.commit()
+
+    def _load_persistent(
+        self, key: str, now: float
+    ) -> Optional[tuple[float, list[float]]]:
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            "SELECT embedding, created_at FROM query_embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or self._expired(row[1], now):
+            return None
+        vector = array("f")
+        vector.frombytes(row[0])
+        return row[1], vector.tolist()
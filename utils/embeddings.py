@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import os
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
+
+
+DEFAULT_OPENAI_MODEL = "text-embedding-3-large"
+
+# Native output sizes, used when a backend does not report its own dimension
+KNOWN_DIMENSIONS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+
+# High-frequency words that carry no retrieval signal in a hashed bag of words
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can did do does for from had has have how i in is it its "
+    "me my of on or so that the their them then there these they this to was we were what "
+    "when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased terms of ``text`` without stopwords (keeps ``c++``, ``c#``, ``node.js``)."""
+
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+# The local backends implement the LangChain ``Embeddings`` interface without
+# subclassing it: importing langchain_core costs ~0.4 s of startup time.
+
+
+class HashingEmbeddings:
+    """CPU-only embeddings from a hashed TF-IDF-style projection.
+
+    Unigrams and bigrams are hashed into ``dim`` signed buckets with
+    sublinear term frequency, then L2-normalized. No model download or
+    network access is needed, so embedding takes microseconds. It is far
+    less semantic than a neural model but strong on exact terms (tools,
+    employers, libraries), and fully deterministic for offline tests.
+    """
+
+    def __init__(self, dim: int = 512) -> None:
+        self.dim = dim
+        self.model = f"hashing-tfidf-{dim}"
+
+    @property
+    def dimension(self) -> int:
+        return self.dim
+
+    def _features(self, text: str) -> Counter:
+        tokens = tokenize(text)
+        features = Counter(tokens)
+        features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        return features
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dim
+        for feature, count in self._features(text).items():
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            # Bigrams are rarer and more specific than single words
+            weight = 1.5 if " " in feature else 1.0
+            vector[bucket] += sign * weight * (1.0 + math.log(count))
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return self.embed_query(text)
+
+
+class SentenceTransformerEmbeddings:
+    """Local neural embeddings via ``sentence-transformers`` (optional dependency)."""
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2") -> None:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as exc:
+            raise ImportError(
+                "EMBEDDING_BACKEND=sentence-transformers requires the "
+                "'sentence-transformers' package (pip install sentence-transformers)"
+            ) from exc
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.model = model_name
+
+    @property
+    def dimension(self) -> int:
+        return int(self._model.get_sentence_embedding_dimension())
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._model.encode(list(texts), normalize_embeddings=True).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+
+def embedding_model_name(model) -> str:
+    """Identifier recorded with a collection and used to key cached vectors."""
+
+    return getattr(model, "model", None) or type(model).__name__
+
+
+def embedding_dimension(model) -> Optional[int]:
+    """Output dimension of ``model`` if it can be known without calling it."""
+
+    dimension = getattr(model, "dimension", None) or getattr(model, "dimensions", None)
+    if dimension:
+        return int(dimension)
+    return KNOWN_DIMENSIONS.get(embedding_model_name(model))
+
+
+def get_embedding_model(backend: Optional[str] = None) -> Embeddings:
+    """Build the embedding backend selected by ``EMBEDDING_BACKEND``.
+
+    Backends:
+        ``openai`` (default): ``OpenAIEmbeddings`` with ``EMBEDDING_MODEL``
+            (default ``text-embedding-3-large``).
+        ``hashing``/``local``: ``HashingEmbeddings`` with ``EMBEDDING_DIM`` (default 512).
+        ``sentence-transformers``: ``SentenceTransformerEmbeddings`` with ``EMBEDDING_MODEL``.
+    """
+
+    backend = (backend or os.getenv("EMBEDDING_BACKEND") or "openai").lower()
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(
+            model=os.getenv("EMBEDDING_MODEL", DEFAULT_OPENAI_MODEL),
+            api_key=os.getenv("OPENAI_API_KEY"),
+        )
+    if backend in ("hashing", "local"):
+        return HashingEmbeddings(dim=int(os.getenv("EMBEDDING_DIM", "512")))
+    if backend in ("sentence-transformers", "sentence_transformers"):
+        return SentenceTransformerEmbeddings(
+            os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        )
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Mapping, Optional
+
+from utils.app_logging import setup_logging
+from utils.embedding_cache import normalize_query
+from utils.tool_registry import LatencyHistogram
+
+
+logger = setup_logging()
+
+# Seconds; local tiers answer in microseconds, the LLM tier in hundreds of ms
+GUARDRAIL_LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.05, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+TIERS = ("cache", "local", "llm")
+
+
+class GuardrailVerdictCache:
+    """LRU map from a normalized message hash to an LLM guardrail verdict."""
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(message: str) -> str:
+        return hashlib.sha256(normalize_query(message).encode("utf-8")).hexdigest()
+
+    def get(self, message: str) -> Optional[bool]:
+        key = self.key(message)
+        with self._lock:
+            verdict = self._entries.get(key)
+            if verdict is not None:
+                self._entries.move_to_end(key)
+            return verdict
+
+    def put(self, message: str, verdict: bool) -> None:
+        if self.max_entries <= 0:
+            return
+        key = self.key(message)
+        with self._lock:
+            self._entries[key] = verdict
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Risk features: any hit keeps a message off the local allow path. Only
+# greetings and the known suggestion prompts may be allowed locally; career
+# words lower the score but never allow a message by themselves, since
+# "a racist joke about your team" is full of them.
+RISK_PATTERNS: dict[str, str] = {
+    "threat": r"\b(?:kill|murder|hurt|shoot|stab|attack|rape)\s+(?:you|him|her|them|everyone|people)\b"
+    r"|\bi(?:'ll| will| am going to| wanna)\s+(?:find|kill|hurt|get)\s+you\b",
+    "hate": r"\b(?:hate|kill|deport|exterminate|ban)\s+(?:all\s+)?(?:the\s+)?"
+    r"(?:jews|muslims|christians|gays|lesbians|trans(?:gender)? people|immigrants|"
+    r"blacks|whites|asians|women|men)\b",
+    "profanity": r"\b(?:fuck\w*|shit\w*|bitch\w*|cunt\w*|asshole\w*|bastard\w*|dickhead\w*|"
+    r"wank\w*|twat\w*|piss off)\b",
+    "insult": r"\b(?:you(?:'re| are)?|ur|u r)\s+(?:an?\s+|so\s+|such an?\s+)?"
+    r"(?:idiot|stupid|moron|loser|useless|pathetic|dumb|worthless|ugly|fraud)\b",
+    "sexual": r"\b(?:nudes?|naked|porn\w*|horny|sexy|sex with|onlyfans|blowjob|hook ?up with)\b",
+    "illegal": r"\bhow (?:do i |to |can i )?(?:make|build|cook|buy|get) (?:a |an |some )?"
+    r"(?:bomb|explosives?|meth|cocaine|heroin|guns?|fake id|ransomware|malware)\b"
+    r"|\b(?:hack into|steal (?:a|an|someone'?s?)|launder money|evade tax)\b",
+    "pii": r"\b(?:\d[ -]?){13,16}\b"  # payment card numbers
+    r"|\b[A-CEGHJ-PR-TW-Z]{2}\s?\d{2}\s?\d{2}\s?\d{2}\s?[A-D]\b"  # UK NI numbers
+    r"|\b(?:password|passport number|sort code|social security)\b",
+    "injection": r"\bignore (?:all |any )?(?:the )?(?:previous|prior|above|earlier) "
+    r"(?:instructions|prompts?|rules)\b|\b(?:system prompt|jailbreak|developer mode|DAN mode)\b",
+}
+
+SAFE_TOPIC_PATTERN = (
+    r"\b(?:role|job|work(?:ed|ing)?|experience|career|background|skills?|projects?|"
+    r"python|rag|llms?|ai|ml|data|pipelines?|automation|agents?|langchain|chemist(?:ry)?|"
+    r"astrazeneca|education|degree|hire|hiring|contact|email|cv|resume|portfolio|"
+    r"libraries|tools?|stack|design|build|scope|freelance|consult\w*|availability|"
+    r"interests?|hobbies|team|company|employer|salary|remote|location)\b"
+)
+GREETING_PATTERN = (
+    r"^(?:hi|hello|hey|hiya|yo|howdy|good (?:morning|afternoon|evening)|thanks|thank you|"
+    r"cheers|bye|goodbye)\b[\s!.,:)]*(?:there|daniel|dan)?[\s!.,:)]*$"
+)
+
+DEFAULT_WEIGHTS: dict[str, float] = {
+    "bias": -1.5,
+    "threat": 6.0,
+    "hate": 6.0,
+    "profanity": 3.5,
+    "insult": 4.0,
+    "sexual": 5.0,
+    "illegal": 5.0,
+    "pii": 4.0,
+    "injection": 2.5,
+    "shouting": 1.0,
+    "long": 1.0,
+    "safe_topic": -1.5,
+    "greeting": -3.0,
+    "known_prompt": -3.0,
+}
+
+# Features that can put a message on the local allow path
+ALLOW_FEATURES = ("greeting", "known_prompt")
+
+
+class LocalGuardrailClassifier:
+    """Regex/lexicon features scored by a small logistic model on the CPU.
+
+    Produces ``p_unsafe`` in microseconds. Messages at or above
+    ``block_threshold`` are blocked. Only greetings and exact (normalized)
+    matches of ``known_prompts`` are allowed, and only when at or below
+    ``allow_threshold`` with no risk features. Everything else returns
+    ``None`` and is escalated to the LLM classifier. The
+    weights are hand-set over interpretable features, so they can be tuned or
+    replaced with fitted ones without code changes.
+    """
+
+    def __init__(
+        self,
+        *,
+        weights: Optional[Mapping[str, float]] = None,
+        allow_threshold: float = 0.1,
+        block_threshold: float = 0.9,
+        known_prompts: Iterable[str] = (),
+    ) -> None:
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.known_prompts = frozenset(normalize_query(prompt) for prompt in known_prompts)
+        self.allow_threshold = allow_threshold
+        self.block_threshold = block_threshold
+        self._risk = {
+            name: re.compile(pattern, re.IGNORECASE) for name, pattern in RISK_PATTERNS.items()
+        }
+        self._safe_topic = re.compile(SAFE_TOPIC_PATTERN, re.IGNORECASE)
+        self._greeting = re.compile(GREETING_PATTERN, re.IGNORECASE)
+
+    def features(self, message: str) -> dict[str, float]:
+        text = message.strip()
+        features = {name: 1.0 for name, pattern in self._risk.items() if pattern.search(text)}
+        letters = [ch for ch in text if ch.isalpha()]
+        if len(letters) >= 12 and sum(ch.isupper() for ch in letters) / len(letters) > 0.7:
+            features["shouting"] = 1.0
+        if len(text) > 400:
+            features["long"] = min(len(text) / 400, 3.0)
+        topics = len(self._safe_topic.findall(text))
+        if topics:
+            features["safe_topic"] = float(min(topics, 3))
+        if self._greeting.match(text):
+            features["greeting"] = 1.0
+        if normalize_query(text) in self.known_prompts:
+            features["known_prompt"] = 1.0
+        return features
+
+    def score(self, message: str) -> tuple[float, dict[str, float]]:
+        """Return ``(p_unsafe, features)`` for ``message``."""
+
+        features = self.features(message)
+        logit = self.weights["bias"] + sum(
+            self.weights.get(name, 0.0) * value for name, value in features.items()
+        )
+        return 1.0 / (1.0 + math.exp(-logit)), features
+
+    def classify(self, message: str) -> Optional[bool]:
+        """``True`` (safe), ``False`` (unsafe) or ``None`` (ambiguous; escalate)."""
+
+        p_unsafe, features = self.score(message)
+        if p_unsafe >= self.block_threshold:
+            return False
+        risky = any(name in RISK_PATTERNS for name in features)
+        allowlisted = any(name in ALLOW_FEATURES for name in features)
+        if allowlisted and p_unsafe <= self.allow_threshold and not risky:
+            return True
+        return None
+
+
+class TieredGuardrail:
+    """Verdict cache, then the local classifier, then the paid LLM classifier.
+
+    Only LLM verdicts are cached (local ones are cheaper to recompute than to
+    store), and a failed LLM call allows the message without caching, as the
+    single-tier guardrail always did. Per-tier decision counts and latency
+    histograms show how many paid calls were avoided.
+    """
+
+    def __init__(
+        self,
+        *,
+        cache: Optional[GuardrailVerdictCache] = None,
+        classifier: Optional[LocalGuardrailClassifier] = None,
+    ) -> None:
+        self.cache = cache
+        self.classifier = classifier
+        self._lock = threading.Lock()
+        self.decisions = {tier: {"allowed": 0, "blocked": 0} for tier in TIERS}
+        self.llm_errors = 0
+        self.latency = {tier: LatencyHistogram(GUARDRAIL_LATENCY_BUCKETS) for tier in TIERS}
+
+    @classmethod
+    def from_env(cls, known_prompts: Iterable[str] = ()) -> "TieredGuardrail":
+        """Configure tiers from ``GUARDRAIL_CACHE_SIZE`` and ``GUARDRAIL_LOCAL``.
+
+        ``known_prompts`` (e.g. the UI's suggestion buttons) are the only
+        messages besides greetings that the local classifier may allow.
+        """
+
+        cache_size = int(os.getenv("GUARDRAIL_CACHE_SIZE", "4096"))
+        return cls(
+            cache=GuardrailVerdictCache(cache_size) if cache_size > 0 else None,
+            classifier=(
+                LocalGuardrailClassifier(known_prompts=known_prompts)
+                if os.getenv("GUARDRAIL_LOCAL", "1") != "0"
+                else None
+            ),
+        )
+
+    @classmethod
+    def llm_only(cls) -> "TieredGuardrail":
+        """Every message goes to the LLM; used by benchmarks and tests of that path."""
+
+        return cls(cache=None, classifier=None)
+
+    def check(self, message: str, llm_check: Callable[[str], Optional[bool]]) -> bool:
+        """Return the verdict for ``message``; ``llm_check`` returns ``None`` on failure."""
+
+        start = time.perf_counter()
+        fast = self._fast_path(message, start)
+        if fast is not None:
+            return fast
+        return self._record_llm(message, llm_check(message), start)
+
+    async def acheck(
+        self, message: str, llm_check: Callable[[str], Awaitable[Optional[bool]]]
+    ) -> bool:
+        """Async counterpart of ``check``."""
+
+        start = time.perf_counter()
+        fast = self._fast_path(message, start)
+        if fast is not None:
+            return fast
+        return self._record_llm(message, await llm_check(message), start)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            decisions = {tier: dict(counts) for tier, counts in self.decisions.items()}
+            llm_errors = self.llm_errors
+        total = sum(sum(counts.values()) for counts in decisions.values())
+        avoided = total - sum(decisions["llm"].values())
+        return {
+            "decisions": decisions,
+            "llm_errors": llm_errors,
+            "paid_calls_avoided": avoided,
+            "avoided_rate": avoided / total if total else 0.0,
+            "latency": {tier: histogram.snapshot() for tier, histogram in self.latency.items()},
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _fast_path(self, message: str, start: float) -> Optional[bool]:
+        if self.cache is not None:
+            verdict = self.cache.get(message)
+            if verdict is not None:
+                self._record("cache", verdict, start)
+                return verdict
+        if self.classifier is not None:
+            verdict = self.classifier.classify(message)
+            if verdict is not None:
+                self._record("local", verdict, start)
+                return verdict
+        return None
+
+    def _record_llm(self, message: str, verdict: Optional[bool], start: float) -> bool:
+        if verdict is None:
+            with self._lock:
+                self.llm_errors += 1
+            verdict = True
+        elif self.cache is not None:
+            self.cache.put(message, verdict)
+        self._record("llm", verdict, start)
+        return verdict
+
+    def _record(self, tier: str, verdict: bool, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        self.latency[tier].observe(elapsed)
+        with self._lock:
+            self.decisions[tier]["allowed" if verdict else "blocked"] += 1
+            counts = " ".join(
+                f"{name}={sum(c.values())}" for name, c in self.decisions.items()
+            )
+        logger.info(
+            f"Guardrail {'allowed' if verdict else 'blocked'} by {tier} tier in "
+            f"{elapsed * 1000:.2f} ms (decisions: {counts})"
+        )
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from utils.app_logging import setup_logging
+from utils.tokenizer import CHAT_ENCODING, count_message_tokens
+
+
+logger = setup_logging()
+
+Message = Dict[str, Any]
+# (previous summary, turns to fold in) -> updated summary
+Summarizer = Callable[[str, List[Message]], str]
+
+SUMMARY_PREFIX = "Summary of the earlier conversation with this visitor:\n"
+
+
+@dataclass
+class CompactionReport:
+    """What ``HistoryManager.compact`` did on the last call."""
+
+    turns: int = 0
+    verbatim_turns: int = 0
+    summarized_turns: int = 0
+    dropped_turns: int = 0
+    history_tokens: int = 0
+    budget: Optional[int] = None
+
+
+def sanitize_history(history: Optional[Sequence[Any]]) -> List[Message]:
+    """Keep only role/content pairs for user and assistant messages."""
+
+    return [
+        {"role": m.get("role"), "content": m.get("content", "")}
+        for m in (history or [])
+        if isinstance(m, dict) and m.get("role") in {"user", "assistant"}
+    ]
+
+
+def split_turns(messages: Sequence[Message]) -> List[List[Message]]:
+    """Group messages into turns, each starting at a user message.
+
+    Assistant messages before the first user message (the UI greeting) are
+    folded into the first turn.
+    """
+
+    turns: List[List[Message]] = []
+    for message in messages:
+        if message["role"] == "user" or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    if len(turns) > 1 and all(m["role"] != "user" for m in turns[0]):
+        turns[1] = turns[0] + turns[1]
+        turns.pop(0)
+    return turns
+
+
+def format_transcript(messages: Sequence[Message]) -> str:
+    """Render messages as ``Role: content`` lines for a summarization prompt."""
+
+    return "\n".join(
+        f"{message['role'].capitalize()}: {message.get('content') or ''}" for message in messages
+    )
+
+
+class HistoryManager:
+    """Keep prompt history within a token budget.
+
+    The last ``keep_turns`` turns are sent verbatim. Older turns are folded
+    into a rolling summary. Summaries are cached under a hash of the history
+    prefix they cover, so each turn only summarizes the turns that fell out
+    of the window since the last fold, never the whole conversation. Gradio
+    resends the full history every turn, so no per-session state is needed.
+
+    With an ``executor`` the fold runs in the background. The current turn
+    keeps the unsummarized turns verbatim (subject to the budget) and the next
+    turn picks up the new summary, so summarization never adds latency.
+    """
+
+    def __init__(
+        self,
+        *,
+        summarizer: Optional[Summarizer] = None,
+        keep_turns: int = 6,
+        total_budget: Optional[int] = 16000,
+        executor: Optional[Executor] = None,
+        encoding_name: str = CHAT_ENCODING,
+        max_cached_summaries: int = 1024,
+    ) -> None:
+        self.summarizer = summarizer
+        self.keep_turns = keep_turns
+        self.total_budget = total_budget
+        self.executor = executor
+        self.encoding_name = encoding_name
+        self.max_cached_summaries = max_cached_summaries
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+        self.last_report = CompactionReport()
+
+    @classmethod
+    def from_env(
+        cls, *, summarizer: Optional[Summarizer] = None, executor: Optional[Executor] = None
+    ) -> "HistoryManager":
+        """Configure from ``CHAT_HISTORY_TURNS`` and ``CHAT_PROMPT_TOKEN_BUDGET`` (0 = no cap)."""
+
+        budget = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "16000"))
+        return cls(
+            summarizer=summarizer,
+            keep_turns=int(os.getenv("CHAT_HISTORY_TURNS", "6")),
+            total_budget=budget if budget > 0 else None,
+            executor=executor,
+        )
+
+    def count(self, messages: Sequence[Message]) -> int:
+        return count_message_tokens(messages, self.encoding_name)
+
+    def compact(
+        self, history: Optional[Sequence[Any]], *, reserved_tokens: int = 0
+    ) -> List[Message]:
+        """Return the history messages to send this turn.
+
+        Args:
+            history: Prior conversation as role/content dicts (Gradio format).
+            reserved_tokens: Tokens already committed to the system prompt,
+                retrieved snippets and the new user message.
+
+        Returns:
+            An optional summary system message followed by verbatim turns,
+            oldest turns dropped first until ``total_budget`` is respected.
+        """
+
+        turns = split_turns(sanitize_history(history))
+        report = CompactionReport(turns=len(turns))
+        older_count = max(0, len(turns) - self.keep_turns)
+
+        summary, covered = "", 0
+        if older_count and self.summarizer is not None:
+            summary, covered = self._summary_for(turns, older_count)
+        elif older_count and self.total_budget is not None:
+            # Without a summarizer, old turns are simply dropped
+            covered = older_count
+            report.dropped_turns = older_count
+        verbatim = turns[covered:]
+        report.summarized_turns = covered if summary else 0
+
+        budget = None if self.total_budget is None else self.total_budget - reserved_tokens
+        report.budget = budget
+        summary_messages = (
+            [{"role": "system", "content": SUMMARY_PREFIX + summary}] if summary else []
+        )
+        if budget is not None:
+            # Oldest verbatim turns go first, then the summary itself
+            while verbatim and self.count(summary_messages) + self._turn_tokens(verbatim) > budget:
+                verbatim = verbatim[1:]
+                report.dropped_turns += 1
+            if summary_messages and self.count(summary_messages) > budget:
+                summary_messages = []
+                report.summarized_turns = 0
+
+        messages = summary_messages + [message for turn in verbatim for message in turn]
+        report.verbatim_turns = len(verbatim)
+        report.history_tokens = self.count(messages)
+        self.last_report = report
+        return messages
+
+    # ------------------------------------------------------------------
+    # Rolling summary
+    # ------------------------------------------------------------------
+    def _turn_tokens(self, turns: Sequence[Sequence[Message]]) -> int:
+        return sum(self.count(turn) for turn in turns)
+
+    @staticmethod
+    def _prefix_keys(turns: Sequence[Sequence[Message]], count: int) -> List[str]:
+        """``keys[i]`` identifies the first ``i`` turns; ``keys[0]`` is the empty prefix."""
+
+        keys = [""]
+        digest = hashlib.sha256()
+        for turn in turns[:count]:
+            digest.update(json.dumps(turn, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+            keys.append(digest.copy().hexdigest())
+        return keys
+
+    def _summary_for(
+        self, turns: Sequence[Sequence[Message]], older_count: int
+    ) -> tuple[str, int]:
+        """Return the best available summary and how many turns it covers."""
+
+        keys = self._prefix_keys(turns, older_count)
+        with self._lock:
+            covered = 0
+            for i in range(older_count, 0, -1):
+                if keys[i] in self._summaries:
+                    self._summaries.move_to_end(keys[i])
+                    covered = i
+                    break
+            summary = self._summaries.get(keys[covered], "")
+            if covered == older_count:
+                return summary, covered
+            target = keys[older_count]
+            if self.executor is not None and target in self._pending:
+                return summary, covered
+            self._pending.add(target)
+
+        delta = [list(turn) for turn in turns[covered:older_count]]
+        if self.executor is None:
+            updated = self._fold(target, summary, delta)
+            return (updated, older_count) if updated is not None else (summary, covered)
+        self.executor.submit(self._fold, target, summary, delta)
+        return summary, covered
+
+    def _fold(self, key: str, summary: str, turns: List[List[Message]]) -> Optional[str]:
+        try:
+            flat = [message for turn in turns for message in turn]
+            updated = self.summarizer(summary, flat).strip()
+        except Exception as exc:
+            logger.error(f"History summarization failed: {exc}")
+            return None
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+        with self._lock:
+            self._summaries[key] = updated
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+        return updated
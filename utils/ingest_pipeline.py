@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Iterator, Optional, Sequence
+
+from utils.app_logging import setup_logging
+from utils.chunking import split_documents
+from utils.text_processing import chunk_hash_id, file_sha256, load_documents
+from utils.tokenizer import count_tokens
+
+if TYPE_CHECKING:
+    from utils.text_processing import DocumentProcessing
+
+
+logger = setup_logging()
+
+_DONE = object()
+
+
+def load_and_split(
+    file_path: str, text_splitter
+) -> tuple[list[str], list[int], list[dict[str, Any]]]:
+    """Load and chunk one file; runs in a worker process.
+
+    Returns:
+        Chunk texts, their token counts, and extra metadata (section) per chunk.
+    """
+
+    pages = [document.page_content for document in load_documents(file_path)]
+    chunks = split_documents(text_splitter, pages)
+    texts = [chunk.text for chunk in chunks]
+    return texts, [count_tokens(text) for text in texts], [chunk.metadata for chunk in chunks]
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    return getattr(exc, "status_code", None) == 429 or "ratelimit" in type(exc).__name__.lower()
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Server-suggested wait from a ``Retry-After`` header, if present."""
+
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class IngestStats:
+    files: int = 0
+    skipped_files: int = 0
+    failed_files: int = 0
+    chunks: int = 0
+    embedded_chunks: int = 0
+    embedded_tokens: int = 0
+    batches: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+    failed_sources: set[str] = field(default_factory=set)
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.embedded_chunks / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        return self.embedded_tokens / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.files} files ({self.skipped_files} unchanged, {self.failed_files} failed), "
+            f"{self.embedded_chunks}/{self.chunks} chunks embedded in {self.batches} batches "
+            f"({self.retries} retries) in {self.elapsed:.2f}s: "
+            f"{self.chunks_per_sec:.1f} chunks/s, {self.tokens_per_sec:.0f} tokens/s"
+        )
+
+
+@dataclass
+class _Chunk:
+    id: str
+    text: str
+    metadata: dict[str, Any]
+    tokens: int
+
+
+class IngestPipeline:
+    """Streaming ingestion: parallel loading, batched embedding, bulk writes.
+
+    Files are loaded and split in a process pool. New chunks flow through a
+    bounded queue into fixed-size embedding batches, sent with limited
+    concurrency and rate-limit-aware backoff, and each batch is upserted in
+    one write. Wall time therefore tracks embedding API throughput rather
+    than the number of files. Incremental behaviour (content-hashed ids, the
+    manifest, stale-chunk deletion) matches ``DocumentProcessing``.
+    """
+
+    def __init__(
+        self,
+        processor: "DocumentProcessing",
+        *,
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        queue_size: int = 2048,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        self.processor = processor
+        self.batch_size = batch_size or int(os.getenv("INGEST_BATCH_SIZE", "128"))
+        self.max_concurrency = max_concurrency or int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+        self.max_workers = (
+            max_workers
+            if max_workers is not None
+            else int(os.getenv("INGEST_LOAD_WORKERS", str(os.cpu_count() or 1)))
+        )
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._stats_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def run(self, file_paths: Sequence[str]) -> IngestStats:
+        """Ingest ``file_paths`` and update the processor's manifest."""
+
+        stats = IngestStats()
+        start = time.perf_counter()
+        manifest = self.processor.manifest
+
+        pending: list[tuple[str, str, str]] = []
+        for file_path in file_paths:
+            stats.files += 1
+            source = os.path.normpath(file_path)
+            sha256 = file_sha256(file_path)
+            if manifest.is_current(source, sha256, self.processor.chunker):
+                stats.skipped_files += 1
+            else:
+                pending.append((file_path, source, sha256))
+
+        chunk_queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        consumer = threading.Thread(
+            target=self._consume, args=(chunk_queue, stats), name="ingest-embed", daemon=True
+        )
+        consumer.start()
+
+        file_ids: dict[str, tuple[str, list[str]]] = {}
+        try:
+            for file_path, source, sha256, texts, tokens, extras in self._load(pending, stats):
+                ids = [chunk_hash_id(source, text) for text in texts]
+                file_ids[source] = (sha256, ids)
+                unique: dict[str, int] = {}
+                for idx, chunk_id in enumerate(ids):
+                    unique.setdefault(chunk_id, idx)
+                with self._write_lock:
+                    existing = self.processor.vector_db.existing_ids(list(unique))
+                with self._stats_lock:
+                    stats.chunks += len(texts)
+                for chunk_id, idx in unique.items():
+                    if chunk_id in existing:
+                        continue
+                    chunk_queue.put(
+                        _Chunk(
+                            id=chunk_id,
+                            text=texts[idx],
+                            metadata={"source": source, "chunk_id": idx, **extras[idx]},
+                            tokens=tokens[idx],
+                        )
+                    )
+        finally:
+            chunk_queue.put(_DONE)
+            consumer.join()
+
+        # Only files whose chunks all landed are recorded; the rest retry next run
+        for source, (sha256, ids) in file_ids.items():
+            if source in stats.failed_sources:
+                stats.failed_files += 1
+                continue
+            indexed = set(manifest.ids_for(source)) | set(
+                self.processor.vector_db.ids_where({"source": source})
+            )
+            stale = sorted(indexed - set(ids))
+            if stale:
+                self.processor.vector_db.delete(stale)
+            manifest.record(source, sha256, ids, self.processor.chunker)
+        manifest.save()
+
+        stats.elapsed = time.perf_counter() - start
+        logger.info(f"Ingestion finished: {stats.summary()}")
+        return stats
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def _load(
+        self, pending: list[tuple[str, str, str]], stats: IngestStats
+    ) -> Iterator[tuple[str, str, str, list[str], list[int], list[dict[str, Any]]]]:
+        splitter = self.processor.text_splitter
+        # Worker start-up costs more than it saves for a handful of files
+        if self.max_workers <= 1 or len(pending) < 2:
+            for file_path, source, sha256 in pending:
+                try:
+                    texts, tokens, extras = load_and_split(file_path, splitter)
+                except Exception as exc:
+                    logger.error(f"Error processing {file_path}: {exc}")
+                    stats.failed_files += 1
+                    continue
+                yield file_path, source, sha256, texts, tokens, extras
+            return
+
+        workers = min(self.max_workers, len(pending))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(load_and_split, file_path, splitter): (file_path, source, sha256)
+                for file_path, source, sha256 in pending
+            }
+            for future in as_completed(futures):
+                file_path, source, sha256 = futures[future]
+                try:
+                    texts, tokens, extras = future.result()
+                except Exception as exc:
+                    logger.error(f"Error processing {file_path}: {exc}")
+                    stats.failed_files += 1
+                    continue
+                yield file_path, source, sha256, texts, tokens, extras
+
+    # ------------------------------------------------------------------
+    # Embedding and writing
+    # ------------------------------------------------------------------
+    def _consume(self, chunk_queue: "queue.Queue[Any]", stats: IngestStats) -> None:
+        # Bound in-flight batches so memory stays flat on large corpora
+        in_flight = threading.BoundedSemaphore(self.max_concurrency * 2)
+        with ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="ingest-batch"
+        ) as pool:
+
+            def submit(batch: list[_Chunk]) -> None:
+                in_flight.acquire()
+                future = pool.submit(self._embed_and_write, batch, stats)
+                future.add_done_callback(lambda _: in_flight.release())
+
+            batch: list[_Chunk] = []
+            while True:
+                item = chunk_queue.get()
+                if item is _DONE:
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    submit(batch)
+                    batch = []
+            if batch:
+                submit(batch)
+
+    def _embed_and_write(self, batch: list[_Chunk], stats: IngestStats) -> None:
+        try:
+            embeddings = self._embed_with_backoff([chunk.text for chunk in batch], stats)
+            with self._write_lock:
+                self.processor.vector_db.upsert(
+                    documents=[chunk.text for chunk in batch],
+                    metadatas=[chunk.metadata for chunk in batch],
+                    ids=[chunk.id for chunk in batch],
+                    embeddings=embeddings,
+                )
+        except Exception as exc:
+            logger.error(f"Embedding batch of {len(batch)} chunks failed: {exc}")
+            with self._stats_lock:
+                stats.failed_sources.update(chunk.metadata["source"] for chunk in batch)
+            return
+        with self._stats_lock:
+            stats.batches += 1
+            stats.embedded_chunks += len(batch)
+            stats.embedded_tokens += sum(chunk.tokens for chunk in batch)
+
+    def _embed_with_backoff(self, texts: list[str], stats: IngestStats) -> list[list[float]]:
+        attempt = 0
+        while True:
+            try:
+                return self.processor.embed_text(texts)
+            except Exception as exc:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = retry_after_seconds(exc)
+                if delay is None:
+                    delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                    # Rate limits are shared by all workers; spread them out more
+                    if is_rate_limit_error(exc):
+                        delay *= 2
+                    delay *= random.uniform(0.5, 1.0)
+                logger.warning(f"Embedding request failed ({exc}); retrying in {delay:.2f}s")
+                with self._stats_lock:
+                    stats.retries += 1
+                time.sleep(delay)
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Optional, Sequence
+
+from utils.app_logging import setup_logging
+from utils.embeddings import tokenize
+from utils.persona_context import collection_version
+from utils.vector_db import DEFAULT_COLLECTION_NAME
+
+if TYPE_CHECKING:
+    from utils.vector_db import VectorDB
+
+
+logger = setup_logging()
+
+# Bump when the file layout or tokenization changes so stale files are rebuilt
+LEXICAL_INDEX_FORMAT = 1
+LEXICAL_INDEX_FILENAME = "lexical_index.json"
+
+
+def lexical_index_path(vector_db: "VectorDB") -> Optional[str]:
+    """Location of the BM25 index file for ``vector_db``'s collection.
+
+    Returns ``None`` for stores without a persist directory (e.g. test fakes).
+    Stores that serve immutable versions (``SnapshotVectorDB``) expose an
+    ``artifact_directory`` holding the index built for the version served.
+    """
+
+    directory = getattr(vector_db, "artifact_directory", None) or getattr(
+        vector_db, "persist_directory", None
+    )
+    if not directory:
+        return None
+    collection_name = getattr(vector_db, "collection_name", None)
+    if collection_name in (None, DEFAULT_COLLECTION_NAME):
+        return os.path.join(directory, LEXICAL_INDEX_FILENAME)
+    return os.path.join(directory, f"lexical_index.{collection_name}.json")
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of the collection's chunks.
+
+    Terms come from ``embeddings.tokenize``, so tool, employer and library
+    names (``pytorch``, ``c++``, ``node.js``) match exactly. A query only
+    visits the postings of its own terms, which takes microseconds at
+    persona scale, and needs no embedding request. The index keeps the chunk
+    texts and metadata so it can answer on its own when the vector side is
+    unavailable. Results use Chroma's single-query ``query`` dict shape, with
+    BM25 scores under ``scores``.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[Optional[str]],
+        metadatas: Optional[Sequence[Optional[dict[str, Any]]]] = None,
+        *,
+        k1: float = 1.5,
+        b: float = 0.75,
+        version: Optional[str] = None,
+    ) -> None:
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas) if metadatas is not None else [None] * len(self.ids)
+        self.k1 = k1
+        self.b = b
+        self.version = version or collection_version(self.ids)
+        self.doc_lengths: list[int] = []
+        # term -> [(row, term frequency)]
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        for row, document in enumerate(self.documents):
+            counts = Counter(tokenize(document or ""))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((row, tf))
+        self._prepare()
+
+    def _prepare(self) -> None:
+        count = len(self.ids)
+        self.avg_length = (sum(self.doc_lengths) / count) if count else 0.0
+        self.idf = {
+            term: math.log(1.0 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+            for term, rows in self.postings.items()
+        }
+        # Length normalization is per document, so fold it in once
+        avg = self.avg_length or 1.0
+        self._norms = [self.k1 * (1.0 - self.b + self.b * length / avg) for length in self.doc_lengths]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_collection(cls, vector_db: "VectorDB", **kwargs: Any) -> "BM25Index":
+        data = vector_db.collection.get(include=["documents", "metadatas"])
+        ids = list(data.get("ids") or [])
+        # Row order by id, so identical contents give an identical file
+        order = sorted(range(len(ids)), key=lambda i: ids[i])
+        documents = data.get("documents") or [None] * len(ids)
+        metadatas = data.get("metadatas") or [None] * len(ids)
+        return cls(
+            [ids[i] for i in order],
+            [documents[i] for i in order],
+            [metadatas[i] for i in order],
+            **kwargs,
+        )
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def scores(self, query: str) -> dict[int, float]:
+        """BM25 score of every row sharing at least one term with ``query``."""
+
+        scores: dict[int, float] = {}
+        k1 = self.k1
+        norms = self._norms
+        for term in set(tokenize(query)):
+            rows = self.postings.get(term)
+            if not rows:
+                continue
+            idf = self.idf[term]
+            for row, tf in rows:
+                scores[row] = scores.get(row, 0.0) + idf * tf * (k1 + 1.0) / (tf + norms[row])
+        return scores
+
+    def query(self, query: str, k: int = 5) -> dict[str, Any]:
+        """Top ``k`` chunks for ``query``; empty lists when no term matches."""
+
+        scores = self.scores(query)
+        top = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        rows = [row for row, _ in top]
+        return {
+            "ids": [[self.ids[row] for row in rows]],
+            "documents": [[self.documents[row] for row in rows]],
+            "metadatas": [[self.metadatas[row] for row in rows]],
+            "scores": [[score for _, score in top]],
+        }
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def to_payload(self) -> dict[str, Any]:
+        return {
+            "format": LEXICAL_INDEX_FORMAT,
+            "collection_version": self.version,
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+            "doc_lengths": self.doc_lengths,
+            "postings": {term: [list(p) for p in rows] for term, rows in sorted(self.postings.items())},
+        }
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> "BM25Index":
+        index = cls.__new__(cls)
+        index.ids = payload["ids"]
+        index.documents = payload["documents"]
+        index.metadatas = payload["metadatas"]
+        index.k1 = payload["k1"]
+        index.b = payload["b"]
+        index.version = payload["collection_version"]
+        index.doc_lengths = payload["doc_lengths"]
+        index.postings = {term: [tuple(p) for p in rows] for term, rows in payload["postings"].items()}
+        index._prepare()
+        return index
+
+
+def build_lexical_index(
+    vector_db: "VectorDB",
+    *,
+    path: Optional[str] = None,
+    force: bool = False,
+) -> Optional[BM25Index]:
+    """Build the BM25 index for ``vector_db`` and store it next to the collection.
+
+    Skips the work when the stored file already matches the collection
+    version, like ``build_persona_context``.
+
+    Returns:
+        The index, or ``None`` if the store has no path.
+    """
+
+    path = path or lexical_index_path(vector_db)
+    if path is None:
+        return None
+    if not force:
+        existing = load_lexical_index(path)
+        ids = vector_db.collection.get(include=[]).get("ids") or []
+        if existing is not None and existing.version == collection_version(ids):
+            return existing
+
+    index = BM25Index.from_collection(vector_db)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index.to_payload(), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    logger.info(f"Lexical index rebuilt: {len(index)} chunks, {len(index.postings)} terms")
+    return index
+
+
+def load_lexical_index(path: Optional[str]) -> Optional[BM25Index]:
+    """Read a BM25 index file, ignoring missing, corrupt or outdated ones."""
+
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("format") != LEXICAL_INDEX_FORMAT:
+            return None
+        return BM25Index.from_payload(payload)
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        logger.error(f"Ignoring unreadable lexical index {path}: {exc}")
+        return None
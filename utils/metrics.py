@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import contextlib
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from utils.app_logging import setup_logging
+from utils.tool_registry import LatencyHistogram
+
+
+logger = setup_logging()
+
+NAMESPACE = "digital_cv"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; from in-process stages (prompt assembly) to multi-second tool loops
+STAGE_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_HELP = {
+    "stage_duration_seconds": "Time spent in each stage of a chat turn",
+    "time_to_first_token_seconds": "Time from receiving a message to the first streamed text",
+    "turn_duration_seconds": "Total time of a chat turn",
+    "turns_total": "Chat turns by outcome",
+    "llm_requests_total": "Streaming completion requests (tool-call loop iterations)",
+    "tool_calls_total": "Tool calls executed, by tool",
+    "prompt_tokens_total": "Estimated prompt tokens sent to the chat model",
+    "completion_tokens_total": "Estimated completion tokens streamed from the chat model",
+}
+
+# (metric name, "counter" | "gauge" | "histogram", [(labels, value or histogram snapshot)])
+Family = tuple[str, str, list[tuple[dict[str, str], Any]]]
+Collector = Callable[[], Iterable[Family]]
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def _label_key(labels: dict[str, Any]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    parts = [
+        f'{k}="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in labels
+    ]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Span:
+    __slots__ = ("_metrics", "_stage", "_attributes", "_start", "_otel")
+
+    def __init__(self, metrics: "Metrics", stage: str, attributes: dict[str, Any]) -> None:
+        self._metrics = metrics
+        self._stage = stage
+        self._attributes = attributes
+        self._otel = None
+
+    def __enter__(self) -> "_Span":
+        tracer = self._metrics.tracer
+        if tracer is not None:
+            # Not made current: spans may be suspended across generator yields
+            self._otel = tracer.start_span(f"{NAMESPACE}.{self._stage}", attributes=self._attributes)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._metrics.record_stage(self._stage, time.perf_counter() - self._start)
+        if self._otel is not None:
+            if exc is not None:
+                self._otel.record_exception(exc)
+            self._otel.end()
+
+
+class Metrics:
+    """In-process counters, histograms and per-stage spans for chat turns.
+
+    Stage spans feed ``digital_cv_stage_duration_seconds{stage=...}``; with a
+    ``tracer`` every span is also exported through OpenTelemetry. Components
+    that already keep their own statistics (caches, guardrails, tools)
+    register collectors that are read at scrape time, so they pay nothing per
+    request. ``render()`` produces the Prometheus text exposition format.
+    """
+
+    enabled = True
+
+    def __init__(self, *, tracer: Any = None) -> None:
+        self.tracer = tracer
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, LatencyHistogram]] = {}
+        self._collectors: dict[str, Collector] = {}
+
+    @classmethod
+    def from_env(cls) -> "Metrics":
+        """``NullMetrics`` if ``METRICS_ENABLED=0``; OpenTelemetry spans if ``METRICS_OTEL=1``.
+
+        Spans go to the globally configured tracer provider (for example one
+        set up by ``opentelemetry-instrument`` and the ``OTEL_*`` env vars).
+        """
+
+        if os.getenv("METRICS_ENABLED", "1") == "0":
+            return NullMetrics()
+        tracer = None
+        if os.getenv("METRICS_OTEL", "0") == "1":
+            try:
+                from opentelemetry import trace
+
+                tracer = trace.get_tracer(NAMESPACE)
+            except ImportError:
+                logger.error("METRICS_OTEL=1 but opentelemetry-api is not installed")
+        return cls(tracer=tracer)
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = LatencyHistogram(STAGE_LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        self.observe("stage_duration_seconds", seconds, stage=stage)
+
+    def span(self, stage: str, **attributes: Any):
+        """Context manager timing ``stage`` (and exporting it when tracing)."""
+
+        return _Span(self, stage, attributes)
+
+    def register_collector(self, name: str, collector: Collector) -> None:
+        """Add (or replace) a scrape-time collector under ``name``."""
+
+        with self._lock:
+            self._collectors[name] = collector
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def counter_value(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def histogram(self, name: str, **labels: Any) -> Optional[dict[str, Any]]:
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_key(labels))
+        return histogram.snapshot() if histogram is not None else None
+
+    def families(self) -> list[Family]:
+        with self._lock:
+            families: list[Family] = [
+                (name, "counter", [(dict(key), value) for key, value in series.items()])
+                for name, series in self._counters.items()
+            ]
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+            collectors = list(self._collectors.items())
+        families += [
+            (name, "histogram", [(dict(key), h.snapshot()) for key, h in series.items()])
+            for name, series in histograms.items()
+        ]
+        for collector_name, collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception as exc:
+                logger.error(f"Metrics collector {collector_name} failed: {exc}")
+        return families
+
+    def render(self) -> str:
+        """Prometheus text exposition of every metric."""
+
+        lines: list[str] = []
+        for name, kind, samples in sorted(self.families(), key=lambda f: f[0]):
+            full = f"{NAMESPACE}_{name}"
+            lines.append(f"# HELP {full} {METRIC_HELP.get(name, name.replace('_', ' '))}")
+            lines.append(f"# TYPE {full} {kind}")
+            for labels, value in samples:
+                label_items = _label_key(labels)
+                if kind != "histogram":
+                    lines.append(f"{full}{_format_labels(label_items)} {_format_value(value)}")
+                    continue
+                for bound, count in value["buckets"].items():
+                    bucket_labels = label_items + (("le", _format_value(float(bound))),)
+                    lines.append(f"{full}_bucket{_format_labels(bucket_labels)} {count}")
+                lines.append(f"{full}_sum{_format_labels(label_items)} {_format_value(value['sum'])}")
+                lines.append(f"{full}_count{_format_labels(label_items)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class NullMetrics(Metrics):
+    """Disabled metrics: every call is a no-op and spans are a shared null context."""
+
+    enabled = False
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        pass
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        pass
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        pass
+
+    def span(self, stage: str, **attributes: Any):
+        return _NULL_SPAN
+
+    def register_collector(self, name: str, collector: Collector) -> None:
+        pass
+
+
+_default_metrics: Optional[Metrics] = None
+_default_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Process-wide metrics registry configured from the environment."""
+
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics.from_env()
+        return _default_metrics
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import atexit
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+import requests
+
+from utils.app_logging import setup_logging, worker_path
+from utils.metrics import get_metrics
+
+
+logger = setup_logging()
+
+PUSHOVER_URL = "https://api.pushover.net/1/messages.json"
+
+
+class PermanentDeliveryError(Exception):
+    """Raised by a sender when retrying the notification cannot succeed."""
+
+
+def send_pushover(text: str) -> None:
+    """Deliver one Pushover message, raising on failure.
+
+    Client errors other than 429 are permanent (bad token, bad user key), so
+    they raise ``PermanentDeliveryError`` rather than being retried.
+    """
+
+    response = requests.post(
+        os.getenv("PUSHOVER_URL", PUSHOVER_URL),
+        data={
+            "token": os.getenv("PUSHOVER_TOKEN"),
+            "user": os.getenv("PUSHOVER_USER"),
+            "message": text,
+        },
+        timeout=10,
+    )
+    if 400 <= response.status_code < 500 and response.status_code != 429:
+        raise PermanentDeliveryError(f"Pushover rejected message: {response.status_code}")
+    response.raise_for_status()
+
+
+def _default_spill_path() -> str:
+    """``NOTIFICATION_SPILL_PATH`` or the project's default, one journal per worker.
+
+    A journal is replayed and compacted by the process that owns it, so
+    workers sharing one would each resend every pending notification.
+    """
+    env_path = os.getenv("NOTIFICATION_SPILL_PATH")
+    if env_path:
+        return worker_path(env_path)
+    project_root = Path(__file__).resolve().parent.parent
+    return worker_path(str(project_root / "data" / "pending_notifications.jsonl"))
+
+
+@dataclass(order=True)
+class _Job:
+    ready_at: float
+    seq: int
+    id: str = field(compare=False)
+    text: str = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+class NotificationQueue:
+    """Deliver notifications on a background thread with retries.
+
+    ``enqueue`` returns immediately so tool calls never wait on the network.
+    Every job is journaled to an append-only JSONL spill file before it is
+    queued and acknowledged once delivered (or abandoned), so jobs still
+    pending at shutdown are replayed by the next process. The file is
+    compacted down to the pending jobs at startup and again after every
+    ``compact_after`` acknowledgements, so it stays small in a long-running
+    process.
+    """
+
+    def __init__(
+        self,
+        *,
+        send: Callable[[str], None] = send_pushover,
+        spill_path: Optional[str] = None,
+        max_attempts: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 300.0,
+        compact_after: int = 100,
+    ) -> None:
+        self.send = send
+        self.spill_path = spill_path or _default_spill_path()
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.compact_after = compact_after
+        self._heap: list[_Job] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._journal_lock = threading.Lock()
+        # Jobs journaled but not yet acknowledged, and acknowledgements
+        # appended since the file was last compacted (guarded by _journal_lock)
+        self._pending: dict[str, str] = {}
+        self._acknowledged = 0
+        self._running = False
+        self._in_flight = 0
+        self._thread: Optional[threading.Thread] = None
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.replayed = 0
+        self._replay_spill_file()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def start(self) -> "NotificationQueue":
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(
+            target=self._worker, name="notification-queue", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the worker, waiting up to ``timeout`` for due jobs to drain.
+
+        Jobs not delivered in time stay in the spill file for the next run.
+        """
+
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._running and self._due_jobs() and time.monotonic() < deadline:
+                self._cond.wait(timeout=max(0.0, deadline - time.monotonic()))
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=max(0.0, deadline - time.monotonic()))
+
+    def enqueue(self, text: str) -> str:
+        """Queue ``text`` for delivery and return the job id."""
+
+        job = _Job(ready_at=time.monotonic(), seq=next(self._seq), id=uuid.uuid4().hex, text=text)
+        self._journal({"id": job.id, "text": text})
+        with self._cond:
+            heapq.heappush(self._heap, job)
+            self.enqueued += 1
+            self._cond.notify()
+        return job.id
+
+    def metrics(self) -> dict[str, int]:
+        with self._cond:
+            return {
+                "depth": len(self._heap) + self._in_flight,
+                "enqueued": self.enqueued,
+                "delivered": self.delivered,
+                "failed": self.failed,
+                "retries": self.retries,
+                "replayed": self.replayed,
+            }
+
+    def collect_metrics(self):
+        """Scrape-time metric families for ``Metrics.register_collector``."""
+
+        metrics = self.metrics()
+        yield "notification_queue_depth", "gauge", [({}, metrics["depth"])]
+        yield "notifications_total", "counter", [
+            ({"outcome": outcome}, metrics[outcome])
+            for outcome in ("enqueued", "delivered", "failed", "replayed")
+        ]
+        yield "notification_retries_total", "counter", [({}, metrics["retries"])]
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Block until nothing is queued or in flight; used by tests and shutdown."""
+
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._heap or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(timeout=remaining)
+            return True
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def _due_jobs(self) -> bool:
+        return bool(self._heap and self._heap[0].ready_at <= time.monotonic()) or bool(
+            self._in_flight
+        )
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while self._running:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0].ready_at <= now:
+                        break
+                    timeout = self._heap[0].ready_at - now if self._heap else None
+                    self._cond.wait(timeout=timeout)
+                if not self._running:
+                    return
+                job = heapq.heappop(self._heap)
+                self._in_flight += 1
+            self._deliver(job)
+
+    def _deliver(self, job: _Job) -> None:
+        job.attempts += 1
+        outcome = "delivered"
+        try:
+            self.send(job.text)
+        except PermanentDeliveryError as exc:
+            logger.error(f"Dropping notification {job.id}: {exc}")
+            outcome = "failed"
+        except Exception as exc:
+            if job.attempts >= self.max_attempts:
+                logger.error(
+                    f"Giving up on notification {job.id} after {job.attempts} attempts: {exc}"
+                )
+                outcome = "failed"
+            else:
+                outcome = "retry"
+                delay = min(self.max_delay, self.base_delay * 2 ** (job.attempts - 1))
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning(
+                    f"Notification {job.id} failed ({exc}); retrying in {delay:.1f}s"
+                )
+
+        if outcome != "retry":
+            self._journal({"id": job.id, "done": outcome})
+        with self._cond:
+            self._in_flight -= 1
+            if outcome == "retry":
+                self.retries += 1
+                job.ready_at = time.monotonic() + delay
+                heapq.heappush(self._heap, job)
+            elif outcome == "delivered":
+                self.delivered += 1
+            else:
+                self.failed += 1
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Spill file
+    # ------------------------------------------------------------------
+    def _journal(self, record: dict) -> None:
+        with self._journal_lock:
+            if "done" in record:
+                self._pending.pop(record["id"], None)
+                self._acknowledged += 1
+            else:
+                self._pending[record["id"]] = record["text"]
+            if self._acknowledged >= self.compact_after:
+                try:
+                    self._compact_locked()
+                    return
+                except OSError as exc:
+                    logger.error(f"Failed to compact notification journal: {exc}")
+            try:
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as exc:
+                logger.error(f"Failed to journal notification: {exc}")
+
+    def _compact_locked(self) -> None:
+        """Atomically rewrite the spill file with only the pending jobs."""
+
+        tmp_path = f"{self.spill_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for job_id, text in self._pending.items():
+                f.write(json.dumps({"id": job_id, "text": text}) + "\n")
+        os.replace(tmp_path, self.spill_path)
+        self._acknowledged = 0
+
+    def _replay_spill_file(self) -> None:
+        """Re-queue jobs left pending by a previous process and compact the file."""
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.spill_path)), exist_ok=True)
+        if not os.path.exists(self.spill_path):
+            return
+        pending: dict[str, str] = {}
+        with open(self.spill_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn write from a crash
+                if "done" in record:
+                    pending.pop(record.get("id"), None)
+                elif "text" in record:
+                    pending[record["id"]] = record["text"]
+
+        with self._journal_lock:
+            self._pending = dict(pending)
+            self._compact_locked()
+
+        now = time.monotonic()
+        for job_id, text in pending.items():
+            heapq.heappush(self._heap, _Job(now, next(self._seq), job_id, text))
+        self.replayed = len(pending)
+        if pending:
+            logger.info(f"Replaying {len(pending)} pending notifications")
+
+
+_queue: Optional[NotificationQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_notification_queue() -> NotificationQueue:
+    """Return the process-wide queue, starting its worker on first use.
+
+    Its depth and delivery counters are exported by the process-wide metrics
+    registry (``/metrics``) from then on.
+    """
+
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = NotificationQueue().start()
+            atexit.register(_queue.stop, 2.0)
+            get_metrics().register_collector("notifications", _queue.collect_metrics)
+        return _queue
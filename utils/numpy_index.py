@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+
+DEFAULT_INCLUDE = ("metadatas", "documents", "distances")
+
+
+class NumpyIndex:
+    """Exact cosine top-k over an in-memory, pre-normalized float32 matrix.
+
+    Rows are L2-normalized once at build time, so a query is a single matmul
+    followed by ``argpartition``. Distances are reported as ``2 - 2 * cos``,
+    which equals Chroma's default squared-L2 distance for unit vectors, and
+    results use Chroma's ``query`` dict shape. Pass ``normalized=True`` for
+    rows that are already unit length so the matrix is used as-is.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        embeddings: Any,
+        *,
+        documents: Optional[Sequence[Optional[str]]] = None,
+        metadatas: Optional[Sequence[Optional[dict[str, Any]]]] = None,
+        normalized: bool = False,
+    ) -> None:
+        self.ids = list(ids)
+        self.documents = list(documents) if documents is not None else [None] * len(self.ids)
+        self.metadatas = list(metadatas) if metadatas is not None else [None] * len(self.ids)
+        if not self.ids:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+        elif normalized:
+            # Already unit-length float32 rows (e.g. a memory-mapped snapshot): no copy
+            self.matrix = np.asarray(embeddings, dtype=np.float32)
+        else:
+            self.matrix = normalize_rows(embeddings)
+        if self.matrix.shape[0] != len(self.ids):
+            raise ValueError(
+                f"{len(self.ids)} ids but {self.matrix.shape[0]} embedding rows"
+            )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return int(self.matrix.shape[1])
+
+    def top_k(self, query_embeddings: Any, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(indices, cosine_scores)``, each shaped ``(n_queries, k)``, best first."""
+
+        queries = normalize_rows(query_embeddings)
+        n = len(self.ids)
+        k = min(k, n)
+        if k <= 0:
+            empty = np.empty((queries.shape[0], 0))
+            return empty.astype(np.intp), empty.astype(np.float32)
+        scores = queries @ self.matrix.T
+        if k < n:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(n), (queries.shape[0], n))
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind="stable")
+        return (
+            np.take_along_axis(candidates, order, axis=1),
+            np.take_along_axis(candidate_scores, order, axis=1),
+        )
+
+    def query(
+        self,
+        query_embeddings: Any,
+        *,
+        n_results: int = 10,
+        include: Sequence[str] = DEFAULT_INCLUDE,
+    ) -> dict[str, Any]:
+        """Search and return a Chroma-compatible result dict."""
+
+        indices, scores = self.top_k(query_embeddings, n_results)
+        include = list(include)
+        results: dict[str, Any] = {
+            "ids": [[self.ids[i] for i in row] for row in indices],
+            "embeddings": None,
+            "documents": None,
+            "metadatas": None,
+            "distances": None,
+            "included": include,
+        }
+        if "documents" in include:
+            results["documents"] = [[self.documents[i] for i in row] for row in indices]
+        if "metadatas" in include:
+            results["metadatas"] = [[self.metadatas[i] for i in row] for row in indices]
+        if "distances" in include:
+            results["distances"] = [(2.0 - 2.0 * row).tolist() for row in scores]
+        if "embeddings" in include:
+            results["embeddings"] = [self.matrix[row] for row in indices]
+        return results
+
+
+def normalize_rows(vectors: Any) -> np.ndarray:
+    """Contiguous float32 copy of ``vectors`` (1-D or 2-D) with unit-length rows."""
+
+    matrix = np.array(vectors, dtype=np.float32, order="C", ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
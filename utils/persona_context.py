@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import TYPE_CHECKING, Any, Optional, Sequence
+
+import numpy as np
+
+from utils.app_logging import setup_logging
+from utils.numpy_index import normalize_rows
+from utils.vector_db import DEFAULT_COLLECTION_NAME
+
+if TYPE_CHECKING:
+    from utils.vector_db import VectorDB
+
+
+logger = setup_logging()
+
+# Bump when the file layout or selection algorithm changes so stale files are rebuilt
+PERSONA_CONTEXT_FORMAT = 1
+PERSONA_CONTEXT_FILENAME = "persona_context.json"
+DEFAULT_PERSONA_CHUNKS = 6
+
+
+def persona_context_path(vector_db: "VectorDB") -> Optional[str]:
+    """Location of the persona context file for ``vector_db``'s collection.
+
+    Returns ``None`` for stores without a persist directory (e.g. test fakes).
+    Stores that serve immutable versions (``SnapshotVectorDB``) expose an
+    ``artifact_directory`` holding the file built for the version served.
+    """
+
+    directory = getattr(vector_db, "artifact_directory", None) or getattr(
+        vector_db, "persist_directory", None
+    )
+    if not directory:
+        return None
+    collection_name = getattr(vector_db, "collection_name", None)
+    if collection_name in (None, DEFAULT_COLLECTION_NAME):
+        return os.path.join(directory, PERSONA_CONTEXT_FILENAME)
+    return os.path.join(directory, f"persona_context.{collection_name}.json")
+
+
+def collection_version(ids: Sequence[str]) -> str:
+    """Stable version of a collection's contents.
+
+    Chunk ids are content hashes, so hashing the sorted id set changes exactly
+    when a chunk is added, removed or edited.
+    """
+
+    digest = hashlib.sha256()
+    for chunk_id in sorted(ids):
+        digest.update(chunk_id.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+def select_representative(embeddings: Any, k: int, *, iterations: int = 25) -> list[int]:
+    """Indices of ``k`` chunks that best cover the embedding space.
+
+    Runs spherical k-means with deterministic farthest-point initialisation and
+    returns, for each cluster, the member closest to its centroid. Clusters
+    are ordered largest first, so the most common themes lead the prompt.
+    """
+
+    matrix = normalize_rows(embeddings)
+    n = matrix.shape[0]
+    if n <= k:
+        return list(range(n))
+
+    # Farthest-point seeding from the chunk closest to the corpus mean
+    mean = matrix.mean(axis=0)
+    seeds = [int(np.argmax(matrix @ mean))]
+    closest = matrix @ matrix[seeds[0]]
+    for _ in range(1, k):
+        seeds.append(int(np.argmin(closest)))
+        closest = np.maximum(closest, matrix @ matrix[seeds[-1]])
+    centroids = matrix[seeds].copy()
+
+    labels = np.zeros(n, dtype=np.intp)
+    for iteration in range(iterations):
+        new_labels = np.argmax(matrix @ centroids.T, axis=1)
+        if iteration and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for cluster in range(k):
+            members = matrix[labels == cluster]
+            if len(members):
+                centroid = members.sum(axis=0)
+                centroids[cluster] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+    picks: list[tuple[int, int]] = []
+    similarity = matrix @ centroids.T
+    for cluster in range(k):
+        members = np.flatnonzero(labels == cluster)
+        if not len(members):
+            continue
+        best = int(members[np.argmax(similarity[members, cluster])])
+        picks.append((len(members), best))
+    picks.sort(key=lambda item: (-item[0], item[1]))
+    return [index for _, index in picks]
+
+
+def build_persona_context(
+    vector_db: "VectorDB",
+    *,
+    k: Optional[int] = None,
+    path: Optional[str] = None,
+    force: bool = False,
+) -> Optional[dict[str, Any]]:
+    """Select representative chunks and store them next to the collection.
+
+    Skips the work when the stored file already matches the collection
+    version. Entries keep a stable order (cluster size, then id), so the file,
+    and therefore the rendered prompt prefix, is byte-identical for identical
+    contents.
+
+    Returns:
+        The persona context payload, or ``None`` if the store has no path.
+    """
+
+    path = path or persona_context_path(vector_db)
+    if path is None:
+        return None
+    k = k or int(os.getenv("PERSONA_CONTEXT_CHUNKS", str(DEFAULT_PERSONA_CHUNKS)))
+
+    data = vector_db.collection.get(include=["embeddings", "documents", "metadatas"])
+    ids = list(data.get("ids") or [])
+    version = collection_version(ids)
+    existing = load_persona_context(path)
+    if (
+        not force
+        and existing is not None
+        and existing.get("collection_version") == version
+        and existing.get("k") == k
+    ):
+        return existing
+
+    # Order by id first so selection does not depend on insertion order
+    order = sorted(range(len(ids)), key=lambda i: ids[i])
+    embeddings = data.get("embeddings")
+    documents = data.get("documents") or [None] * len(ids)
+    metadatas = data.get("metadatas") or [None] * len(ids)
+    picks = (
+        select_representative(np.asarray(embeddings)[order], k)
+        if ids and embeddings is not None
+        else []
+    )
+
+    entries = []
+    for pick in picks:
+        index = order[pick]
+        metadata = metadatas[index] if isinstance(metadatas[index], dict) else {}
+        entries.append(
+            {
+                "id": ids[index],
+                "source": metadata.get("source", "unknown"),
+                "chunk_id": metadata.get("chunk_id"),
+                "text": (documents[index] or "").strip(),
+            }
+        )
+
+    payload = {
+        "format": PERSONA_CONTEXT_FORMAT,
+        "collection_version": version,
+        "embedding_model": getattr(vector_db, "embedding_model_name", None),
+        "k": k,
+        "entries": entries,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    logger.info(f"Persona context rebuilt from {len(ids)} chunks: {len(entries)} selected")
+    return payload
+
+
+def load_persona_context(path: Optional[str]) -> Optional[dict[str, Any]]:
+    """Read a persona context file, ignoring missing, corrupt or outdated ones."""
+
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, json.JSONDecodeError) as exc:
+        logger.error(f"Ignoring unreadable persona context {path}: {exc}")
+        return None
+    if payload.get("format") != PERSONA_CONTEXT_FORMAT:
+        return None
+    return payload
+
+
+def render_persona_context(entries: Sequence[dict[str, Any]]) -> str:
+    """Format selected chunks as the persona section of the system prompt."""
+
+    return "\n\n".join(
+        f"Source: {entry.get('source', 'unknown')}\n{entry.get('text', '').strip()}"
+        for entry in entries
+    )
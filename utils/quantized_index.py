@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from utils.numpy_index import NumpyIndex, normalize_rows
+
+
+QUANTIZATIONS = ("float32", "float16", "int8")
+
+# Codes are upcast to float32 in blocks of about this size per matmul; a
+# block that stays in cache scores int8 as fast as a float32 matrix
+SCORE_BLOCK_BYTES = 256 << 10
+
+
+def quantize(matrix: np.ndarray, quantization: str) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """Encode unit-length float32 rows as ``quantization`` codes.
+
+    ``int8`` is symmetric scalar quantization with one scale per dimension
+    (its largest magnitude over all rows maps to 127). Returns the codes and
+    the per-dimension scales (``None`` for the float types).
+    """
+
+    if quantization == "float32":
+        return np.ascontiguousarray(matrix, dtype=np.float32), None
+    if quantization == "float16":
+        return np.ascontiguousarray(matrix, dtype=np.float16), None
+    if quantization == "int8":
+        scales = np.abs(matrix).max(axis=0) / 127.0 if len(matrix) else np.ones(matrix.shape[1])
+        scales = scales.astype(np.float32)
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(matrix / scales), -127, 127).astype(np.int8)
+        return codes, scales
+    raise ValueError(f"Unknown quantization: {quantization} (choose from {', '.join(QUANTIZATIONS)})")
+
+
+def truncate_dims(matrix: Any, dims: Optional[int]) -> np.ndarray:
+    """First ``dims`` columns, re-normalized (Matryoshka-style truncation).
+
+    Only meaningful for models trained so that prefixes of the vector are
+    embeddings themselves, such as OpenAI's ``text-embedding-3`` family.
+    """
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if not dims or dims >= matrix.shape[1]:
+        return matrix
+    return normalize_rows(matrix[:, :dims])
+
+
+class QuantizedIndex(NumpyIndex):
+    """Cosine top-k over quantized (and optionally truncated) vectors, then rescored.
+
+    Candidates are ranked on compact codes: float16, or int8 with the
+    per-dimension scales folded into the query so the rows are never
+    dequantized as a whole, using the first ``dims`` dimensions only. The best
+    ``k * rescore`` candidates are then re-ranked exactly against the
+    full-precision rows in ``matrix``, which may be a memory map: only the
+    candidates' rows are read, so the resident index is the codes alone.
+    ``rescore=0`` returns the approximate ranking and scores.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        embeddings: Any,
+        *,
+        quantization: str = "int8",
+        dims: Optional[int] = None,
+        rescore: int = 4,
+        codes: Optional[np.ndarray] = None,
+        scales: Optional[np.ndarray] = None,
+        documents: Optional[Sequence[Optional[str]]] = None,
+        metadatas: Optional[Sequence[Optional[dict[str, Any]]]] = None,
+        normalized: bool = False,
+    ) -> None:
+        super().__init__(
+            ids, embeddings, documents=documents, metadatas=metadatas, normalized=normalized
+        )
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.quantization = quantization
+        self.dims = min(dims, self.dim) if dims and self.ids else (self.dim if self.ids else 0)
+        self.rescore = rescore
+        if codes is None and self.ids:
+            codes, scales = quantize(truncate_dims(self.matrix, self.dims), quantization)
+        self.codes = codes if codes is not None else np.zeros((0, 0), dtype=np.float32)
+        self.scales = scales
+        if self.ids and self.codes.shape != (len(self.ids), self.dims):
+            raise ValueError(
+                f"codes shaped {self.codes.shape}, expected {(len(self.ids), self.dims)}"
+            )
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the codes searched on every query (the resident index)."""
+
+        return int(self.codes.nbytes) + (int(self.scales.nbytes) if self.scales is not None else 0)
+
+    def approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """Scores of unit-length ``queries`` against every row's codes, ``(n_queries, n)``."""
+
+        queries = truncate_dims(queries, self.dims)
+        if self.scales is not None:
+            queries = queries * self.scales
+        scores = np.empty((queries.shape[0], len(self.ids)), dtype=np.float32)
+        if self.codes.dtype == np.float32:
+            scores[:] = queries @ self.codes.T
+            return scores
+        rows = max(1, SCORE_BLOCK_BYTES // (4 * max(1, self.dims)))
+        for start in range(0, len(self.ids), rows):
+            block = np.asarray(self.codes[start : start + rows], dtype=np.float32)
+            scores[:, start : start + len(block)] = queries @ block.T
+        return scores
+
+    def top_k(self, query_embeddings: Any, k: int) -> tuple[np.ndarray, np.ndarray]:
+        queries = normalize_rows(query_embeddings)
+        n = len(self.ids)
+        k = min(k, n)
+        if k <= 0:
+            empty = np.empty((queries.shape[0], 0))
+            return empty.astype(np.intp), empty.astype(np.float32)
+        scores = self.approximate_scores(queries)
+        depth = min(n, k * self.rescore) if self.rescore > 0 else k
+        candidates = (
+            np.argpartition(-scores, depth - 1, axis=1)[:, :depth]
+            if depth < n
+            else np.broadcast_to(np.arange(n), (queries.shape[0], n))
+        )
+        if self.rescore > 0:
+            # Sorted row order keeps reads from a memory map sequential
+            candidate_scores = np.stack(
+                [
+                    queries[i] @ np.asarray(self.matrix[np.sort(row)], dtype=np.float32).T
+                    for i, row in enumerate(candidates)
+                ]
+            )
+            candidates = np.sort(candidates, axis=1)
+        else:
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind="stable")[:, :k]
+        return (
+            np.take_along_axis(candidates, order, axis=1),
+            np.take_along_axis(candidate_scores, order, axis=1),
+        )
+
+
+def quantization_from_env() -> tuple[str, Optional[int], int]:
+    """``(quantization, dims, rescore)`` from ``VECTOR_QUANTIZATION``, ``VECTOR_DIMS``
+    (``0`` keeps every dimension) and ``VECTOR_RESCORE`` (``0`` disables rescoring)."""
+
+    quantization = os.getenv("VECTOR_QUANTIZATION", "float32").lower()
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown VECTOR_QUANTIZATION: {quantization}")
+    dims = int(os.getenv("VECTOR_DIMS", "0")) or None
+    return quantization, dims, int(os.getenv("VECTOR_RESCORE", "4"))
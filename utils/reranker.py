@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Optional, Sequence
+
+from utils.app_logging import setup_logging
+from utils.embedding_cache import normalize_query
+from utils.embeddings import tokenize
+from utils.tokenizer import CHAT_ENCODING, count_tokens
+
+
+logger = setup_logging()
+
+
+# ----------------------------------------------------------------------
+# Scorers
+# ----------------------------------------------------------------------
+def _features(text: str) -> dict[str, float]:
+    """Sublinear-TF unigram and bigram weights, as in ``HashingEmbeddings``."""
+
+    tokens = tokenize(text)
+    counts = Counter(tokens)
+    counts.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return {
+        feature: (1.5 if " " in feature else 1.0) * (1.0 + math.log(count))
+        for feature, count in counts.items()
+    }
+
+
+class LexicalReranker:
+    """Cosine similarity of sparse unigram and bigram features.
+
+    Scores every candidate against the full query text (rather than the
+    first stage's fused ranks), rewarding chunks that share the query's
+    word pairs as well as its words. Pure CPU, no model. Chunk features do
+    not depend on the query, so they are cached by chunk text and a query
+    only pays for tokenizing itself.
+    """
+
+    name = "lexical"
+    # Scored inline; cheap enough not to need a worker thread
+    blocking = False
+
+    def __init__(self, max_cached_chunks: int = 4096) -> None:
+        self.max_cached_chunks = max_cached_chunks
+        self._lock = threading.Lock()
+        self._chunks: "OrderedDict[bytes, tuple[dict[str, float], float]]" = OrderedDict()
+
+    def _chunk_features(self, text: str) -> tuple[dict[str, float], float]:
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            cached = self._chunks.get(key)
+            if cached is not None:
+                self._chunks.move_to_end(key)
+                return cached
+        features = _features(text)
+        cached = (features, math.sqrt(sum(w * w for w in features.values())))
+        with self._lock:
+            self._chunks[key] = cached
+            while len(self._chunks) > self.max_cached_chunks:
+                self._chunks.popitem(last=False)
+        return cached
+
+    def score(self, query: str, documents: Sequence[str]) -> list[float]:
+        query_features = _features(query)
+        query_norm = math.sqrt(sum(w * w for w in query_features.values()))
+        scores = []
+        for document in documents:
+            features, norm = self._chunk_features(document)
+            dot = sum(w * features.get(f, 0.0) for f, w in query_features.items())
+            scores.append(dot / (query_norm * norm) if query_norm and norm else 0.0)
+        return scores
+
+
+class CrossEncoderReranker:
+    """CPU cross-encoder via ``sentence-transformers`` (optional dependency).
+
+    Reads each (query, chunk) pair jointly, which ranks far better than
+    comparing independent embeddings, at a few milliseconds per pair.
+    """
+
+    name = "cross-encoder"
+    blocking = True
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2") -> None:
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as exc:
+            raise ImportError(
+                "RERANKER=cross-encoder requires the 'sentence-transformers' "
+                "package (pip install sentence-transformers)"
+            ) from exc
+        self._model = CrossEncoder(model_name, device="cpu")
+        self.model = model_name
+
+    def score(self, query: str, documents: Sequence[str]) -> list[float]:
+        return [float(s) for s in self._model.predict([(query, doc) for doc in documents])]
+
+
+def get_reranker(name: Optional[str] = None):
+    """Build the scorer selected by ``RERANKER`` (``lexical``, ``cross-encoder``, ``none``)."""
+
+    name = (name or os.getenv("RERANKER", "lexical")).lower()
+    if name in ("none", "off", "0", ""):
+        return None
+    if name == "lexical":
+        return LexicalReranker()
+    if name == "cross-encoder":
+        return CrossEncoderReranker(os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"))
+    raise ValueError(f"Unknown RERANKER: {name}")
+
+
+# ----------------------------------------------------------------------
+# Two-stage retrieval
+# ----------------------------------------------------------------------
+def _query_hash(query: str) -> str:
+    return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()[:16]
+
+
+class RerankingRetriever:
+    """Over-fetch from a first-stage retriever, rerank, keep what fits.
+
+    The first stage (``HybridRetriever``) returns ``fetch_k`` candidates.
+    The scorer reranks them and the best are kept, up to ``k`` chunks and
+    ``token_budget`` tokens of snippet text, so the prompt gets fewer, better
+    snippets. Scores are cached per (query hash, chunk id), so repeated and
+    overlapping questions only score chunks they have not seen.
+
+    Scoring runs in batches against a ``budget_ms`` deadline, checked before
+    each batch. If it passes with candidates still unscored, the first-stage
+    order is used for this query and the scores computed so far are cached
+    for the next one. When the last batch merely finishes late, its complete
+    ranking is used and the overrun is counted in ``rerank_stats``. Scorer
+    errors fall back to the first-stage order too.
+    """
+
+    def __init__(
+        self,
+        retriever: Any,
+        scorer: Any,
+        *,
+        fetch_k: int = 12,
+        token_budget: int = 1200,
+        budget_ms: Optional[float] = 50.0,
+        batch_size: int = 8,
+        max_cached_scores: int = 4096,
+    ) -> None:
+        self.retriever = retriever
+        self.scorer = scorer
+        self.fetch_k = fetch_k
+        self.token_budget = token_budget
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.max_cached_scores = max_cached_scores
+        # The fused list can only be as deep as each side's candidates
+        if getattr(retriever, "candidates", fetch_k) < fetch_k:
+            retriever.candidates = fetch_k
+        self._lock = threading.Lock()
+        self._scores: "OrderedDict[tuple[str, str], float]" = OrderedDict()
+        self._counts = {"reranked": 0, "budget_exceeded": 0, "error": 0}
+        self._overruns = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    @classmethod
+    def from_env(cls, retriever: Any) -> Any:
+        """Wrap ``retriever`` per ``RERANKER`` and ``RERANK_*``; ``RERANKER=none`` returns it as is."""
+
+        scorer = get_reranker()
+        if scorer is None:
+            return retriever
+        budget_ms = float(os.getenv("RERANK_BUDGET_MS", "50"))
+        return cls(
+            retriever,
+            scorer,
+            fetch_k=int(os.getenv("RERANK_CANDIDATES", "12")),
+            token_budget=int(os.getenv("RERANK_TOKEN_BUDGET", "1200")),
+            budget_ms=budget_ms or None,
+            max_cached_scores=int(os.getenv("RERANK_CACHE_SIZE", "4096")),
+        )
+
+    # ------------------------------------------------------------------
+    # Retrieval
+    # ------------------------------------------------------------------
+    def query(self, query: str, *, k: int = 4) -> dict[str, Any]:
+        candidates = self.retriever.query(query, k=self.fetch_k)
+        return self._select(candidates, self._rerank(query, candidates), k)
+
+    async def aquery(self, query: str, *, k: int = 4) -> dict[str, Any]:
+        candidates = await self.retriever.aquery(query, k=self.fetch_k)
+        if getattr(self.scorer, "blocking", True):
+            scores = await asyncio.to_thread(self._rerank, query, candidates)
+        else:
+            scores = self._rerank(query, candidates)
+        return self._select(candidates, scores, k)
+
+    def _rerank(self, query: str, candidates: dict[str, Any]) -> Optional[list[float]]:
+        """Scores aligned with the candidates, or ``None`` to keep first-stage order."""
+
+        ids = (candidates.get("ids") or [[]])[0]
+        documents = (candidates.get("documents") or [[]])[0]
+        if not ids:
+            return None
+        deadline = (
+            time.perf_counter() + self.budget_ms / 1000 if self.budget_ms is not None else math.inf
+        )
+        key = _query_hash(query)
+        scores: list[Optional[float]] = []
+        with self._lock:
+            for chunk_id in ids:
+                score = self._scores.get((key, chunk_id))
+                if score is not None:
+                    self._scores.move_to_end((key, chunk_id))
+                scores.append(score)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        with self._lock:
+            self._cache_hits += len(ids) - len(missing)
+            self._cache_misses += len(missing)
+
+        outcome = "reranked"
+        try:
+            for start in range(0, len(missing), self.batch_size):
+                if time.perf_counter() > deadline:
+                    outcome = "budget_exceeded"
+                    break
+                batch = missing[start : start + self.batch_size]
+                fresh = self.scorer.score(query, [documents[i] or "" for i in batch])
+                with self._lock:
+                    for i, score in zip(batch, fresh):
+                        scores[i] = score
+                        self._remember((key, ids[i]), score)
+        except Exception as exc:
+            logger.error(f"Reranker failed, keeping first-stage order: {exc}")
+            outcome = "error"
+        # Every score is in hand even if the last batch finished late
+        overrun = outcome == "reranked" and bool(missing) and time.perf_counter() > deadline
+        with self._lock:
+            self._counts[outcome] += 1
+            self._overruns += overrun
+        if outcome != "reranked":
+            return None
+        return scores  # type: ignore[return-value]
+
+    def _remember(self, key: tuple[str, str], score: float) -> None:
+        if self.max_cached_scores <= 0:
+            return
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        while len(self._scores) > self.max_cached_scores:
+            self._scores.popitem(last=False)
+
+    def _select(
+        self, candidates: dict[str, Any], scores: Optional[list[float]], k: int
+    ) -> dict[str, Any]:
+        """Top ``k`` by score (or first-stage order) within the token budget."""
+
+        ids = (candidates.get("ids") or [[]])[0]
+        columns = {
+            key: (candidates.get(key) or [[None] * len(ids)])[0]
+            for key in ("documents", "metadatas", "distances")
+        }
+        order = list(range(len(ids)))
+        if scores is not None:
+            order.sort(key=lambda i: scores[i], reverse=True)
+        kept: list[int] = []
+        used = 0
+        for i in order:
+            if len(kept) >= k:
+                break
+            tokens = count_tokens(columns["documents"][i] or "", CHAT_ENCODING)
+            # The best chunk is always kept; the prompt builder truncates it if needed
+            if kept and used + tokens > self.token_budget:
+                continue
+            kept.append(i)
+            used += tokens
+        result = {"ids": [[ids[i] for i in kept]]}
+        result.update({key: [[values[i] for i in kept]] for key, values in columns.items()})
+        result["rerank_scores"] = [[scores[i] if scores is not None else None for i in kept]]
+        return result
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+    def stats(self) -> dict[str, int]:
+        """First-stage outcome counts (see ``HybridRetriever.stats``)."""
+
+        return self.retriever.stats()
+
+    def rerank_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "outcomes": dict(self._counts),
+                "overruns": self._overruns,
+                "cache_hits": self._cache_hits,
+                "cache_misses": self._cache_misses,
+                "cached_scores": len(self._scores),
+            }
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, Future, TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Any, Optional, Sequence
+
+from utils.app_logging import setup_logging
+from utils.lexical_index import BM25Index, lexical_index_path, load_lexical_index
+
+if TYPE_CHECKING:
+    from utils.vector_db import VectorDB
+
+
+logger = setup_logging()
+
+RETRIEVAL_MODES = ("hybrid", "vector", "lexical")
+RETRIEVAL_INCLUDE = ["documents", "metadatas", "distances"]
+
+# Standard RRF constant: damps the weight of the very first ranks
+DEFAULT_RRF_K = 60
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], *, k: int = DEFAULT_RRF_K
+) -> list[tuple[str, float]]:
+    """Fuse ranked id lists into one ranking by ``sum(1 / (k + rank))``.
+
+    Only ranks are used, so BM25 scores and cosine distances never have to
+    be put on a common scale. Ties keep first-seen order.
+    """
+
+    fused: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def _first(results: Optional[dict[str, Any]], key: str) -> list[Any]:
+    values = (results or {}).get(key)
+    return list(values[0]) if values else []
+
+
+class HybridRetriever:
+    """Dense and BM25 retrieval fused with reciprocal rank fusion.
+
+    The BM25 index is loaded from the file written at ingest time (see
+    ``build_lexical_index``) and reloaded when the file changes; without a
+    file it is built in memory from the collection on first use. Both sides
+    fetch ``candidates`` chunks and the fused top ``k`` is returned in Chroma's
+    ``query`` shape (``distances`` are ``None`` for lexical-only hits).
+
+    The vector query gets ``embed_timeout`` seconds. If it fails or times out
+    the lexical results are served alone, so retrieval keeps working while
+    the embedding API is slow or down. The timeout includes any wait for a
+    thread of ``executor``, so the executor should be dedicated to retrieval. ``mode="vector"`` or ``"lexical"``
+    uses one side only.
+    """
+
+    def __init__(
+        self,
+        vector_db: "VectorDB",
+        *,
+        mode: str = "hybrid",
+        candidates: int = 8,
+        rrf_k: int = DEFAULT_RRF_K,
+        embed_timeout: Optional[float] = 2.0,
+        executor: Optional[Executor] = None,
+        lexical_index: Optional[BM25Index] = None,
+    ) -> None:
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        self.vector_db = vector_db
+        self.mode = mode
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.embed_timeout = embed_timeout
+        self.executor = executor
+        self._lexical = lexical_index
+        self._fixed_index = lexical_index is not None
+        # (path, mtime) of the file the current index came from; the path is
+        # resolved per query because a snapshot store moves it with each version
+        self._lexical_stamp: Optional[tuple[Optional[str], Optional[int]]] = None
+        self._lexical_failed = False
+        self._lock = threading.Lock()
+        self._counts = {"hybrid": 0, "vector": 0, "lexical": 0, "fallback": 0, "empty": 0}
+
+    @classmethod
+    def from_env(cls, vector_db: "VectorDB", *, executor: Optional[Executor] = None) -> "HybridRetriever":
+        """Configure from ``RETRIEVAL_MODE``, ``RETRIEVAL_CANDIDATES``, ``RETRIEVAL_RRF_K``
+        and ``RETRIEVAL_EMBED_TIMEOUT`` (``0`` waits indefinitely)."""
+
+        timeout = float(os.getenv("RETRIEVAL_EMBED_TIMEOUT", "2.0"))
+        return cls(
+            vector_db,
+            mode=os.getenv("RETRIEVAL_MODE", "hybrid").lower(),
+            candidates=int(os.getenv("RETRIEVAL_CANDIDATES", "8")),
+            rrf_k=int(os.getenv("RETRIEVAL_RRF_K", str(DEFAULT_RRF_K))),
+            embed_timeout=timeout or None,
+            executor=executor,
+        )
+
+    # ------------------------------------------------------------------
+    # Lexical index
+    # ------------------------------------------------------------------
+    @property
+    def lexical_index(self) -> Optional[BM25Index]:
+        """The current BM25 index, or ``None`` if none can be loaded or built."""
+
+        if self._fixed_index:
+            return self._lexical
+        path = lexical_index_path(self.vector_db)
+        mtime = None
+        if path is not None:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+        stamp = (path, mtime)
+        if self._lexical is not None and stamp == self._lexical_stamp:
+            return self._lexical
+        if self._lexical is None and mtime is None and self._lexical_failed:
+            return None
+        with self._lock:
+            if self._lexical is not None and stamp == self._lexical_stamp:
+                return self._lexical
+            if mtime is not None:
+                index = load_lexical_index(path)
+                if index is not None:
+                    self._lexical, self._lexical_stamp = index, stamp
+                    return index
+            if not self._lexical_failed:
+                try:
+                    self._lexical = BM25Index.from_collection(self.vector_db)
+                    self._lexical_stamp = stamp
+                    logger.info(f"Lexical index built in memory: {len(self._lexical)} chunks")
+                except Exception as exc:
+                    self._lexical_failed = True
+                    logger.error(f"Lexical index unavailable, using vector retrieval only: {exc}")
+            return self._lexical
+
+    def _lexical_results(self, query: str) -> Optional[dict[str, Any]]:
+        index = self.lexical_index
+        return index.query(query, k=self.candidates) if index is not None else None
+
+    # ------------------------------------------------------------------
+    # Retrieval
+    # ------------------------------------------------------------------
+    def query(self, query: str, *, k: int = 4) -> dict[str, Any]:
+        """Fused top ``k`` chunks for ``query``."""
+
+        if self.mode == "lexical":
+            return self._fuse(None, self._lexical_results(query), k)
+        if self.mode == "vector":
+            return self._fuse(self._vector_sync(query, None), None, k)
+
+        # Embedding runs on the executor while BM25 answers inline
+        future = None
+        if self.executor is not None:
+            future = self.executor.submit(self._vector_query, query)
+        lexical = self._lexical_results(query)
+        return self._fuse(self._vector_sync(query, future), lexical, k)
+
+    async def aquery(self, query: str, *, k: int = 4) -> dict[str, Any]:
+        """Async counterpart of ``query``; the BM25 lookup runs inline."""
+
+        if self.mode == "lexical":
+            return self._fuse(None, self._lexical_results(query), k)
+        vector_task = asyncio.ensure_future(
+            self.vector_db.aquery(query, k=self.candidates, include=RETRIEVAL_INCLUDE)
+        )
+        lexical = self._lexical_results(query) if self.mode == "hybrid" else None
+        try:
+            vector = await asyncio.wait_for(vector_task, self.embed_timeout)
+        except Exception as exc:
+            vector = self._vector_failed(exc)
+        return self._fuse(vector, lexical, k)
+
+    def _vector_query(self, query: str) -> dict[str, Any]:
+        return self.vector_db.query(query, k=self.candidates, include=RETRIEVAL_INCLUDE)
+
+    def _vector_sync(self, query: str, future: Optional[Future]) -> Optional[dict[str, Any]]:
+        """Vector results, or ``None`` on error; ``future`` is waited on with the timeout."""
+
+        try:
+            if future is None:
+                return self._vector_query(query)
+            return future.result(timeout=self.embed_timeout)
+        except Exception as exc:
+            return self._vector_failed(exc)
+
+    def _vector_failed(self, exc: BaseException) -> None:
+        if isinstance(exc, (asyncio.TimeoutError, FutureTimeoutError)):
+            logger.error(f"Vector query timed out after {self.embed_timeout}s")
+        else:
+            logger.error(f"Vector DB query failed: {exc}")
+        return None
+
+    def _fuse(
+        self,
+        vector: Optional[dict[str, Any]],
+        lexical: Optional[dict[str, Any]],
+        k: int,
+    ) -> dict[str, Any]:
+        chunks: dict[str, tuple[Any, Any, Optional[float]]] = {}
+        rankings = []
+        for results in (vector, lexical):
+            if results is None:
+                continue
+            ids = _first(results, "ids")
+            documents = _first(results, "documents") or [None] * len(ids)
+            metadatas = _first(results, "metadatas") or [None] * len(ids)
+            distances = _first(results, "distances") or [None] * len(ids)
+            for chunk_id, document, metadata, distance in zip(ids, documents, metadatas, distances):
+                if chunk_id not in chunks:
+                    chunks[chunk_id] = (document, metadata, distance)
+            rankings.append(ids)
+
+        if vector is not None and lexical is not None:
+            outcome = "hybrid"
+        elif vector is not None:
+            outcome = "vector"
+        elif lexical is not None:
+            outcome = "fallback" if self.mode == "hybrid" else "lexical"
+        else:
+            outcome = "empty"
+        with self._lock:
+            self._counts[outcome] += 1
+
+        fused = reciprocal_rank_fusion(rankings, k=self.rrf_k)[:k]
+        return {
+            "ids": [[chunk_id for chunk_id, _ in fused]],
+            "documents": [[chunks[chunk_id][0] for chunk_id, _ in fused]],
+            "metadatas": [[chunks[chunk_id][1] for chunk_id, _ in fused]],
+            "distances": [[chunks[chunk_id][2] for chunk_id, _ in fused]],
+            "rrf_scores": [[score for _, score in fused]],
+        }
+
+    def stats(self) -> dict[str, int]:
+        """Queries by outcome: ``hybrid``, ``vector``, ``lexical``, ``fallback``
+        (lexical only because the vector side failed) and ``empty``."""
+
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,524 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from utils.app_logging import setup_logging
+from utils.embedding_cache import EmbeddingCache
+from utils.embeddings import embedding_dimension, get_embedding_model
+from utils.lexical_index import build_lexical_index, lexical_index_path
+from utils.numpy_index import DEFAULT_INCLUDE, NumpyIndex, normalize_rows
+from utils.quantized_index import QuantizedIndex, quantization_from_env, quantize, truncate_dims
+from utils.persona_context import build_persona_context, collection_version, persona_context_path
+from utils.vector_db import DEFAULT_COLLECTION_NAME, VectorDB
+
+
+logger = setup_logging()
+
+SNAPSHOT_FORMAT = 1
+CURRENT_FILENAME = "CURRENT"
+VERSIONS_DIRNAME = "versions"
+MANIFEST_FILENAME = "manifest.json"
+EMBEDDINGS_FILENAME = "embeddings.npy"
+CODES_FILENAME = "codes.npy"
+SCALES_FILENAME = "scales.npy"
+RECORDS_FILENAME = "records.jsonl"
+
+
+class SnapshotReadOnlyError(RuntimeError):
+    """Raised when writing through a snapshot reader; ingest in the writer instead."""
+
+
+def default_snapshot_dir() -> str:
+    """``SNAPSHOT_DIR`` or ``data/snapshots`` under the project root."""
+
+    env_path = os.getenv("SNAPSHOT_DIR")
+    if env_path:
+        return env_path
+    return str(Path(__file__).resolve().parent.parent / "data" / "snapshots")
+
+
+def read_current_version(root: str) -> Optional[str]:
+    """Version name the ``CURRENT`` pointer refers to, or ``None`` before the first publish."""
+
+    try:
+        with open(os.path.join(root, CURRENT_FILENAME), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_version_dir(root: str, version: str) -> str:
+    return os.path.join(root, VERSIONS_DIRNAME, version)
+
+
+def load_manifest(root: str, version: str) -> dict[str, Any]:
+    with open(os.path.join(snapshot_version_dir(root, version), MANIFEST_FILENAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def snapshot_persona_path(root: str, version: str, collection_name: Optional[str]) -> str:
+    """Persona context file built for one snapshot version."""
+
+    return persona_context_path(
+        SimpleNamespace(persist_directory=snapshot_version_dir(root, version), collection_name=collection_name)
+    )
+
+
+def snapshot_lexical_path(root: str, version: str, collection_name: Optional[str]) -> str:
+    """BM25 index file built for one snapshot version."""
+
+    return lexical_index_path(
+        SimpleNamespace(persist_directory=snapshot_version_dir(root, version), collection_name=collection_name)
+    )
+
+
+def _fsync_file(path: str) -> None:
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@contextlib.contextmanager
+def _publish_lock(root: str) -> Iterator[None]:
+    """Serialize publishers on this host (there should only be one writer)."""
+
+    with open(os.path.join(root, ".publish.lock"), "w") as lock_file:
+        try:
+            import fcntl
+
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except ImportError:
+            pass
+        yield
+
+
+def write_snapshot_version(
+    root: str,
+    ids: Sequence[str],
+    embeddings: Any,
+    documents: Sequence[Optional[str]],
+    metadatas: Sequence[Optional[dict[str, Any]]],
+    *,
+    manifest: dict[str, Any],
+    quantization: str = "float32",
+    dims: Optional[int] = None,
+) -> str:
+    """Write one immutable snapshot version and return its name.
+
+    Files are written into a temporary directory, fsynced and renamed into
+    ``versions/`` so a reader never sees a partially written version.
+    Embeddings are stored as unit-length float32 rows for memory mapping.
+    With ``quantization`` other than float32 or with ``dims`` set, the
+    search codes (and int8 scales) are written next to them; the float32
+    rows are then only read to rescore candidates.
+    """
+
+    versions_dir = os.path.join(root, VERSIONS_DIRNAME)
+    os.makedirs(versions_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    version = f"{stamp}-{manifest['collection_version'][:12]}"
+    tmp_dir = os.path.join(versions_dir, f".tmp-{version}")
+    os.makedirs(tmp_dir)
+    try:
+        matrix = normalize_rows(embeddings) if len(ids) else np.zeros((0, 0), dtype=np.float32)
+        embeddings_path = os.path.join(tmp_dir, EMBEDDINGS_FILENAME)
+        np.save(embeddings_path, matrix)
+        written = [embeddings_path]
+        quantized = None
+        if len(ids) and (quantization != "float32" or (dims and dims < matrix.shape[1])):
+            dims = dims if dims and dims < matrix.shape[1] else int(matrix.shape[1])
+            codes, scales = quantize(truncate_dims(matrix, dims), quantization)
+            written.append(os.path.join(tmp_dir, CODES_FILENAME))
+            np.save(written[-1], codes)
+            if scales is not None:
+                written.append(os.path.join(tmp_dir, SCALES_FILENAME))
+                np.save(written[-1], scales)
+            quantized = {"dtype": quantization, "dims": dims}
+        records_path = os.path.join(tmp_dir, RECORDS_FILENAME)
+        with open(records_path, "w", encoding="utf-8") as f:
+            for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                record = {"id": chunk_id, "document": document, "metadata": metadata}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        manifest = dict(
+            manifest,
+            format=SNAPSHOT_FORMAT,
+            version=version,
+            count=len(ids),
+            dim=int(matrix.shape[1]),
+            dtype="float32",
+            quantization=quantized,
+            created_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        )
+        manifest_path = os.path.join(tmp_dir, MANIFEST_FILENAME)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        for path in (*written, records_path, manifest_path):
+            _fsync_file(path)
+        os.rename(tmp_dir, os.path.join(versions_dir, version))
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return version
+
+
+def set_current_version(root: str, version: str) -> None:
+    """Atomically point ``CURRENT`` at ``version``; readers pick it up on their next poll."""
+
+    _write_atomic(os.path.join(root, CURRENT_FILENAME), version + "\n")
+
+
+def prune_versions(root: str, keep: int) -> list[str]:
+    """Delete all but the newest ``keep`` versions (never the current one).
+
+    Readers that still map a deleted version keep working: on POSIX the
+    files stay readable until their last mapping is closed.
+    """
+
+    versions_dir = os.path.join(root, VERSIONS_DIRNAME)
+    current = read_current_version(root)
+    versions = sorted(
+        name for name in os.listdir(versions_dir) if not name.startswith(".")
+    )
+    removed = []
+    for name in versions[: max(0, len(versions) - keep)]:
+        if name != current:
+            shutil.rmtree(os.path.join(versions_dir, name), ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+def publish_snapshot(
+    vector_db: VectorDB,
+    root: Optional[str] = None,
+    *,
+    keep: Optional[int] = None,
+    force: bool = False,
+    quantization: Optional[str] = None,
+    dims: Optional[int] = None,
+) -> str:
+    """Publish ``vector_db``'s collection as the current read-only snapshot.
+
+    Called by the single writer (the ingest process). Skips the work when
+    the current snapshot already holds the same chunks from the same model.
+    The persona context and BM25 index files are built inside the new
+    version's directory before ``CURRENT`` moves, so a reader swaps its
+    vectors, lexical index and system prompt (and answer cache version)
+    together. ``quantization`` and ``dims`` default to
+    ``VECTOR_QUANTIZATION`` and ``VECTOR_DIMS``.
+
+    Returns:
+        The name of the current version after publishing.
+    """
+
+    root = root or default_snapshot_dir()
+    keep = keep or int(os.getenv("SNAPSHOT_KEEP", "3"))
+    if quantization is None:
+        quantization, env_dims, _ = quantization_from_env()
+        dims = dims or env_dims
+    os.makedirs(root, exist_ok=True)
+    data = vector_db.collection.get(include=["embeddings", "documents", "metadatas"])
+    ids = list(data.get("ids") or [])
+    version_hash = collection_version(ids)
+    model = vector_db.embedding_model_name
+
+    with _publish_lock(root):
+        current = read_current_version(root)
+        if current is not None and not force:
+            manifest = load_manifest(root, current)
+            if (
+                manifest.get("collection_version") == version_hash
+                and manifest.get("embedding_model") == model
+                and manifest.get("collection_name") == vector_db.collection_name
+                and _same_quantization(manifest, quantization, dims)
+                # Versions published before these files were versioned lack them
+                and os.path.exists(snapshot_lexical_path(root, current, vector_db.collection_name))
+            ):
+                logger.info(f"Snapshot {current} is up to date")
+                return current
+
+        # Rows sorted by id so identical contents produce identical files
+        order = sorted(range(len(ids)), key=lambda i: ids[i])
+        embeddings = data.get("embeddings")
+        documents = data.get("documents") or [None] * len(ids)
+        metadatas = data.get("metadatas") or [None] * len(ids)
+        version = write_snapshot_version(
+            root,
+            [ids[i] for i in order],
+            np.asarray(embeddings)[order] if ids else [],
+            [documents[i] for i in order],
+            [metadatas[i] for i in order],
+            manifest={
+                "collection_name": vector_db.collection_name,
+                "collection_version": version_hash,
+                "embedding_model": model,
+            },
+            quantization=quantization,
+            dims=dims,
+        )
+        # Not visible to readers until CURRENT points at the version
+        derived = (
+            snapshot_persona_path(root, version, vector_db.collection_name),
+            snapshot_lexical_path(root, version, vector_db.collection_name),
+        )
+        build_persona_context(vector_db, path=derived[0])
+        build_lexical_index(vector_db, path=derived[1])
+        for path in derived:
+            _fsync_file(path)
+        set_current_version(root, version)
+        removed = prune_versions(root, keep)
+    logger.info(
+        f"Published snapshot {version} ({len(ids)} chunks)"
+        + (f"; pruned {len(removed)} old versions" if removed else "")
+    )
+    return version
+
+
+def _same_quantization(manifest: dict[str, Any], quantization: str, dims: Optional[int]) -> bool:
+    stored = manifest.get("quantization") or {"dtype": "float32", "dims": manifest.get("dim")}
+    wanted_dims = dims if dims and dims < (manifest.get("dim") or 0) else manifest.get("dim")
+    return stored.get("dtype") == quantization and stored.get("dims") == wanted_dims
+
+
+# ----------------------------------------------------------------------
+# Readers
+# ----------------------------------------------------------------------
+class Snapshot:
+    """One loaded snapshot version: a memory-mapped matrix plus its records.
+
+    Quantized versions search the memory-mapped codes and rescore the best
+    ``rescore * k`` candidates against the float32 rows (``VECTOR_RESCORE``).
+    """
+
+    def __init__(self, root: str, version: str, *, rescore: Optional[int] = None) -> None:
+        self.root = root
+        self.version = version
+        self.directory = directory = snapshot_version_dir(root, version)
+        self.manifest = load_manifest(root, version)
+        ids, documents, metadatas = [], [], []
+        with open(os.path.join(directory, RECORDS_FILENAME), encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                ids.append(record["id"])
+                documents.append(record.get("document"))
+                metadatas.append(record.get("metadata"))
+        # Every worker maps the same file, so the OS page cache holds one copy
+        matrix = (
+            np.load(os.path.join(directory, EMBEDDINGS_FILENAME), mmap_mode="r")
+            if ids
+            else []
+        )
+        quantized = self.manifest.get("quantization")
+        if quantized and ids:
+            scales_path = os.path.join(directory, SCALES_FILENAME)
+            self.index: NumpyIndex = QuantizedIndex(
+                ids,
+                matrix,
+                quantization=quantized["dtype"],
+                dims=quantized["dims"],
+                rescore=rescore if rescore is not None else quantization_from_env()[2],
+                codes=np.load(os.path.join(directory, CODES_FILENAME), mmap_mode="r"),
+                scales=np.load(scales_path) if os.path.exists(scales_path) else None,
+                documents=documents,
+                metadatas=metadatas,
+                normalized=True,
+            )
+        else:
+            self.index = NumpyIndex(
+                ids, matrix, documents=documents, metadatas=metadatas, normalized=True
+            )
+
+
+class _SnapshotCollection:
+    """The read-only part of the Chroma collection API, served from a snapshot."""
+
+    def __init__(self, owner: "SnapshotVectorDB") -> None:
+        self._owner = owner
+
+    @property
+    def name(self) -> str:
+        return self._owner.collection_name
+
+    @property
+    def metadata(self) -> dict[str, Any]:
+        manifest = self._owner.snapshot.manifest
+        return {"embedding_model": manifest.get("embedding_model"), "embedding_dim": manifest.get("dim") or None}
+
+    def count(self) -> int:
+        return len(self._owner.snapshot.index)
+
+    def get(self, ids=None, include=None, where=None, limit=None, offset=None, **kwargs) -> dict[str, Any]:
+        index = self._owner.snapshot.index
+        rows = range(len(index))
+        if ids is not None:
+            wanted = set(ids)
+            rows = [i for i in rows if index.ids[i] in wanted]
+        if where:
+            rows = [
+                i
+                for i in rows
+                if all((index.metadatas[i] or {}).get(k) == v for k, v in where.items())
+            ]
+        rows = list(rows)[offset or 0 :]
+        rows = rows[:limit] if limit is not None else rows
+        include = list(include) if include is not None else ["documents", "metadatas"]
+        return {
+            "ids": [index.ids[i] for i in rows],
+            "documents": [index.documents[i] for i in rows] if "documents" in include else None,
+            "metadatas": [index.metadatas[i] for i in rows] if "metadatas" in include else None,
+            "embeddings": index.matrix[rows] if "embeddings" in include else None,
+        }
+
+    def peek(self, limit: int = 10) -> dict[str, Any]:
+        return self.get(limit=limit)
+
+
+class SnapshotVectorDB(VectorDB):
+    """Read-only ``VectorDB`` over the current published snapshot.
+
+    Meant for multi-worker serving: each worker memory-maps the same
+    ``embeddings.npy``, so N workers share one copy of the index in the page
+    cache, and none of them opens Chroma's SQLite file. Every
+    ``poll_interval`` seconds a query re-reads the ``CURRENT`` pointer and, if
+    the writer published a new version, loads it and swaps it in; in-flight
+    queries finish on the old version. Query embedding and its cache work
+    as in ``VectorDB``.
+    """
+
+    def __init__(
+        self,
+        *,
+        collection_name: Optional[str] = None,
+        persist_directory: Optional[str] = None,
+        embedding_model: Any = None,
+        query_cache: Optional[EmbeddingCache] = None,
+        poll_interval: Optional[float] = None,
+    ) -> None:
+        # Chroma is never opened: the snapshot directory is the whole store
+        self.persist_directory = persist_directory or default_snapshot_dir()
+        self.poll_interval = (
+            poll_interval
+            if poll_interval is not None
+            else float(os.getenv("SNAPSHOT_POLL_SECONDS", "2.0"))
+        )
+        self._swap_lock = threading.Lock()
+        self._next_poll = 0.0
+        version = read_current_version(self.persist_directory)
+        if version is None:
+            raise FileNotFoundError(
+                f"No snapshot published in {self.persist_directory}; run "
+                "`python utils/create_vector_db.py --publish` first"
+            )
+        self._snapshot = Snapshot(self.persist_directory, version)
+        self._next_poll = time.monotonic() + self.poll_interval
+        self.collection_name = (
+            collection_name
+            or self._snapshot.manifest.get("collection_name")
+            or DEFAULT_COLLECTION_NAME
+        )
+        self.embedding_model = embedding_model or get_embedding_model()
+        self.collection = _SnapshotCollection(self)
+        self.query_cache = query_cache if query_cache is not None else EmbeddingCache.from_env()
+        self._check_embedding_model(embedding_dimension(self.embedding_model))
+
+    @property
+    def snapshot(self) -> Snapshot:
+        """The loaded snapshot, swapped for a newer one when ``CURRENT`` moves."""
+
+        if time.monotonic() >= self._next_poll:
+            self.refresh()
+        return self._snapshot
+
+    @property
+    def version(self) -> str:
+        return self.snapshot.version
+
+    @property
+    def artifact_directory(self) -> str:
+        """Directory of the served version, holding its persona context and BM25 files."""
+
+        return self.snapshot.directory
+
+    @property
+    def index(self) -> NumpyIndex:
+        return self.snapshot.index
+
+    def refresh(self) -> bool:
+        """Load the current version if it changed; return ``True`` on a swap."""
+
+        # One thread reloads; the others keep serving the previous version
+        if not self._swap_lock.acquire(blocking=False):
+            return False
+        try:
+            self._next_poll = time.monotonic() + self.poll_interval
+            version = read_current_version(self.persist_directory)
+            if version is None or version == self._snapshot.version:
+                return False
+            try:
+                snapshot = Snapshot(self.persist_directory, version)
+            except (OSError, ValueError) as exc:
+                logger.error(f"Failed to load snapshot {version}: {exc}")
+                return False
+            self._snapshot = snapshot
+            logger.info(f"Swapped to snapshot {version} ({len(snapshot.index)} chunks)")
+            return True
+        finally:
+            self._swap_lock.release()
+
+    def _search(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        k: int,
+        include: Optional[Sequence[str]],
+    ) -> dict[str, Any]:
+        return self.index.query(
+            query_embeddings,
+            n_results=k,
+            include=include if include is not None else DEFAULT_INCLUDE,
+        )
+
+    async def aquery(
+        self,
+        query_texts: Iterable[str],
+        *,
+        k: int = 5,
+        include: Optional[Sequence[str]] = None,
+    ) -> dict[str, Any]:
+        """Async counterpart of ``query``; the in-memory search runs inline."""
+
+        if isinstance(query_texts, str):
+            query_texts = [query_texts]
+        else:
+            query_texts = list(query_texts)
+
+        if not query_texts:
+            raise ValueError("query_texts must contain at least one string")
+
+        query_embeddings = await self.aembed_queries(query_texts)
+        return self._search(query_embeddings, k, include)
+
+    def _read_only(self, *args: Any, **kwargs: Any) -> None:
+        raise SnapshotReadOnlyError(
+            "Snapshot stores are read-only; ingest with the writer and publish a new snapshot"
+        )
+
+    add_documents = upsert = update = delete = delete_all = _read_only
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from typing import Iterable, Sequence
+from typing import Any, Iterable, Optional, Sequence
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
 from langchain_community.document_loaders.pdf import PyPDFLoader
 from langchain_community.document_loaders.text import TextLoader
+import hashlib
+import json
 import os
 import dotenv
 import sys
@@ -15,102 +16,270 @@ project_root = Path(__file__).resolve().parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
-from utils.vector_db import VectorDB
+from utils.chunking import get_text_splitter, split_documents, splitter_fingerprint
+from utils.embeddings import get_embedding_model
+from utils.lexical_index import build_lexical_index
+from utils.persona_context import build_persona_context
+from utils.vector_db import DEFAULT_COLLECTION_NAME, VectorDB
 
 dotenv.load_dotenv()
 
+MANIFEST_FILENAME = "ingest_manifest.json"
+
+
+def manifest_filename(collection_name: str) -> str:
+    """Manifest file for ``collection_name``; each collection tracks its own files."""
+    if collection_name == DEFAULT_COLLECTION_NAME:
+        return MANIFEST_FILENAME
+    return f"ingest_manifest.{collection_name}.json"
+
+
+def chunk_hash_id(source: str, text: str) -> str:
+    """Stable chunk id derived from its source and content."""
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+
+def load_documents(file_path):
+    """Load a supported file into loader documents."""
+    if file_path.endswith(".pdf"):
+        loader = PyPDFLoader(file_path)
+    elif file_path.endswith(".txt"):
+        loader = TextLoader(file_path)
+    else:
+        raise ValueError(f"Unsupported file type: {file_path}")
+    return loader.load()
+
+
+class IngestManifest:
+    """Record of which files (by content hash) produced which chunk ids.
+
+    Stored as JSON next to the Chroma collection so re-running ingestion on
+    unchanged files can skip loading, splitting and embedding entirely.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: dict[str, dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.files = json.load(f).get("files", {})
+            except (OSError, json.JSONDecodeError):
+                # A corrupt manifest only costs a full (still incremental) re-check
+                self.files = {}
+
+    def is_current(self, source: str, sha256: str, chunker: Optional[str] = None) -> bool:
+        """Whether ``source`` was indexed from this content with this chunker."""
+        entry = self.files.get(source)
+        return bool(entry) and entry.get("sha256") == sha256 and entry.get("chunker") == chunker
+
+    def ids_for(self, source: str) -> list[str]:
+        return list(self.files.get(source, {}).get("ids", []))
+
+    def record(
+        self, source: str, sha256: Optional[str], ids: Sequence[str], chunker: Optional[str] = None
+    ) -> None:
+        self.files[source] = {"sha256": sha256, "ids": list(ids), "chunker": chunker}
+
+    def forget(self, source: str) -> None:
+        self.files.pop(source, None)
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
 class DocumentProcessing:
-    def __init__(self):
-        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200)
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-large", api_key=os.getenv("OPENAI_API_KEY")
+    def __init__(
+        self,
+        *,
+        embeddings: Optional[Embeddings] = None,
+        vector_db: Optional[VectorDB] = None,
+        manifest_path: Optional[str] = None,
+        text_splitter: Optional[Any] = None,
+    ):
+        # StructuredChunker by default (see CHUNKER); any LangChain splitter works too
+        self.text_splitter = text_splitter or get_text_splitter()
+        # Recorded per file, so changing the chunking re-chunks unchanged files
+        self.chunker = splitter_fingerprint(self.text_splitter)
+        if embeddings is None:
+            embeddings = vector_db.embedding_model if vector_db is not None else get_embedding_model()
+        self.embeddings = embeddings
+        self.vector_db = vector_db or VectorDB(embedding_model=self.embeddings)
+        self.manifest = IngestManifest(
+            manifest_path
+            or os.path.join(
+                self.vector_db.persist_directory,
+                manifest_filename(self.vector_db.collection_name),
+            )
         )
-        self.vector_db = VectorDB(embedding_model=self.embeddings)
 
     def split_text(self, document):
         """Split document text into chunks"""
+        return [chunk.text for chunk in self.split_chunks(document)]
+
+    def split_chunks(self, document):
+        """Split a document into ``Chunk``s, with section metadata where known.
+
+        ``document`` is either the list of page documents from a loader (one
+        file) or a raw text string.
+        """
         if isinstance(document, list):
-            # Handle list of documents from loaders
-            all_texts = []
-            for doc in document:
-                texts = self.text_splitter.split_text(doc.page_content)
-                all_texts.extend(texts)
-            return all_texts
-        else:
-            # Handle raw text string
-            texts = self.text_splitter.split_text(document)
-            return texts
+            return split_documents(self.text_splitter, [doc.page_content for doc in document])
+        return split_documents(self.text_splitter, [document])
 
     def embed_text(self, texts: Sequence[str]):
         """Generate embeddings for text chunks."""
         return self.embeddings.embed_documents(list(texts))
 
     def create_vector_db(self, texts, metadata=None):
-        """Add texts to vector database"""
+        """Add texts to the vector database, embedding only unseen chunks.
+
+        Ids are content hashes of (source, text), so re-adding an existing
+        chunk is a no-op and chunks from different files never collide.
+
+        Returns:
+            The list of chunk ids, in input order.
+        """
         if metadata is None:
             metadata = [{"source": "unknown"} for _ in texts]
-        
-        embeddings = self.embed_text(texts)
 
-        # Create documents with IDs
         documents = list(texts)
         metadatas = list(metadata)
-        ids = [f"doc_{i}" for i in range(len(documents))]
+        ids = [
+            chunk_hash_id(str(meta.get("source", "unknown")), text)
+            for text, meta in zip(documents, metadatas)
+        ]
+
+        # Identical chunks within one batch would share an id; keep the first
+        unique: dict[str, int] = {}
+        for idx, chunk_id in enumerate(ids):
+            unique.setdefault(chunk_id, idx)
+        existing = self.vector_db.existing_ids(list(unique))
+        new_positions = [idx for chunk_id, idx in unique.items() if chunk_id not in existing]
+        if not new_positions:
+            return ids
 
-        self.vector_db.add_documents(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids,
+        new_documents = [documents[idx] for idx in new_positions]
+        embeddings = self.embed_text(new_documents)
+        self.vector_db.upsert(
+            documents=new_documents,
+            metadatas=[metadatas[idx] for idx in new_positions],
+            ids=[ids[idx] for idx in new_positions],
             embeddings=embeddings,
         )
+        return ids
+
+    def load_file(self, file_path):
+        """Load a supported file into loader documents."""
+        return load_documents(file_path)
 
-    def create_vector_db_from_file(self, file_path):
-        """Process a single file and add to vector database"""
+    def create_vector_db_from_file(self, file_path, *, save_manifest=True):
+        """Incrementally index a single file.
+
+        Unchanged files (same content hash as the manifest) are skipped without
+        loading. Otherwise only new chunks are embedded, and chunks that no
+        longer appear in the file are deleted from the collection. With
+        ``save_manifest`` the persona context and BM25 index are refreshed too.
+        """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
-            
-        if file_path.endswith(".pdf"):
-            loader = PyPDFLoader(file_path)
-        elif file_path.endswith(".txt"):
-            loader = TextLoader(file_path)
-        else:
-            raise ValueError(f"Unsupported file type: {file_path}")
-        
-        documents = loader.load()
-        texts = self.split_text(documents)
-        
+
+        source = os.path.normpath(file_path)
+        sha256 = file_sha256(file_path)
+        if self.manifest.is_current(source, sha256, self.chunker):
+            return self.vector_db
+
+        documents = self.load_file(file_path)
+        chunks = self.split_chunks(documents)
+        texts = [chunk.text for chunk in chunks]
+
         # Create metadata for each chunk
-        metadata = [{"source": file_path, "chunk_id": i} for i in range(len(texts))]
-        
-        self.create_vector_db(texts, metadata)
+        metadata = [
+            {"source": source, "chunk_id": i, **chunk.metadata} for i, chunk in enumerate(chunks)
+        ]
+
+        ids = self.create_vector_db(texts, metadata)
+
+        # Stale chunks: anything previously indexed for this source (including
+        # legacy doc_N ids from before hashing) that the file no longer yields
+        indexed = set(self.manifest.ids_for(source)) | set(
+            self.vector_db.ids_where({"source": source})
+        )
+        stale = sorted(indexed - set(ids))
+        if stale:
+            self.vector_db.delete(stale)
+
+        self.manifest.record(source, sha256, ids, self.chunker)
+        if save_manifest:
+            self.manifest.save()
+            build_persona_context(self.vector_db)
+            build_lexical_index(self.vector_db)
         return self.vector_db
 
-    def create_vector_db_from_directory(self, directory_path):
-        """Process all supported files in a directory"""
+    def remove_source(self, source):
+        """Delete every chunk indexed for ``source`` and forget it."""
+        ids = set(self.manifest.ids_for(source)) | set(
+            self.vector_db.ids_where({"source": source})
+        )
+        self.vector_db.delete(sorted(ids))
+        self.manifest.forget(source)
+
+    def create_vector_db_from_directory(self, directory_path, **pipeline_options):
+        """Process all supported files in a directory.
+
+        Files go through ``IngestPipeline`` (parallel loading, batched
+        embedding, bulk upserts). Files deleted since the last run are purged,
+        then the persona context used by ``Me``'s system prompt and the BM25
+        index used for hybrid retrieval are refreshed.
+
+        Returns:
+            The ``IngestStats`` for the run.
+        """
+        from utils.ingest_pipeline import IngestPipeline
+
         if not os.path.exists(directory_path):
             raise FileNotFoundError(f"Directory not found: {directory_path}")
-            
-        supported_extensions = [".pdf", ".txt"]
-        processed_files = 0
-        
-        for file in os.listdir(directory_path):
+
+        file_paths = []
+        for file in sorted(os.listdir(directory_path)):
             file_path = os.path.join(directory_path, file)
-            
+
             # Skip directories
             if os.path.isdir(file_path):
                 continue
-                
+
             # Check if file has supported extension
-            if any(file.endswith(ext) for ext in supported_extensions):
-                try:
-                    self.create_vector_db_from_file(file_path)
-                    processed_files += 1
-                    print(f"Processed: {file}")
-                except Exception as e:
-                    print(f"Error processing {file}: {str(e)}")
+            if file.endswith(SUPPORTED_EXTENSIONS):
+                file_paths.append(file_path)
             else:
                 print(f"Skipping unsupported file type: {file}")
-        
-        print(f"Successfully processed {processed_files} files")
-        return self.vector_db
-        
\ No newline at end of file
+
+        stats = IngestPipeline(self, **pipeline_options).run(file_paths)
+
+        # Files deleted from the directory since the last run
+        directory = os.path.normpath(directory_path)
+        seen_sources = {os.path.normpath(path) for path in file_paths}
+        for source in list(self.manifest.files):
+            if os.path.dirname(source) == directory and source not in seen_sources:
+                self.remove_source(source)
+                print(f"Removed: {source}")
+        self.manifest.save()
+        build_persona_context(self.vector_db)
+        build_lexical_index(self.vector_db)
+
+        print(f"Ingestion: {stats.summary()}")
+        return stats
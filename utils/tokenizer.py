@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Iterable, Mapping, Optional
+
+from utils.app_logging import setup_logging
+
+
+logger = setup_logging()
+
+# text-embedding-3 models use cl100k_base; gpt-4o and gpt-5 models use o200k_base
+EMBEDDING_ENCODING = "cl100k_base"
+CHAT_ENCODING = "o200k_base"
+
+# Per-message framing overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Seconds before an encoding that failed to load is tried again
+ENCODING_RETRY_SECONDS = 300.0
+
+_encodings: dict[str, Any] = {}
+# Encoding name -> monotonic time after which loading is retried
+_encoding_retry_at: dict[str, float] = {}
+_encodings_lock = threading.Lock()
+
+
+def get_encoding(name: str) -> Optional[Any]:
+    """Return the tiktoken encoding ``name``, or ``None`` if it cannot be loaded.
+
+    Encodings are downloaded on first use; without network access (or without
+    tiktoken) callers fall back to an estimate of four characters per token.
+    The first failure is logged as a warning and loading is retried every
+    ``ENCODING_RETRY_SECONDS``, so token budgets go back to exact counts once
+    the encoding becomes available.
+    """
+
+    encoding = _encodings.get(name)
+    if encoding is not None:
+        return encoding
+    with _encodings_lock:
+        if name in _encodings:
+            return _encodings[name]
+        retry_at = _encoding_retry_at.get(name)
+        if retry_at is not None and time.monotonic() < retry_at:
+            return None
+        try:
+            import tiktoken
+
+            _encodings[name] = tiktoken.get_encoding(name)
+        except Exception as exc:
+            if retry_at is None:
+                logger.warning(
+                    f"Tokenizer '{name}' unavailable ({exc}); estimating 4 characters per "
+                    f"token and retrying every {ENCODING_RETRY_SECONDS:.0f}s"
+                )
+            _encoding_retry_at[name] = time.monotonic() + ENCODING_RETRY_SECONDS
+            return None
+        if retry_at is not None:
+            logger.info(f"Tokenizer '{name}' loaded; token counts are exact again")
+        _encoding_retry_at.pop(name, None)
+        return _encodings[name]
+
+
+def count_tokens(text: str, encoding_name: str = EMBEDDING_ENCODING) -> int:
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, encoding_name: str = CHAT_ENCODING) -> str:
+    """Cut ``text`` to at most ``max_tokens`` tokens."""
+
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return text[: max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def count_message_tokens(
+    messages: Iterable[Mapping[str, Any]], encoding_name: str = CHAT_ENCODING
+) -> int:
+    """Approximate prompt tokens for chat ``messages`` (content plus framing)."""
+
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        total += MESSAGE_OVERHEAD_TOKENS
+        if isinstance(content, str) and content:
+            total += count_tokens(content, encoding_name)
+    return total
@@ -1,31 +1,23 @@
-import json
-import os
-import requests
-from utils.logging import setup_logging
+from utils.app_logging import setup_logging
+from utils.notification_queue import get_notification_queue
 
 logger = setup_logging()
 
 def push(text):
-    """Send a Pushover notification.
+    """Queue a Pushover notification for background delivery.
+
+    Returns immediately; the notification queue handles retries and keeps a
+    spill file so nothing is lost across restarts.
 
     Args:
         text: The message text to send.
     """
     try:
-        logger.info(f"Sending Pushover notification: {text}")
-        requests.post(
-            "https://api.pushover.net/1/messages.json",
-            data={
-                "token": os.getenv("PUSHOVER_TOKEN"),
-                "user": os.getenv("PUSHOVER_USER"),
-                "message": text,
-            },
-            timeout=10,
-        )
+        logger.info(f"Queueing Pushover notification: {text}")
+        get_notification_queue().enqueue(text)
     except Exception as e:
         # Silently ignore notification failures to avoid impacting UX
-        logger.error(f"Failed to send Pushover notification: {e}")
-        pass
+        logger.error(f"Failed to queue Pushover notification: {e}")
 
 
 def record_user_details(email, name="Name not provided", notes="not provided"):
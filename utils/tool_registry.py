@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import bisect
+import inspect
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Sequence
+
+from utils.app_logging import setup_logging
+
+
+logger = setup_logging()
+
+# Seconds; chosen to separate in-process tools from ones doing network I/O
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_JSON_TYPES: dict[str, tuple[type, ...]] = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+    "null": (type(None),),
+}
+
+
+class ToolValidationError(ValueError):
+    """Raised when a tool schema or a tool call's arguments are invalid."""
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (Prometheus ``le`` semantics)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.total += seconds
+            self.count += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return cumulative bucket counts keyed by upper bound, plus sum/count."""
+
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                running += count
+                cumulative[bound] = running
+            return {"buckets": cumulative, "sum": self.total, "count": self.count}
+
+
+def _check_type(value: Any, expected: Any, path: str) -> None:
+    if expected is None:
+        return
+    names = expected if isinstance(expected, list) else [expected]
+    for name in names:
+        types = _JSON_TYPES.get(name)
+        if types is None:
+            return
+        # bool is an int subclass but never a valid JSON integer/number
+        if isinstance(value, types) and not (
+            isinstance(value, bool) and name in ("integer", "number")
+        ):
+            return
+    raise ToolValidationError(f"{path} must be of type {expected}")
+
+
+def _compile_validator(parameters: dict[str, Any]) -> Callable[[dict[str, Any]], None]:
+    """Precompute an argument validator for a tool's JSON schema parameters.
+
+    Supports the subset of JSON Schema used for function calling: top-level
+    ``type: object``, ``properties`` with ``type``/``enum``, ``required`` and
+    ``additionalProperties``.
+    """
+
+    if parameters.get("type", "object") != "object":
+        raise ToolValidationError("tool parameters must be a JSON object schema")
+    properties: dict[str, Any] = parameters.get("properties", {}) or {}
+    required = tuple(parameters.get("required", []) or [])
+    unknown_required = [name for name in required if name not in properties]
+    if unknown_required:
+        raise ToolValidationError(f"required fields not in properties: {unknown_required}")
+    allow_extra = parameters.get("additionalProperties", True) is not False
+    checks = {
+        name: (spec.get("type"), tuple(spec["enum"]) if "enum" in spec else None)
+        for name, spec in properties.items()
+    }
+
+    def validate(arguments: dict[str, Any]) -> None:
+        if not isinstance(arguments, dict):
+            raise ToolValidationError("arguments must be a JSON object")
+        missing = [name for name in required if name not in arguments]
+        if missing:
+            raise ToolValidationError(f"missing required arguments: {missing}")
+        for name, value in arguments.items():
+            check = checks.get(name)
+            if check is None:
+                if not allow_extra:
+                    raise ToolValidationError(f"unexpected argument: {name}")
+                continue
+            expected_type, enum = check
+            _check_type(value, expected_type, name)
+            if enum is not None and value not in enum:
+                raise ToolValidationError(f"{name} must be one of {list(enum)}")
+
+    return validate
+
+
+@dataclass
+class RegisteredTool:
+    name: str
+    schema: dict[str, Any]
+    func: Callable[..., Any]
+    validate: Callable[[dict[str, Any]], None]
+    latency: LatencyHistogram
+
+
+class ToolRegistry:
+    """Map function-calling tool names to callables.
+
+    Schemas are checked against each callable's signature and compiled into
+    argument validators once, at registration. Calls from a single model turn
+    run in parallel on a shared thread pool, and per-tool latency is recorded.
+    """
+
+    def __init__(self, *, max_workers: int = 4) -> None:
+        self._tools: dict[str, RegisteredTool] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tool-call"
+        )
+
+    def register(self, schema: dict[str, Any], func: Callable[..., Any]) -> None:
+        """Register ``func`` under ``schema["name"]``.
+
+        Raises:
+            ToolValidationError: If the schema is malformed or does not match
+                the function's signature.
+        """
+
+        name = schema.get("name")
+        if not name:
+            raise ToolValidationError("tool schema must have a name")
+        parameters = schema.get("parameters", {"type": "object", "properties": {}})
+        validate = _compile_validator(parameters)
+
+        signature = inspect.signature(func)
+        accepts_kwargs = any(
+            p.kind is inspect.Parameter.VAR_KEYWORD for p in signature.parameters.values()
+        )
+        properties = set((parameters.get("properties") or {}).keys())
+        required = set(parameters.get("required") or [])
+        if not accepts_kwargs:
+            unknown = properties - set(signature.parameters)
+            if unknown:
+                raise ToolValidationError(
+                    f"{name}: schema properties {sorted(unknown)} are not parameters of {func.__name__}"
+                )
+        needs_value = {
+            p.name
+            for p in signature.parameters.values()
+            if p.default is inspect.Parameter.empty
+            and p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+        }
+        if needs_value - required:
+            raise ToolValidationError(
+                f"{name}: parameters {sorted(needs_value - required)} must be required in the schema"
+            )
+
+        self._tools[name] = RegisteredTool(
+            name=name,
+            schema=schema,
+            func=func,
+            validate=validate,
+            latency=LatencyHistogram(),
+        )
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def chat_tools(self) -> list[dict[str, Any]]:
+        """Chat Completions-compatible tools schema for every registered tool."""
+
+        return [{"type": "function", "function": tool.schema} for tool in self._tools.values()]
+
+    def call(self, name: str, arguments: str | dict[str, Any] | None) -> Any:
+        """Validate and run one tool call, returning a JSON-serializable result.
+
+        Unknown tools, malformed arguments and tool exceptions are reported as
+        ``{"error": ...}`` so the model can recover instead of the turn failing.
+        """
+
+        tool = self._tools.get(name)
+        if tool is None:
+            logger.error(f"Unknown tool requested: {name}")
+            return {"error": f"unknown tool: {name}"}
+        try:
+            if isinstance(arguments, str):
+                arguments = json.loads(arguments) if arguments.strip() else {}
+            arguments = arguments or {}
+            tool.validate(arguments)
+        except (json.JSONDecodeError, ToolValidationError) as exc:
+            logger.error(f"Invalid arguments for {name}: {exc}")
+            return {"error": f"invalid arguments: {exc}"}
+
+        start = time.perf_counter()
+        try:
+            return tool.func(**arguments)
+        except Exception as exc:
+            logger.error(f"Tool {name} failed: {exc}")
+            return {"error": f"{name} failed"}
+        finally:
+            tool.latency.observe(time.perf_counter() - start)
+
+    def call_many(
+        self, calls: Sequence[tuple[str, str | dict[str, Any] | None]]
+    ) -> list[Any]:
+        """Run several tool calls, in parallel when there is more than one."""
+
+        if len(calls) <= 1:
+            return [self.call(name, arguments) for name, arguments in calls]
+        futures = [self._executor.submit(self.call, name, arguments) for name, arguments in calls]
+        return [future.result() for future in futures]
+
+    def latency_histograms(self) -> dict[str, dict[str, Any]]:
+        return {name: tool.latency.snapshot() for name, tool in self._tools.items()}
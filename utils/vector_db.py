@@ -1,12 +1,26 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import re
+import threading
 from pathlib import Path
-from typing import Any, Iterable, Optional, Sequence
+from typing import TYPE_CHECKING, Any, Iterable, Optional, Sequence
 
-import chromadb as cdb
 import dotenv
-from langchain_openai import OpenAIEmbeddings
+import numpy as np
+
+from utils.embedding_cache import EmbeddingCache
+from utils.numpy_index import DEFAULT_INCLUDE, NumpyIndex
+from utils.embeddings import (
+    DEFAULT_OPENAI_MODEL,
+    embedding_dimension,
+    embedding_model_name,
+    get_embedding_model,
+)
+
+if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
 
 
 dotenv.load_dotenv()
@@ -25,29 +39,113 @@ def _default_storage_path() -> str:
     return str(storage_dir)
 
 
+DEFAULT_COLLECTION_NAME = "me_profile"
+
+
+def default_collection_name(model_name: str) -> str:
+    """Collection used for ``model_name`` when none is given explicitly.
+
+    The original OpenAI model keeps ``me_profile``; any other backend gets its
+    own collection so switching ``EMBEDDING_BACKEND`` never mixes vector spaces.
+    """
+
+    if model_name == DEFAULT_OPENAI_MODEL:
+        return DEFAULT_COLLECTION_NAME
+    slug = re.sub(r"[^a-zA-Z0-9._-]+", "-", model_name).strip("-._")
+    return f"{DEFAULT_COLLECTION_NAME}__{slug}"[:512]
+
+
+class EmbeddingModelMismatchError(ValueError):
+    """Raised when a collection was built with a different embedding model."""
+
+
 class VectorDB:
-    """Light wrapper around a persistent Chroma collection."""
+    """Light wrapper around a persistent Chroma collection.
+
+    The collection's metadata records the ``embedding_model`` and
+    ``embedding_dim`` it was built with; opening it with a different model
+    raises ``EmbeddingModelMismatchError`` instead of returning nonsense.
+    """
 
     def __init__(
         self,
         *,
-        collection_name: str = "me_profile",
+        collection_name: Optional[str] = None,
         persist_directory: Optional[str] = None,
-        embedding_model: Optional[OpenAIEmbeddings] = None,
+        embedding_model: Optional[Embeddings] = None,
+        query_cache: Optional[EmbeddingCache] = None,
     ) -> None:
+        self.embedding_model = embedding_model or get_embedding_model()
+        self.collection_name = collection_name or default_collection_name(
+            self.embedding_model_name
+        )
         self.persist_directory = persist_directory or _default_storage_path()
+        # Deferred: importing chromadb costs most of a second at startup
+        import chromadb as cdb
+
         self.client = cdb.PersistentClient(path=self.persist_directory)
 
+        # Embeddings are always computed here, so Chroma must never fall back
+        # to its own default embedding function.
         try:
-            self.collection = self.client.get_or_create_collection(collection_name)
+            self.collection = self.client.get_or_create_collection(
+                self.collection_name, embedding_function=None
+            )
         except Exception:
             # Fallback for older Chroma versions
-            self.collection = self.client.create_collection(collection_name)
+            self.collection = self.client.create_collection(
+                self.collection_name, embedding_function=None
+            )
 
-        self.embedding_model = embedding_model or OpenAIEmbeddings(
-            model="text-embedding-3-large",
-            api_key=os.getenv("OPENAI_API_KEY"),
-        )
+        self.query_cache = query_cache if query_cache is not None else EmbeddingCache.from_env()
+        self._check_embedding_model(embedding_dimension(self.embedding_model))
+
+    @property
+    def embedding_model_name(self) -> str:
+        """Identifier of the embedding model, used to key cached query vectors."""
+
+        return embedding_model_name(self.embedding_model)
+
+    # ------------------------------------------------------------------
+    # Embedding model bookkeeping
+    # ------------------------------------------------------------------
+    @property
+    def recorded_embedding(self) -> tuple[Optional[str], Optional[int]]:
+        """``(model, dim)`` recorded in the collection metadata, if any."""
+
+        metadata = self.collection.metadata or {}
+        return metadata.get("embedding_model"), metadata.get("embedding_dim")
+
+    def _check_embedding_model(self, dim: Optional[int]) -> None:
+        recorded_model, recorded_dim = self.recorded_embedding
+        if recorded_model is not None and recorded_model != self.embedding_model_name:
+            raise EmbeddingModelMismatchError(
+                f"Collection '{self.collection_name}' was built with embedding model "
+                f"'{recorded_model}', not '{self.embedding_model_name}'"
+            )
+        if recorded_dim is not None and dim is not None and recorded_dim != dim:
+            raise EmbeddingModelMismatchError(
+                f"Collection '{self.collection_name}' holds {recorded_dim}-dim embeddings, "
+                f"got {dim}-dim vectors from '{self.embedding_model_name}'"
+            )
+
+    def _record_embedding_model(self, embeddings: Sequence[Sequence[float]]) -> None:
+        """Validate ``embeddings`` and record the model on the first write."""
+
+        if len(embeddings) == 0:
+            return
+        dim = len(embeddings[0])
+        self._check_embedding_model(dim)
+        if self.recorded_embedding == (self.embedding_model_name, dim):
+            return
+        # modify() replaces the whole mapping, and hnsw:* keys cannot be re-sent
+        metadata = {
+            key: value
+            for key, value in (self.collection.metadata or {}).items()
+            if not key.startswith("hnsw:")
+        }
+        metadata.update(embedding_model=self.embedding_model_name, embedding_dim=dim)
+        self.collection.modify(metadata=metadata)
 
     # ------------------------------------------------------------------
     # Document ingestion helpers
@@ -75,6 +173,7 @@ class VectorDB:
 
         if embeddings is None:
             embeddings = self.embedding_model.embed_documents(list(documents))
+        self._record_embedding_model(embeddings)
 
         self.collection.add(
             documents=documents,
@@ -93,7 +192,35 @@ class VectorDB:
         k: int = 5,
         include: Optional[Sequence[str]] = None,
     ) -> dict[str, Any]:
-        """Query the collection with one or more natural-language strings."""
+        """Query the collection with one or more natural-language strings.
+
+        Each distinct query is embedded once (all cache misses share a single
+        embedding request) and only the vectors are sent to Chroma.
+        """
+
+        if isinstance(query_texts, str):
+            query_texts = [query_texts]
+        else:
+            query_texts = list(query_texts)
+
+        if not query_texts:
+            raise ValueError("query_texts must contain at least one string")
+
+        query_embeddings = self.embed_queries(query_texts)
+        return self._search(query_embeddings, k, include)
+
+    async def aquery(
+        self,
+        query_texts: Iterable[str],
+        *,
+        k: int = 5,
+        include: Optional[Sequence[str]] = None,
+    ) -> dict[str, Any]:
+        """Async counterpart of ``query`` for use on an event loop.
+
+        Embeds with the model's async API and runs the local Chroma lookup on a
+        worker thread so the loop is never blocked.
+        """
 
         if isinstance(query_texts, str):
             query_texts = [query_texts]
@@ -103,14 +230,92 @@ class VectorDB:
         if not query_texts:
             raise ValueError("query_texts must contain at least one string")
 
-        query_embeddings = self.embedding_model.embed_documents(list(query_texts))
+        query_embeddings = await self.aembed_queries(query_texts)
+        return await asyncio.to_thread(self._search, query_embeddings, k, include)
+
+    def _search(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        k: int,
+        include: Optional[Sequence[str]],
+    ) -> dict[str, Any]:
+        """Nearest-neighbour lookup for already-embedded queries."""
 
+        kwargs: dict[str, Any] = {}
+        if include is not None:
+            kwargs["include"] = list(include)
         return self.collection.query(
-            query_texts=list(query_texts),
             query_embeddings=list(query_embeddings),
             n_results=k,
-            include=include,
+            **kwargs,
+        )
+
+    def embed_queries(self, query_texts: Sequence[str]) -> list[list[float]]:
+        """Embed query strings, serving repeats from the query cache.
+
+        Duplicate strings are embedded once. A single miss uses ``embed_query``;
+        several misses are batched into one ``embed_documents`` request.
+        """
+
+        query_texts = list(query_texts)
+        embeddings, missing = self._lookup_cached(query_texts)
+        if not missing:
+            return embeddings  # type: ignore[return-value]
+        if len(missing) == 1:
+            fresh = [self.embedding_model.embed_query(missing[0])]
+        else:
+            fresh = self.embedding_model.embed_documents(missing)
+        return self._merge_fresh(query_texts, embeddings, missing, fresh)
+
+    async def aembed_queries(self, query_texts: Sequence[str]) -> list[list[float]]:
+        """Async counterpart of ``embed_queries``."""
+
+        query_texts = list(query_texts)
+        embeddings, missing = self._lookup_cached(query_texts)
+        if not missing:
+            return embeddings  # type: ignore[return-value]
+        if len(missing) == 1:
+            fresh = [await self.embedding_model.aembed_query(missing[0])]
+        else:
+            fresh = await self.embedding_model.aembed_documents(missing)
+        return self._merge_fresh(query_texts, embeddings, missing, fresh)
+
+    def _lookup_cached(
+        self, query_texts: list[str]
+    ) -> tuple[list[Optional[list[float]]], list[str]]:
+        """Return cached embeddings (``None`` for misses) and unique missing texts."""
+
+        cache = self.query_cache
+        model = self.embedding_model_name
+        embeddings = [
+            cache.get(text, model) if cache is not None else None
+            for text in query_texts
+        ]
+        missing = list(
+            dict.fromkeys(
+                text for text, embedding in zip(query_texts, embeddings) if embedding is None
+            )
         )
+        return embeddings, missing
+
+    def _merge_fresh(
+        self,
+        query_texts: list[str],
+        embeddings: list[Optional[list[float]]],
+        missing: list[str],
+        fresh: Sequence[Sequence[float]],
+    ) -> list[list[float]]:
+        """Store newly computed embeddings in the cache and fill the gaps."""
+
+        computed = dict(zip(missing, fresh))
+        if self.query_cache is not None:
+            model = self.embedding_model_name
+            for text, embedding in computed.items():
+                self.query_cache.put(text, model, embedding)
+        return [
+            embedding if embedding is not None else list(computed[text])
+            for text, embedding in zip(query_texts, embeddings)
+        ]
 
     # ------------------------------------------------------------------
     # Thin wrappers around underlying collection methods
@@ -125,6 +330,7 @@ class VectorDB:
     ) -> None:
         if embeddings is None:
             embeddings = self.embedding_model.embed_documents(list(documents))
+        self._record_embedding_model(embeddings)
         self.collection.upsert(
             documents=list(documents),
             metadatas=list(metadatas) if metadatas is not None else None,
@@ -132,8 +338,15 @@ class VectorDB:
             embeddings=list(embeddings),
         )
 
-    def delete(self, ids: Sequence[str]) -> None:
-        self.collection.delete(ids=list(ids))
+    def delete(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        *,
+        where: Optional[dict[str, Any]] = None,
+    ) -> None:
+        if ids is not None and not ids:
+            return
+        self.collection.delete(ids=list(ids) if ids is not None else None, where=where)
 
     def update(
         self,
@@ -144,6 +357,8 @@ class VectorDB:
     ) -> None:
         if documents is not None and embeddings is None:
             embeddings = self.embedding_model.embed_documents(list(documents))
+        if embeddings is not None:
+            self._record_embedding_model(embeddings)
         self.collection.update(
             ids=list(ids),
             documents=list(documents) if documents is not None else None,
@@ -154,6 +369,18 @@ class VectorDB:
     def get(self, ids: Sequence[str]) -> dict[str, Any]:
         return self.collection.get(ids=list(ids))
 
+    def existing_ids(self, ids: Sequence[str]) -> set[str]:
+        """Return the subset of ``ids`` already stored in the collection."""
+
+        if not ids:
+            return set()
+        return set(self.collection.get(ids=list(ids), include=[]).get("ids", []))
+
+    def ids_where(self, where: dict[str, Any]) -> list[str]:
+        """Return ids of all chunks whose metadata matches ``where``."""
+
+        return list(self.collection.get(where=where, include=[]).get("ids", []))
+
     def count(self) -> int:
         return self.collection.count()
 
@@ -175,5 +402,153 @@ class VectorDB:
     def get_all_texts(self) -> list[str]:
         return self.collection.get(include=["documents"]).get("documents", [])  # type: ignore[assignment]
 
-    def get_all_embeddings(self) -> list[list[float]]:
-        return self.collection.get(include=["embeddings"]).get("embeddings", [])  # type: ignore[assignment]
\ No newline at end of file
+    def get_all_embeddings(self) -> np.ndarray:
+        """Every stored embedding as one contiguous float32 matrix, ``(count, dim)``."""
+        embeddings = self.collection.get(include=["embeddings"]).get("embeddings")
+        if embeddings is None or len(embeddings) == 0:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    # ------------------------------------------------------------------
+    # Bulk export / import
+    # ------------------------------------------------------------------
+    def export_collection(self, path: str, *, page_size: Optional[int] = None) -> dict[str, Any]:
+        """Write ids, documents, metadata and embeddings to ``path`` in pages.
+
+        See ``utils.collection_export.export_collection``.
+        """
+
+        from utils.collection_export import export_collection
+
+        return export_collection(self, path, page_size=page_size)
+
+    def import_collection(
+        self, path: str, *, batch_size: Optional[int] = None, replace: bool = False
+    ) -> int:
+        """Upsert an export in batches, without re-embedding.
+
+        See ``utils.collection_export.import_collection``.
+        """
+
+        from utils.collection_export import import_collection
+
+        return import_collection(self, path, batch_size=batch_size, replace=replace)
+
+
+class NumpyVectorDB(VectorDB):
+    """``VectorDB`` that answers queries from an in-memory NumPy matrix.
+
+    Chroma stays the persistent store and the target of every write, but the
+    whole collection is loaded once into a normalized float32 matrix
+    (``NumpyIndex``) and searched with one matmul. Writes through this object
+    invalidate the snapshot, which is rebuilt on the next query. Exact search
+    is faster than HNSW for persona-sized corpora; see
+    ``benchmarks/numpy_vs_chroma.py`` for the crossover.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._index: Optional[NumpyIndex] = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def index(self) -> NumpyIndex:
+        index = self._index
+        if index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self._index = self._load_index()
+                index = self._index
+        return index
+
+    def _load_index(self) -> NumpyIndex:
+        data = self.collection.get(include=["embeddings", "documents", "metadatas"])
+        embeddings = data.get("embeddings")
+        return NumpyIndex(
+            data.get("ids", []),
+            embeddings if embeddings is not None else [],
+            documents=data.get("documents"),
+            metadatas=data.get("metadatas"),
+        )
+
+    def invalidate(self) -> None:
+        """Drop the in-memory snapshot; the next query reloads it from Chroma."""
+
+        self._index = None
+
+    def _search(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        k: int,
+        include: Optional[Sequence[str]],
+    ) -> dict[str, Any]:
+        return self.index.query(
+            query_embeddings,
+            n_results=k,
+            include=include if include is not None else DEFAULT_INCLUDE,
+        )
+
+    async def aquery(
+        self,
+        query_texts: Iterable[str],
+        *,
+        k: int = 5,
+        include: Optional[Sequence[str]] = None,
+    ) -> dict[str, Any]:
+        """Async counterpart of ``query``; the in-memory search runs inline."""
+
+        if isinstance(query_texts, str):
+            query_texts = [query_texts]
+        else:
+            query_texts = list(query_texts)
+
+        if not query_texts:
+            raise ValueError("query_texts must contain at least one string")
+
+        query_embeddings = await self.aembed_queries(query_texts)
+        if self._index is None:
+            # First query after a write: the reload reads SQLite, keep it off the loop
+            await asyncio.to_thread(lambda: self.index)
+        return self._search(query_embeddings, k, include)
+
+    def add_documents(self, documents, **kwargs) -> None:
+        super().add_documents(documents, **kwargs)
+        self.invalidate()
+
+    def upsert(self, documents, **kwargs) -> None:
+        super().upsert(documents, **kwargs)
+        self.invalidate()
+
+    def update(self, ids, documents=None, metadatas=None, embeddings=None) -> None:
+        super().update(ids, documents, metadatas, embeddings)
+        self.invalidate()
+
+    def delete(self, ids=None, *, where=None) -> None:
+        super().delete(ids, where=where)
+        self.invalidate()
+
+    def delete_all(self) -> None:
+        super().delete_all()
+        self.invalidate()
+
+
+VECTOR_DB_BACKENDS = {"chroma": VectorDB, "numpy": NumpyVectorDB}
+
+
+def open_vector_db(backend: Optional[str] = None, **kwargs: Any) -> VectorDB:
+    """Build the query backend selected by ``VECTOR_DB_BACKEND``.
+
+    ``chroma`` (default) and ``numpy`` read the Chroma store; ``snapshot``
+    serves read-only from the published snapshot (multi-worker mode).
+    """
+
+    backend = (backend or os.getenv("VECTOR_DB_BACKEND") or "chroma").lower()
+    if backend == "snapshot":
+        from utils.snapshot import SnapshotVectorDB
+
+        return SnapshotVectorDB(**kwargs)
+    try:
+        cls = VECTOR_DB_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown VECTOR_DB_BACKEND: {backend}") from None
+    return cls(**kwargs)